@@ -6,51 +6,55 @@ from PIL import Image
 import pandas as pd
 from datetime import datetime
 import random
-import plotly.express as px
-from emotion_utils.detector import EmotionDetector
-import hashlib
-import tempfile
-from location_utils.extract_gps import extract_gps, convert_gps
+from emotion_utils.detector import get_shared_detector
+from emotion_utils.video import VideoEmotionAnalyzer, VIDEO_EXTENSIONS, spool_upload
+from pipeline_utils.config import get_config as get_pipeline_config
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.pipeline import analyze_upload, config_fingerprint
+from pipeline_utils.result_cache import ResultCache
+from pipeline_utils.readiness import start_readiness_server
+from pipeline_utils.tracing import is_admin, render_prometheus, start_trace
+from storage_utils.config import get_config as get_storage_config
+from storage_utils.embedding_store import EmbeddingStore
+from storage_utils.history_store import HistoryStore, format_emotion_counts
+from storage_utils.history_writer import HistoryWriter
+from storage_utils.user_directory import UserDirectory
 from location_utils.geocoder import get_address_from_coords
-from location_utils.landmark import load_models, detect_landmark, query_landmark_coords, LANDMARK_KEYWORDS
+from location_utils.landmark import load_models, get_text_embeddings
+
+# Heavy model stacks (TensorFlow/DeepFace, torch/CLIP) load on first use by default.
+# Set LEADFOCAL_EAGER_LOAD=1 to load them at startup instead.
+EAGER_LOAD = os.environ.get("LEADFOCAL_EAGER_LOAD", "0") == "1"
+
+# LEADFOCAL_WARMUP=1 warms the emotion model (weights + dummy inference) in the background at startup
+WARMUP = os.environ.get("LEADFOCAL_WARMUP", "0") == "1"
+
+# Side port serving /live and /ready probes for a load balancer (0 = disabled)
+READINESS_PORT = int(os.environ.get("LEADFOCAL_READINESS_PORT", "0"))
+
+# Uploads shown per page on the History page
+HISTORY_PAGE_SIZE = 25
+
+# Matches listed by "Find similar" on the History page
+SIMILAR_RESULTS = 10
 
 # ----------------- User Authentication -----------------
+@st.cache_resource
+def get_user_directory():
+    cfg = get_storage_config()
+    return UserDirectory(cfg["users_csv_path"], backend=cfg["users_backend"], db_path=cfg["users_db_path"])
+
 def authenticate(username, password):
     """Check if username and password match"""
     try:
-        if os.path.exists("users.csv"):
-            users = pd.read_csv("users.csv")
-            user_record = users[users["username"] == username]
-            if not user_record.empty:
-                hashed_password = hashlib.sha256(password.encode()).hexdigest()
-                return user_record["password"].values[0] == hashed_password
-        return False
-    except:
+        return get_user_directory().authenticate(username, password)
+    except Exception:
         return False
 
 def register_user(username, password):
     """Register new user"""
     try:
-        # Check if username already exists
-        if os.path.exists("users.csv"):
-            users = pd.read_csv("users.csv")
-            if username in users["username"].values:
-                return False
-        
-        # Hash the password
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
-        # Create new user record
-        new_user = pd.DataFrame([[username, hashed_password]], 
-                              columns=["username", "password"])
-        
-        # Append to existing users or create new file
-        if os.path.exists("users.csv"):
-            new_user.to_csv("users.csv", mode='a', header=False, index=False)
-        else:
-            new_user.to_csv("users.csv", index=False)
-            
-        return True
+        return get_user_directory().register(username, password)
     except Exception as e:
         print(f"Registration error: {e}")
         return False
@@ -65,27 +69,75 @@ st.set_page_config(
 
 @st.cache_resource
 def get_detector():
-    return EmotionDetector()
+    detector = get_shared_detector()
+    if EAGER_LOAD:
+        detector.warm_up()
+    elif WARMUP or READINESS_PORT:
+        # Warm in the background; /ready reports 503 until it finishes
+        detector.start_warm_up()
+    if READINESS_PORT:
+        start_readiness_server(READINESS_PORT, {"emotion_model": detector.is_ready}, metrics=render_prometheus)
+    return detector
 
 detector = get_detector()
 
-# Load CLIP models once
-processor, clip_model = load_models()
+if EAGER_LOAD:
+    # Load CLIP models and the landmark text index before the first request
+    processor, clip_model = load_models()
+    get_text_embeddings()
+
+@st.cache_resource
+def get_result_cache():
+    cfg = get_pipeline_config()
+    if not cfg["result_cache_enabled"]:
+        return None
+    return ResultCache(
+        cfg["result_cache_path"],
+        max_entries=cfg["result_cache_max_entries"],
+        max_distance=cfg["near_duplicate_max_distance"],
+        fingerprint=config_fingerprint()
+    )
+
+@st.cache_resource
+def get_history_store():
+    cfg = get_storage_config()
+    return HistoryStore(cfg["history_db_path"], csv_path=cfg["history_csv_path"])
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_history_page(username, version, offset, limit):
+    """One page of per-upload rollups; `version` keys the cache so any write invalidates it"""
+    return get_history_store().load_uploads(username, limit=limit, offset=offset)
+
+@st.cache_resource
+def get_history_writer():
+    cfg = get_storage_config()
+    return HistoryWriter(
+        get_history_store(),
+        max_batch=cfg["history_max_batch"],
+        max_latency_ms=cfg["history_commit_latency_ms"]
+    )
+
+@st.cache_resource
+def get_embedding_store():
+    cfg = get_storage_config()
+    if not cfg["embedding_store_enabled"]:
+        return None
+    return EmbeddingStore(cfg["embedding_store_path"], block_size=cfg["embedding_search_block"])
 
-def save_history(username, emotions, confidences, location):
+def save_history(username, emotions, confidences, location, embedding=None):
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    records = []
-    for i, (emo, conf) in enumerate(zip(emotions, confidences)):
-        records.append([username, location, emo, conf, now])
-    
-    df = pd.DataFrame(records, columns=["username", "Location", "Emotion", "Confidence", "timestamp"])
     try:
-        if os.path.exists("history.csv"):
-            prev = pd.read_csv("history.csv")
-            df = pd.concat([prev, df], ignore_index=True)
-        df.to_csv("history.csv", index=False)
+        # Queued for the shared writer, which group-commits uploads from all sessions
+        get_history_writer().submit(username, location, emotions, confidences, now)
     except Exception as e:
         st.error(f"Failed to save history: {e}")
+        return
+    embeddings = get_embedding_store()
+    if embeddings is not None and embedding:
+        try:
+            embeddings.add(username, now, embedding)
+        except Exception as e:
+            print(f"Embedding store error: {e}")
 
 def gradient_card(subtitle):
     if subtitle:
@@ -168,6 +220,8 @@ def sidebar_design(username):
 
 def show_user_history(username):
     """Show user-specific history in main content area"""
+    import plotly.express as px
+
     # Add back button in top right
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -180,114 +234,211 @@ def show_user_history(username):
             st.rerun()
     
     try:
-        if os.path.exists("history.csv"):
-            df = pd.read_csv("history.csv")
-            if not df.empty:
-                # Check if username column exists, if not create empty dataframe
-                if 'username' not in df.columns:
-                    df['username'] = ""
-                
-                # Filter for current user only
-                user_df = df[df["username"] == username]
+        # Make sure this session's pending uploads are committed before reading
+        try:
+            get_history_writer().flush(timeout=2)
+        except RuntimeError as e:
+            st.warning(f"Some uploads could not be saved: {e}")
+        store = get_history_store()
+        total_uploads = store.count_uploads(username)
+        
+        if total_uploads:
+            # Page through per-upload rollups instead of loading every record
+            page_count = (total_uploads - 1) // HISTORY_PAGE_SIZE + 1
+            page = 1
+            if page_count > 1:
+                page = int(st.number_input(f"Page (1-{page_count})", min_value=1,
+                                           max_value=page_count, value=page_count, step=1))
+            offset = (page - 1) * HISTORY_PAGE_SIZE
+            grouped = load_history_page(username, store.version(), offset, HISTORY_PAGE_SIZE)
+            grouped['Emotion'] = grouped['emotion_counts'].apply(format_emotion_counts)
+            
+            # Index continues across pages, starting from 1
+            grouped.index = grouped.index + offset + 1
+            
+            # Create display version with index and formatted time
+            grouped_display = grouped.copy()
+            grouped_display['Index'] = grouped.index
+            grouped_display['Time'] = grouped['timestamp']
+            grouped_display['Display Time'] = grouped.index.astype(str) + '. ' + grouped['timestamp']
+            
+            # Display table with checkboxes in last column
+            st.markdown("**📝 Records**")
+            
+            # Initialize selection state if not exists
+            if 'select_all_state' not in st.session_state:
+                st.session_state.select_all_state = False
+            
+            # Add select column with current selection state
+            grouped_display['Select'] = st.session_state.select_all_state
+            
+            # Display non-editable table with checkboxes
+            edited_df = st.data_editor(
+                grouped_display[["Index", "Location", "Emotion", "Time", "Select"]],
+                disabled=["Index", "Location", "Emotion", "Time"],
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            # Add select all and delete buttons on the right
+            col1, col2 = st.columns([4, 1])
+            with col2:
+                select_all = st.checkbox("Select All", key="select_all", value=st.session_state.select_all_state)
+                if select_all != st.session_state.select_all_state:
+                    st.session_state.select_all_state = select_all
+                    st.rerun()
                 
-                if not user_df.empty:
-                    # Group by timestamp and aggregate emotions
-                    grouped = user_df.groupby('timestamp').agg({
-                        'Location': 'first',
-                        'Emotion': lambda x: ', '.join([f"{x.tolist().count(e)} {e}" for e in set(x)]),
-                        'timestamp': 'first'
-                    }).reset_index(drop=True)
-                    
-                    # Add index starting from 1
-                    grouped.index = grouped.index + 1
-                    
-                    # Create display version with index and formatted time
-                    grouped_display = grouped.copy()
-                    grouped_display['Index'] = grouped.index
-                    grouped_display['Time'] = grouped['timestamp']
-                    grouped_display['Display Time'] = grouped.index.astype(str) + '. ' + grouped['timestamp']
-                    
-                    # Display table with checkboxes in last column
-                    st.markdown("**📝 Records**")
-                    
-                    # Initialize selection state if not exists
-                    if 'select_all_state' not in st.session_state:
-                        st.session_state.select_all_state = False
-                    
-                    # Add select column with current selection state
-                    grouped_display['Select'] = st.session_state.select_all_state
-                    
-                    # Display non-editable table with checkboxes
-                    edited_df = st.data_editor(
-                        grouped_display[["Index", "Location", "Emotion", "Time", "Select"]],
-                        disabled=["Index", "Location", "Emotion", "Time"],
-                        hide_index=True,
-                        use_container_width=True
-                    )
-                    
-                    # Add select all and delete buttons on the right
-                    col1, col2 = st.columns([4, 1])
-                    with col2:
-                        select_all = st.checkbox("Select All", key="select_all", value=st.session_state.select_all_state)
-                        if select_all != st.session_state.select_all_state:
-                            st.session_state.select_all_state = select_all
+                if st.button("🗑️ Delete", key="delete_button"):
+                    # Get indices of selected rows
+                    selected_indices = edited_df.index[edited_df['Select']].tolist()
+                    if selected_indices:
+                        # Safely get the timestamps to delete
+                        try:
+                            timestamps_to_delete = grouped.loc[selected_indices, "timestamp"].tolist()
+                            # Tombstone the deleted uploads
+                            get_history_store().delete_uploads(username, timestamps_to_delete)
+                            if get_embedding_store() is not None:
+                                get_embedding_store().delete(username, timestamps_to_delete)
+                            st.success("Selected records deleted successfully!")
+                            st.session_state.select_all_state = False
                             st.rerun()
-                        
-                        if st.button("🗑️ Delete", key="delete_button"):
-                            # Get indices of selected rows
-                            selected_indices = edited_df.index[edited_df['Select']].tolist()
-                            if selected_indices:
-                                # Safely get the timestamps to delete
-                                try:
-                                    timestamps_to_delete = grouped.loc[selected_indices, "timestamp"].tolist()
-                                    # Filter out the deleted records
-                                    df = df[~((df["username"] == username) & (df["timestamp"].isin(timestamps_to_delete)))]
-                                    # Save back to CSV
-                                    df.to_csv("history.csv", index=False)
-                                    st.success("Selected records deleted successfully!")
-                                    st.session_state.select_all_state = False
-                                    st.rerun()
-                                except KeyError:
-                                    st.error("Error: Could not find selected records to delete")
-        
-                    # Add spacing between table and chart
-                    st.markdown("<br><br>", unsafe_allow_html=True)
-                    st.markdown("**📊 Emotion Distribution**")
-                    
-                    # Create columns for the selection and chart
-                    col_select, col_chart = st.columns([2, 5])
-                    
-                    with col_select:
-                        # Create options with index + timestamp
-                        options = ["All"] + [f"{idx}. {row['timestamp']}" 
-                                            for idx, row in grouped.iterrows()]
-                        
-                        # Add record selection for chart
-                        selected_record = st.selectbox("Select record to view:", 
-                                                     options, 
-                                                     index=0)
-
-                        # Filter data based on selection
-                        if selected_record == "All":
-                            chart_data = user_df
-                        else:
-                            # Extract the timestamp from the selected option
-                            selected_timestamp = selected_record.split('. ', 1)[1]
-                            chart_data = user_df[user_df["timestamp"] == selected_timestamp]
-
-                    with col_chart:
-                        # Display chart with simplified title
-                        fig = px.pie(chart_data, names="Emotion")
-                        st.plotly_chart(fig, use_container_width=True)
+                        except KeyError:
+                            st.error("Error: Could not find selected records to delete")
+
+            # Add spacing between table and chart
+            st.markdown("<br><br>", unsafe_allow_html=True)
+            st.markdown("**📊 Emotion Distribution**")
+            
+            # Create columns for the selection and chart
+            col_select, col_chart = st.columns([2, 5])
+            
+            with col_select:
+                # Create options with index + timestamp
+                options = ["All"] + [f"{idx}. {row['timestamp']}" 
+                                    for idx, row in grouped.iterrows()]
+                
+                # Add record selection for chart
+                selected_record = st.selectbox("Select record to view:", 
+                                             options, 
+                                             index=0)
+
+                # Chart data comes from the precomputed emotion counts
+                if selected_record == "All":
+                    chart_counts = store.emotion_totals(username)
                 else:
-                    st.info("No history records found for your account.")
-            else:
-                st.info("No history records found.")
+                    # Extract the timestamp from the selected option
+                    selected_timestamp = selected_record.split('. ', 1)[1]
+                    chart_counts = store.emotion_totals(username, selected_timestamp)
+
+            with col_chart:
+                # Display chart with simplified title
+                fig = px.pie(names=list(chart_counts.keys()), values=list(chart_counts.values()))
+                st.plotly_chart(fig, use_container_width=True)
+
+            if get_embedding_store() is not None:
+                show_similar_uploads(username, grouped)
         else:
-            st.info("No history file found.")
+            st.info("No history records found for your account.")
     except Exception as e:
         st.error(f"Error loading history: {e}")
 
+def show_similar_uploads(username, grouped):
+    """Nearest past uploads by CLIP image embedding (admins can search every user's history)"""
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("**🔎 Find Similar Photos**")
+    col_select, col_scope = st.columns([3, 2])
+    with col_select:
+        options = [f"{idx}. {row['timestamp']}" for idx, row in grouped.iterrows()]
+        selected = st.selectbox("Upload to match:", options, key="similar_record")
+    with col_scope:
+        all_users = is_admin(username) and st.checkbox("Search all users", key="similar_all_users")
+
+    if not st.button("Find similar", key="similar_button"):
+        return
+    timestamp = selected.split('. ', 1)[1]
+    matches = get_embedding_store().similar_to(
+        username, timestamp, top_k=SIMILAR_RESULTS, scope=None if all_users else username
+    )
+    if not matches:
+        st.info("No similar photos found (uploads saved before embeddings were enabled can't be matched).")
+        return
+
+    locations = get_history_store().upload_locations([(user, ts) for user, ts, _ in matches])
+    rows = [
+        {"User": user, "Time": ts, "Location": locations[(user, ts)], "Similarity": f"{score:.3f}"}
+        for user, ts, score in matches if (user, ts) in locations
+    ]
+    columns = ["User", "Time", "Location", "Similarity"] if all_users else ["Time", "Location", "Similarity"]
+    st.dataframe(pd.DataFrame(rows, columns=["User", "Time", "Location", "Similarity"])[columns],
+                 hide_index=True, use_container_width=True)
+
+# ----------------- Debug Panel -----------------
+def show_trace_waterfall(trace):
+    """Admin-only: stage timings of the last upload as a waterfall"""
+    import plotly.express as px
+
+    with st.expander("🛠️ Debug: request waterfall"):
+        data = trace.to_dict()
+        spans = data["spans"]
+        st.caption(f"Trace {data['trace_id']} · {data['duration_ms']:.0f} ms total")
+        if not spans:
+            st.write("No stages were recorded (cached result).")
+            return
+        chart_df = pd.DataFrame({
+            "Stage": ["  " * s["depth"] + s["name"] for s in spans],
+            "Start (ms)": [s["start_ms"] for s in spans],
+            "Duration (ms)": [s["duration_ms"] for s in spans],
+        })
+        fig = px.bar(chart_df, x="Duration (ms)", y="Stage", base="Start (ms)", orientation="h")
+        fig.update_yaxes(autorange="reversed")
+        st.plotly_chart(fig, use_container_width=True)
+
+# ----------------- Video Mode -----------------
+def show_video_tab():
+    uploaded_video = st.file_uploader("Upload a video", type=VIDEO_EXTENSIONS, key="video_upload")
+    if not uploaded_video or not st.button("▶️ Analyze video"):
+        return
+
+    # Streamed from a temp file; the video is never decoded into memory as a whole
+    suffix = os.path.splitext(uploaded_video.name)[1] or ".mp4"
+    video_path = spool_upload(uploaded_video, suffix=suffix)
+    progress_bar = st.progress(0.0, text="Analyzing frames...")
+    try:
+        result = VideoEmotionAnalyzer(detector).analyze(
+            video_path, progress=lambda fraction: progress_bar.progress(fraction, text="Analyzing frames...")
+        )
+    except Exception as e:
+        st.error(f"❌ Could not analyze the video: {e}")
+        return
+    finally:
+        progress_bar.empty()
+        os.remove(video_path)
+
+    tracks = result["tracks"]
+    if not tracks:
+        st.warning("No faces were detected in the video.")
+        return
+
+    st.success(f"🎭 **{len(tracks)}** face track(s) in {result['duration']:.1f}s of video")
+    st.caption(f"{result['frames_sampled']} frames sampled, {result['keyframes']} face detections, "
+               f"{result['classifications']} emotion classifications")
+
+    import plotly.express as px
+
+    rows = [
+        {"Track": f"Face {track['track_id'] + 1}", "Time (s)": point["t"],
+         "Emotion": point["emotion"], "Confidence": point["confidence"]}
+        for track in tracks for point in track["timeline"]
+    ]
+    fig = px.scatter(pd.DataFrame(rows), x="Time (s)", y="Track", color="Emotion", hover_data=["Confidence"])
+    st.plotly_chart(fig, use_container_width=True)
+
+    for track in tracks:
+        with st.expander(f"Face {track['track_id'] + 1}: mostly {track['dominant_emotion']} "
+                         f"({track['first_seen']:.1f}s - {track['last_seen']:.1f}s)"):
+            st.dataframe(pd.DataFrame(track["timeline"])[["t", "emotion", "confidence"]],
+                         hide_index=True, use_container_width=True)
+
 # ----------------- Login/Signup Pages -----------------
 def login_page():
     gradient_card(None)
@@ -365,63 +516,36 @@ def main_app():
     if st.session_state.get('show_history', False):
         show_user_history(username)
     else:
-        tabs = st.tabs(["🏠 Home", "🗺️ Location Map"])
+        tabs = st.tabs(["🏠 Home", "🗺️ Location Map", "🎬 Video"])
 
         with tabs[0]:
             uploaded_file = st.file_uploader("Upload an image (JPG/PNG)", type=["jpg", "png"])
             if uploaded_file:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-                    tmp_file.write(uploaded_file.read())
-                    temp_path = tmp_file.name
-                    
-                try:
-                    image = Image.open(uploaded_file).convert("RGB")
-                    img = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-                    detector = EmotionDetector()
-                    detections = detector.detect_emotions(img)
-                    detected_img = detector.draw_detections(img, detections)
+                # Decode once in memory; every stage shares this context
+                image_ctx = ImageContext.from_bytes(uploaded_file.getvalue(), name=uploaded_file.name)
                     
-                    landmark = None 
-                    location = "Unknown"
-                    coords = None
-                    face_word = "Face" if len(detections) == 1 else "Faces"
-
-                    # 1) Try EXIF GPS
-                    gps_info = extract_gps(temp_path)
-                    if gps_info:
-                        coords = convert_gps(gps_info)
-                        if coords:
-                            st.session_state.coords_result = coords
-                            st.session_state.location_method = "GPS Metadata"
-                            location = get_address_from_coords(coords)
-                            
-                    # 2) Fallback to CLIP landmark
-                    if coords is None:
-                        landmark = detect_landmark(temp_path, threshold=0.15, top_k=5)
-                        st.session_state.landmark = landmark
-                        if landmark:
-                            coords_loc, source = query_landmark_coords(landmark)
-                            if coords_loc:
-                                st.session_state.coords_result = coords_loc
-                                st.session_state.location_method = f"Landmark ({source})"
-                                addr = get_address_from_coords(coords_loc)
-                                if addr not in (
-                                    "Unknown location",
-                                    "Geocoding service unavailable"
-                                ):  # Valid address
-                                    location = addr
-                                else:
-                                    info = LANDMARK_KEYWORDS.get(landmark)
-                                    if info:
-                                        location = f"{info[0]}, {info[1]}"
-                                    else:
-                                        lat, lon = coords_loc
-                                        location = f"{landmark.title()} ({lat:.4f}, {lon:.4f})"
-                        else:
+                detections = []
+                with start_trace("upload", user=username) as trace:
+                    try:
+                        image = image_ctx.pil
+                        img = image_ctx.bgr
+                        result = analyze_upload(image_ctx, detector, result_cache=get_result_cache(),
+                                                embed=get_embedding_store() is not None, user=username)
+                        detections = result["detections"]
+                        detected_img = detector.draw_detections(img, detections)
+                        face_word = "Face" if len(detections) == 1 else "Faces"
+                        location = result["location"]
+
+                        if result["location_method"] != "GPS Metadata":
+                            st.session_state.landmark = result["landmark"]
+                        if result["coords"] is not None and result["location_method"]:
+                            st.session_state.coords_result = tuple(result["coords"])
+                            st.session_state.location_method = result["location_method"]
+                        elif result["coords"] is None and not result["landmark"]:
                             st.write("🔍 No landmark detected with sufficient confidence")
 
-                except Exception as e:
-                    st.error(f"❌ Something went wrong during processing: {e}")
+                    except Exception as e:
+                        st.error(f"❌ Something went wrong during processing: {e}")
 
                 # Display detection results
                 if detections:
@@ -457,7 +581,7 @@ def main_app():
                             st.success(f"📍 Estimated Location: **{location}** ")
                             st.divider()
                             show_emo_detection_guide()
-                            save_history(username, emotions, confidences, location)
+                            save_history(username, emotions, confidences, location, result.get("embedding"))
                         else:
                             st.warning("No faces were detected in the uploaded image.")
                     with col2:
@@ -470,9 +594,8 @@ def main_app():
                 else:
                     st.warning("No faces were detected in the uploaded image.")
 
-                    # Cleanup temp file
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
+                if is_admin(username):
+                    show_trace_waterfall(trace)
 
         with tabs[1]:
             st.subheader("🗺️ Detected Location Map")
@@ -499,6 +622,9 @@ def main_app():
             else:
                 st.write(f"🔍 CLIP predicted landmark: **{landmark}**")
                 st.warning("📍 Estimated Location is unknown, so the map is not displayed.")
+
+        with tabs[2]:
+            show_video_tab()
                 
 # ----------------- Run App -----------------
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+# batch_ingest.py
+"""
+Headless batch ingestion: run the upload pipeline over many images.
+
+Examples:
+    python batch_ingest.py /archive/2024 --workers 4 --output results.jsonl
+    python batch_ingest.py "/archive/**/*.jpg" --csv results.csv --geocoder offline
+    python batch_ingest.py --manifest images.txt --username backfill
+
+Each worker process loads the emotion and CLIP models once. Results stream
+to JSONL and/or CSV as they finish, uploads with faces go to the history
+store (with their CLIP embeddings when LEADFOCAL_EMBEDDINGS=1, for "find
+similar"), and successfully processed paths are appended to a checkpoint file so an
+interrupted run resumes where it stopped. A path is checkpointed only after its
+history rows are committed.
+
+Online geocoding (Nominatim) is rate-limited per process, so runs whose
+geocoder mode is online or auto use a single worker; use --geocoder offline
+(or none) to parallelize.
+"""
+import argparse
+import csv
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# The app's history timestamp format
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CSV_FIELDS = ["path", "status", "faces", "emotions", "landmark", "lat", "lon",
+              "location", "location_method", "cached", "seconds", "error"]
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("batch_ingest")
+
+# Per-worker state, set by _init_worker
+_worker = {}
+
+
+def collect_inputs(inputs, manifest=None):
+    """Expand directories (recursively), globs and a manifest into an ordered, de-duplicated path list"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(
+                    os.path.join(root, f) for f in sorted(files)
+                    if f.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        elif any(ch in item for ch in "*?["):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+
+    if manifest:
+        with open(manifest, newline="", encoding="utf-8") as f:
+            if manifest.lower().endswith(".csv"):
+                paths.extend(row["path"] for row in csv.DictReader(f) if row.get("path"))
+            else:
+                paths.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def next_timestamp(previous=None):
+    """
+    History timestamp for the next upload, in the app's format. Uploads are keyed
+    by (username, timestamp), so when images finish faster than one per second
+    the clock is stepped past the previous one instead of merging uploads.
+    """
+    now = datetime.now().replace(microsecond=0)
+    if previous:
+        try:
+            now = max(now, datetime.strptime(previous[:19], TIMESTAMP_FORMAT) + timedelta(seconds=1))
+        except ValueError:
+            pass
+    return now.strftime(TIMESTAMP_FORMAT)
+
+
+def _write_checkpoint(checkpoint_file, writer, paths):
+    """Append finished paths, once the history rows submitted for them are committed"""
+    if not checkpoint_file or not paths:
+        return
+    if writer is not None:
+        try:
+            writer.flush()
+        except RuntimeError as e:
+            # Not checkpointed, so the next run retries these paths
+            logger.error(f"{e}; not checkpointing {len(paths)} paths")
+            return
+    checkpoint_file.write("".join(path + "\n" for path in paths))
+    checkpoint_file.flush()
+
+
+def _init_worker(geocoder_mode, use_cache, username, embed):
+    """Runs once per worker process: load and warm every model"""
+    if geocoder_mode and geocoder_mode != "none":
+        os.environ["LEADFOCAL_GEOCODER_MODE"] = geocoder_mode
+
+    from emotion_utils.detector import get_shared_detector
+    from location_utils.landmark import get_text_embeddings
+    from pipeline_utils.config import get_config as get_pipeline_config
+    from pipeline_utils.pipeline import config_fingerprint
+    from pipeline_utils.result_cache import ResultCache
+
+    detector = get_shared_detector()
+    detector.warm_up()
+    get_text_embeddings()
+
+    cache = None
+    cfg = get_pipeline_config()
+    # Without geocoding the results are partial: never read or fill the app's shared cache with them
+    if use_cache and geocoder_mode != "none" and cfg["result_cache_enabled"]:
+        cache = ResultCache(
+            cfg["result_cache_path"],
+            max_entries=cfg["result_cache_max_entries"],
+            max_distance=cfg["near_duplicate_max_distance"],
+            fingerprint=config_fingerprint()
+        )
+    _worker.update(detector=detector, cache=cache, geocode=geocoder_mode != "none", username=username,
+                   embed=embed)
+
+
+def _process(path):
+    """Analyze one image inside a worker; never raises"""
+    from pipeline_utils.image_context import ImageContext
+    from pipeline_utils.pipeline import analyze_upload
+
+    start = time.perf_counter()
+    try:
+        ctx = ImageContext.from_path(path)
+        result = analyze_upload(ctx, _worker["detector"], result_cache=_worker["cache"],
+                                geocode=_worker["geocode"], embed=_worker["embed"], user=_worker["username"])
+        result.update(path=path, status="ok", error="")
+    except Exception as e:
+        result = {"path": path, "status": "error", "error": str(e), "detections": []}
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _json_default(value):
+    # numpy scalars from the detectors
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _csv_row(result):
+    coords = result.get("coords") or (None, None)
+    detections = result.get("detections") or []
+    return {
+        "path": result["path"],
+        "status": result["status"],
+        "faces": len(detections),
+        "emotions": ";".join(d["emotion"] for d in detections),
+        "landmark": result.get("landmark") or "",
+        "lat": coords[0],
+        "lon": coords[1],
+        "location": result.get("location", ""),
+        "location_method": result.get("location_method", ""),
+        "cached": result.get("cached", False),
+        "seconds": result["seconds"],
+        "error": result.get("error", ""),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the emotion/location pipeline over many images")
+    parser.add_argument("inputs", nargs="*", help="image files, directories or glob patterns")
+    parser.add_argument("--manifest", help="text file (one path per line) or CSV with a 'path' column")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="worker processes (each loads the models once); 1 when geocoding online")
+    parser.add_argument("--output", help="append results as JSON lines to this file")
+    parser.add_argument("--csv", help="append results as CSV rows to this file")
+    parser.add_argument("--checkpoint", default=".ingest_checkpoint",
+                        help="file of successfully processed paths used to resume (default: .ingest_checkpoint)")
+    parser.add_argument("--username", default="batch", help="history owner for ingested uploads")
+    parser.add_argument("--no-history", action="store_true", help="do not write to the history store")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="bypass the result cache (always bypassed with --geocoder none)")
+    parser.add_argument("--geocoder", choices=["online", "offline", "auto", "none"],
+                        help="geocoder mode for this run (default: LEADFOCAL_GEOCODER_MODE)")
+    args = parser.parse_args(argv)
+
+    paths = collect_inputs(args.inputs, args.manifest)
+    done = load_checkpoint(args.checkpoint)
+    todo = [p for p in paths if p not in done]
+    logger.info(f"{len(paths)} images found, {len(paths) - len(todo)} already done, {len(todo)} to process")
+    if not todo:
+        return 0
+    if args.geocoder is None:
+        from location_utils.config import get_config as get_location_config
+
+        geocoder_mode = get_location_config()["geocoder_mode"]
+    else:
+        geocoder_mode = args.geocoder
+    if args.workers > 1 and geocoder_mode in ("online", "auto"):
+        # Each process would keep its own one-request-per-second limiter
+        logger.warning(f"Geocoder mode {geocoder_mode!r} uses Nominatim, which allows one request per second; "
+                       f"running 1 worker instead of {args.workers} (use --geocoder offline to parallelize)")
+        args.workers = 1
+
+    writer = embeddings = None
+    if not args.no_history:
+        from storage_utils.config import get_config as get_storage_config
+        from storage_utils.embedding_store import EmbeddingStore
+        from storage_utils.history_store import HistoryStore
+        from storage_utils.history_writer import HistoryWriter
+
+        cfg = get_storage_config()
+        writer = HistoryWriter(
+            HistoryStore(cfg["history_db_path"], csv_path=cfg["history_csv_path"]),
+            max_batch=cfg["history_max_batch"],
+            max_latency_ms=cfg["history_commit_latency_ms"]
+        )
+        if cfg["embedding_store_enabled"]:
+            embeddings = EmbeddingStore(cfg["embedding_store_path"], block_size=cfg["embedding_search_block"])
+
+    jsonl_file = open(args.output, "a", encoding="utf-8") if args.output else None
+    csv_file, csv_writer = None, None
+    if args.csv:
+        new_file = not os.path.exists(args.csv) or os.path.getsize(args.csv) == 0
+        csv_file = open(args.csv, "a", newline="", encoding="utf-8")
+        csv_writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        if new_file:
+            csv_writer.writeheader()
+    checkpoint_file = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+    last_timestamp = writer.store.latest_timestamp(args.username) if writer is not None else None
+
+    ok = failed = 0
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")  # never fork a process holding TF/torch state
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(args.geocoder, not args.no_cache, args.username, embeddings is not None)
+        ) as pool:
+            pending = set()
+            queue = iter(todo)
+            window = max(1, args.workers) * 4
+            while True:
+                for path in queue:
+                    pending.add(pool.submit(_process, path))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                finished_paths = []
+                for future in finished:
+                    result = future.result()
+                    if result["status"] == "ok":
+                        ok += 1
+                    else:
+                        failed += 1
+                        logger.warning(f"{result['path']}: {result['error']}")
+
+                    detections = result.get("detections") or []
+                    # Stored, not written out: 512 floats per line would swamp the JSONL/CSV
+                    embedding = result.pop("embedding", None)
+                    if writer is not None and detections:
+                        last_timestamp = next_timestamp(last_timestamp)
+                        writer.submit(
+                            args.username,
+                            result["location"],
+                            [d["emotion"] for d in detections],
+                            [d["confidence"] for d in detections],
+                            last_timestamp
+                        )
+                        if embeddings is not None and embedding:
+                            try:
+                                embeddings.add(args.username, last_timestamp, embedding)
+                            except Exception as e:
+                                logger.warning(f"{result['path']}: embedding store error: {e}")
+                    if jsonl_file:
+                        jsonl_file.write(json.dumps(result, default=_json_default) + "\n")
+                        jsonl_file.flush()
+                    if csv_writer:
+                        csv_writer.writerow(_csv_row(result))
+                        csv_file.flush()
+                    if result["status"] == "ok":
+                        # Failed images are retried on the next run
+                        finished_paths.append(result["path"])
+
+                    total = ok + failed
+                    if total % 100 == 0:
+                        rate = total / (time.perf_counter() - started)
+                        logger.info(f"{total}/{len(todo)} processed ({rate:.1f} images/s)")
+                _write_checkpoint(checkpoint_file, writer, finished_paths)
+    finally:
+        if writer is not None:
+            writer.close()
+        for f in (jsonl_file, csv_file, checkpoint_file):
+            if f:
+                f.close()
+
+    logger.info(f"Done: {ok} ok, {failed} failed in {time.perf_counter() - started:.1f}s")
+    return 1 if failed and not ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
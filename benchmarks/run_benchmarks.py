@@ -0,0 +1,498 @@
+# benchmarks/run_benchmarks.py
+"""
+Per-stage micro-benchmarks with regression thresholds.
+
+Every stage runs in its own interpreter, so peak RSS is the stage's own
+footprint and import costs do not leak between stages. Images are synthetic
+(several sizes and face counts, with GPS EXIF) plus any fixtures given with
+--fixtures. Nominatim and Overpass are replaced by local stub HTTP servers,
+so network latency and rate limits are not part of the numbers.
+
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py                    # all stages, compare to baseline
+    python benchmarks/run_benchmarks.py --stages extract_gps convert_gps --quick
+    python benchmarks/run_benchmarks.py --fixtures tests/images --save-baseline
+    python benchmarks/run_benchmarks.py --gate             # CI: missing baseline is an error
+
+Exits with status 1 when a stage's p50/p95 latency or peak RSS exceeds the
+stored baseline by more than --tolerance. With --gate, a missing baseline
+file, or a case the baseline has no numbers for, exits with status 2 instead
+of passing silently. Baselines are machine-specific: record one on the CI
+runner with --save-baseline and commit benchmarks/baseline.json; refresh it
+the same way after an intended performance change.
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+IMAGE_SIZES = [(640, 480), (1920, 1080), (4032, 3024)]
+FACE_COUNTS = [0, 1, 4]
+FIXTURE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+RESULT_MARKER = "BENCH_RESULT "
+
+# Eiffel Tower, as degrees/minutes/seconds for the synthetic EXIF
+GPS_DMS = ((48.0, 51.0, 29.6), "N", (2.0, 17.0, 40.2), "E")
+
+
+# ----------------- Inputs -----------------
+def synthetic_image(width, height, faces, seed=0):
+    """JPEG bytes with `faces` simple face-like figures and a GPS EXIF block"""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(40, 200, size=(height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    draw = ImageDraw.Draw(image)
+    size = max(24, min(width, height) // 4)
+    for i in range(faces):
+        x = (i * size * 5 // 4) % max(1, width - size)
+        y = (i * size // 2) % max(1, height - size)
+        draw.ellipse((x, y, x + size, y + int(size * 1.25)), fill=(224, 172, 140))
+        eye = size // 10
+        for ex in (x + size // 3, x + 2 * size // 3):
+            draw.ellipse((ex - eye, y + size // 2 - eye, ex + eye, y + size // 2 + eye), fill=(40, 30, 30))
+        draw.arc((x + size // 4, y + size * 3 // 5, x + 3 * size // 4, y + size), 20, 160,
+                 fill=(120, 40, 40), width=max(1, size // 20))
+
+    exif = Image.Exif()
+    lat, lat_ref, lon, lon_ref = GPS_DMS
+    exif[0x8825] = {1: lat_ref, 2: lat, 3: lon_ref, 4: lon}
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=90, exif=exif)
+    return buf.getvalue()
+
+
+def image_cases(fixtures_dir, quick):
+    """[(label, bytes, faces or None)] for the synthetic set plus fixtures"""
+    sizes = IMAGE_SIZES[:1] if quick else IMAGE_SIZES
+    cases = []
+    for width, height in sizes:
+        for faces in FACE_COUNTS:
+            data = synthetic_image(width, height, faces, seed=width + faces)
+            cases.append((f"{width}x{height},{faces} faces", data, faces))
+    if fixtures_dir:
+        for name in sorted(os.listdir(fixtures_dir)):
+            if name.lower().endswith(FIXTURE_EXTENSIONS):
+                with open(os.path.join(fixtures_dir, name), "rb") as f:
+                    cases.append((f"fixture:{name}", f.read(), None))
+    return cases
+
+
+# ----------------- Stub services -----------------
+class _StubHandler(BaseHTTPRequestHandler):
+    def _json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # Nominatim /reverse
+        self._json({
+            "place_id": 1,
+            "lat": "48.8582",
+            "lon": "2.2945",
+            "display_name": "Tour Eiffel, 5 Avenue Anatole France, Paris, Île-de-France, France",
+            "address": {"city": "Paris", "country": "France", "country_code": "fr"},
+        })
+
+    def do_POST(self):
+        # Overpass /api/interpreter
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._json({"elements": [{"type": "way", "id": 1, "center": {"lat": 48.8582, "lon": 2.2945}}]})
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    """Serve canned Nominatim and Overpass responses on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, name="bench-stub", daemon=True).start()
+    return server
+
+
+def use_stub_services(server):
+    """Point the geocoder and the Overpass client at the stub server"""
+    from geopy.geocoders import Nominatim
+
+    from location_utils import geocoder, landmark
+
+    host, port = server.server_address
+    geocoder.geolocator = Nominatim(user_agent="leadfocal_bench", domain=f"{host}:{port}",
+                                    scheme="http", timeout=5)
+    geocoder.MIN_DELAY_SECONDS = 0.0  # the 1 req/s policy is not what is being measured
+    landmark.OVERPASS_URL = f"http://{host}:{port}/api/interpreter"
+
+
+# ----------------- Stages -----------------
+# Each stage returns [(case, fn, iterations, units_per_call)]; fn() runs one timed call.
+
+def stage_extract_gps(images, quick):
+    from location_utils.extract_gps import extract_gps
+    from pipeline_utils.image_context import ImageContext
+
+    return [
+        (label, lambda data=data: extract_gps(ImageContext.from_bytes(data)), 200, 1)
+        for label, data, _ in images
+    ]
+
+
+def stage_convert_gps(images, quick):
+    from location_utils.extract_gps import convert_gps, convert_gps_bulk, extract_gps
+
+    gps_info = extract_gps(images[0][1])
+    many = [gps_info] * 10000
+    return [
+        ("GPS IFD", lambda: convert_gps(gps_info), 2000, 1),
+        ("convert_gps_bulk, 10000 dicts", lambda: convert_gps_bulk(many), 20, len(many)),
+    ]
+
+
+def stage_detect_emotions(images, quick):
+    from emotion_utils.detector import EmotionDetector
+    from pipeline_utils.image_context import ImageContext
+
+    detector = EmotionDetector()
+    detector.warm_up()
+    # A fresh context per call, so decoding is part of the measured stage
+    return [
+        (label, lambda data=data: detector.detect_emotions(ImageContext.from_bytes(data)), 10, 1)
+        for label, data, _ in images
+    ]
+
+
+def stage_draw_detections(images, quick):
+    from emotion_utils.detector import EmotionDetector
+    from pipeline_utils.image_context import ImageContext
+
+    detector = EmotionDetector()
+    cases = []
+    for label, data, faces in images:
+        if faces:
+            continue  # one synthetic image per size is enough; the boxes are drawn, not detected
+        img = ImageContext.from_bytes(data).bgr
+        height, width = img.shape[:2]
+        for faces in (1, 4, 16):
+            side = max(8, min(width, height) // 6)
+            detections = [
+                {"emotion": "happy", "confidence": 97.5, "x": (i * side) % max(1, width - side),
+                 "y": (i * side // 3) % max(1, height - side), "w": side, "h": side}
+                for i in range(faces)
+            ]
+            cases.append((f"{label} / {faces} boxes",
+                          lambda img=img, d=detections: detector.draw_detections(img, d), 100, 1))
+        if quick:
+            break
+    return cases
+
+
+def stage_detect_landmark(images, quick):
+    from location_utils.landmark import detect_landmark, get_text_embeddings
+    from pipeline_utils.image_context import ImageContext
+
+    get_text_embeddings()
+    return [
+        (label, lambda data=data: detect_landmark(ImageContext.from_bytes(data)), 10, 1)
+        for label, data, faces in images if not faces
+    ]
+
+
+def stage_query_landmark_coords(images, quick):
+    from location_utils.landmark import query_landmark_coords
+
+    server = start_stub_server()
+    use_stub_services(server)
+    os.environ["LEADFOCAL_OVERPASS"] = "1"
+    return [
+        ("predefined", lambda: query_landmark_coords("eiffel tower"), 2000, 1),
+        ("index miss -> stub Overpass", lambda: query_landmark_coords("benchmark stub tower"), 100, 1),
+    ]
+
+
+def stage_get_address_from_coords(images, quick):
+    from location_utils import geocoder
+
+    server = start_stub_server()
+    use_stub_services(server)
+    os.environ["LEADFOCAL_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_geocode_")
+    counter = iter(range(10 ** 9))
+
+    def uncached():
+        os.environ["LEADFOCAL_GEOCODE_CACHE"] = "0"
+        return geocoder.get_address_from_coords((48.85 + next(counter) * 1e-3, 2.29), mode="online")
+
+    def cached():
+        os.environ["LEADFOCAL_GEOCODE_CACHE"] = "1"
+        return geocoder.get_address_from_coords((48.8582, 2.2945), mode="online")
+
+    return [("stub Nominatim, no cache", uncached, 100, 1), ("cache hit", cached, 2000, 1)]
+
+
+def stage_history(images, quick):
+    from storage_utils.history_store import HistoryStore
+    from storage_utils.history_writer import HistoryWriter
+
+    rows = 1000 if quick else 10000
+    store = HistoryStore(os.path.join(tempfile.mkdtemp(prefix="bench_history_"), "history.db"), csv_path=None)
+    emotions, confidences = ["happy", "sad", "neutral"], [91.0, 55.5, 70.2]
+    store.append_many(
+        ("bench", "Paris, France", emotions, confidences, f"2024-01-01 00:00:{i:07d}")
+        for i in range(rows)
+    )
+    writer = HistoryWriter(store, max_batch=256, max_latency_ms=5)
+    counter = iter(range(10 ** 9))
+
+    def save_one():
+        store.append("bench", "Paris, France", emotions, confidences, f"2025-01-01 {next(counter):09d}")
+
+    def save_batch():
+        for _ in range(100):
+            writer.submit("bench", "Paris, France", emotions, confidences, f"2026-01-01 {next(counter):09d}")
+        writer.flush()
+
+    def load_page():
+        store.count_uploads("bench")
+        store.load_uploads("bench", limit=25, offset=0)
+        return store.emotion_totals("bench")
+
+    return [
+        ("save_history: one upload", save_one, 300, 1),
+        ("save_history: writer, 100 uploads", save_batch, 30, 100),
+        (f"show_user_history: page of 25 from {rows}", load_page, 300, 1),
+    ]
+
+
+# Stages that never look at the images skip generating them
+NO_IMAGE_STAGES = {"query_landmark_coords", "get_address_from_coords", "history"}
+
+STAGES = {
+    "extract_gps": stage_extract_gps,
+    "convert_gps": stage_convert_gps,
+    "detect_emotions": stage_detect_emotions,
+    "draw_detections": stage_draw_detections,
+    "detect_landmark": stage_detect_landmark,
+    "query_landmark_coords": stage_query_landmark_coords,
+    "get_address_from_coords": stage_get_address_from_coords,
+    "history": stage_history,
+}
+
+
+# ----------------- Measurement -----------------
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def time_case(fn, iterations, units, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "throughput_per_s": round(iterations * units / total, 2) if total else None,
+    }
+
+
+def run_stage_in_process(stage, fixtures, quick, warmup):
+    """Child-process entry point: run one stage and print its results"""
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    results = {}
+    try:
+        images = [] if stage in NO_IMAGE_STAGES else image_cases(fixtures, quick)
+        cases = STAGES[stage](images, quick)
+        # Module loggers default to INFO; per-call log I/O is not part of the measurement
+        logging.disable(logging.INFO)
+        for case, fn, iterations, units in cases:
+            if quick:
+                iterations = max(3, iterations // 5)
+            try:
+                results[case] = time_case(fn, iterations, units, warmup)
+            except Exception as e:
+                results[case] = {"error": f"{type(e).__name__}: {e}"}
+    except Exception as e:
+        results["setup"] = {"error": f"{type(e).__name__}: {e}"}
+
+    rss = round(peak_rss_mb(), 1)
+    for values in results.values():
+        values["peak_rss_mb"] = rss
+    print(RESULT_MARKER + json.dumps(results), flush=True)
+
+
+def run_stage(stage, args):
+    """Run one stage in a fresh interpreter; returns {case: metrics}"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, "--warmup", str(args.warmup)]
+    if args.fixtures:
+        cmd += ["--fixtures", os.path.abspath(args.fixtures)]
+    if args.quick:
+        cmd.append("--quick")
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    tail = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+    return {"setup": {"error": f"exit {proc.returncode}: {tail}"}}
+
+
+# ----------------- Baseline comparison -----------------
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return a list of regression messages (empty when everything is within tolerance)"""
+    regressions = []
+    for key, reference in baseline.get("results", {}).items():
+        current = results.get(key)
+        if current is None:
+            continue  # stage not run this time
+        if "error" in current and "error" not in reference:
+            regressions.append(f"{key}: now fails ({current['error']})")
+            continue
+        if "error" in current or "error" in reference:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            limit = reference[metric] * (1 + tolerance)
+            if current[metric] > limit and current[metric] - reference[metric] > min_delta_ms:
+                regressions.append(f"{key}: {metric} {current[metric]:.3f} > {reference[metric]:.3f} (+{tolerance:.0%})")
+        if current["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: peak RSS {current['peak_rss_mb']:.1f} MB > {reference['peak_rss_mb']:.1f} MB (+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def print_table(results, baseline):
+    reference = baseline.get("results", {})
+    print(f"{'stage / case':<60} {'p50 ms':>10} {'p95 ms':>10} {'per s':>10} {'RSS MB':>8} {'vs p50':>8}")
+    print("-" * 111)
+    for key, values in results.items():
+        if "error" in values:
+            print(f"{key:<60} {'error: ' + values['error']}")
+            continue
+        ratio = ""
+        if key in reference and "p50_ms" in reference[key] and reference[key]["p50_ms"]:
+            ratio = f"{values['p50_ms'] / reference[key]['p50_ms']:.2f}x"
+        print(f"{key:<60} {values['p50_ms']:>10.3f} {values['p95_ms']:>10.3f} "
+              f"{values['throughput_per_s'] or 0:>10.1f} {values['peak_rss_mb']:>8.1f} {ratio:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage micro-benchmarks with regression thresholds")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), help="stages to run (default: all)")
+    parser.add_argument("--fixtures", help="directory of extra JPG/PNG images to benchmark")
+    parser.add_argument("--quick", action="store_true", help="smallest image size and fewer iterations")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed calls before each case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional slowdown / memory growth (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="ignore latency differences smaller than this (timer noise)")
+    parser.add_argument("--gate", action="store_true",
+                        help="fail (exit 2) when the baseline or a case's baseline numbers are missing")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_stage_in_process(args.child, args.fixtures, args.quick, args.warmup)
+        return 0
+
+    baseline = {}
+    if args.gate and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one on this runner with --save-baseline and commit it")
+        return 2
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != machine_info():
+            print(f"Note: baseline was recorded on {baseline.get('machine')}; comparisons may be noisy")
+
+    results = {}
+    for stage in args.stages or list(STAGES):
+        start = time.perf_counter()
+        for case, values in run_stage(stage, args).items():
+            results[f"{stage} [{case}]"] = values
+        print(f"{stage}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    print_table(results, baseline)
+    report = {"machine": machine_info(), "quick": args.quick, "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        if baseline:
+            # Keep reference numbers for stages that were not run this time
+            report["results"] = {**baseline.get("results", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    if baseline.get("quick") != args.quick:
+        print("Note: baseline and this run differ in --quick; only matching cases are compared")
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if args.gate:
+        missing = sorted(set(results) - set(baseline.get("results", {})))
+        if missing:
+            print("\nNo baseline numbers for (refresh with --save-baseline):")
+            for key in missing:
+                print(f"  {key}")
+            return 2
+    if regressions:
+        print("\nRegressions:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# emotion_utils/backends.py
+"""
+Interchangeable runtimes for the 7-class emotion model.
+
+Every backend takes a float32 batch of 48x48 grayscale faces in [0, 1],
+shaped (N, 48, 48, 1), and returns (N, 7) probabilities in EMOTION_LABELS
+order, so EmotionDetector's output is the same whichever one serves it.
+
+    deepface - DeepFace's Keras model (loads the full TensorFlow runtime)
+    tflite   - an exported .tflite file (float32, float16 or int8), run with
+               tflite_runtime when installed, else tf.lite
+    onnx     - an exported .onnx file, run with onnxruntime (optional)
+
+Use tools/export_emotion_model.py to produce the exported files.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("deepface", "tflite", "onnx")
+
+
+class DeepFaceBackend:
+    name = "deepface"
+
+    def __init__(self):
+        from deepface import DeepFace
+
+        self.model = DeepFace.build_model("Emotion")
+
+    def predict(self, batch: np.ndarray, batch_size: int = 64) -> np.ndarray:
+        return self.model.predict(batch, batch_size=batch_size, verbose=0)
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path: str, num_threads: int = 0):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads or None)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = None
+        # An interpreter holds its tensors in place; one inference at a time
+        self._lock = threading.Lock()
+
+    def _quantize(self, batch):
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return batch.astype(np.float32, copy=False)
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output):
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self._output["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch: np.ndarray, batch_size: int = 64) -> np.ndarray:
+        results = []
+        with self._lock:
+            for start in range(0, len(batch), batch_size):
+                chunk = batch[start:start + batch_size]
+                if self._batch != len(chunk):
+                    self.interpreter.resize_tensor_input(self._input["index"], list(chunk.shape))
+                    self.interpreter.allocate_tensors()
+                    self._input = self.interpreter.get_input_details()[0]
+                    self._output = self.interpreter.get_output_details()[0]
+                    self._batch = len(chunk)
+                self.interpreter.set_tensor(self._input["index"], self._quantize(chunk))
+                self.interpreter.invoke()
+                results.append(self._dequantize(self.interpreter.get_tensor(self._output["index"])))
+        return np.concatenate(results)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path: str, num_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx emotion backend needs `pip install onnxruntime`") from e
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray, batch_size: int = 64) -> np.ndarray:
+        results = [
+            self.session.run(None, {self._input_name: batch[start:start + batch_size].astype(np.float32)})[0]
+            for start in range(0, len(batch), batch_size)
+        ]
+        return np.concatenate(results)
+
+
+def create_backend(name: str, model_path: str = "", num_threads: int = 0, fallback: bool = True):
+    """
+    Instantiate the named backend (loads its weights).
+    When an exported backend's model file is missing, the app falls back to
+    deepface with an error in the log; fallback=False raises instead.
+    """
+    if name in ("tflite", "onnx") and not os.path.isfile(model_path):
+        message = (
+            f"{name} emotion model {model_path!r} not found; export one with "
+            f"tools/export_emotion_model.py or point LEADFOCAL_EMOTION_MODEL at it"
+        )
+        if not fallback:
+            raise FileNotFoundError(message)
+        logger.error(f"[EMOTION] {message}. Falling back to the deepface backend")
+        return DeepFaceBackend()
+    if name == "deepface":
+        return DeepFaceBackend()
+    if name == "tflite":
+        return TFLiteBackend(model_path, num_threads)
+    if name == "onnx":
+        return OnnxBackend(model_path, num_threads)
+    raise ValueError(f"Unknown emotion backend {name!r}; expected one of {BACKENDS}")
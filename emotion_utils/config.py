@@ -1,6 +1,24 @@
+import os
+
 def get_config(): 
     return {
         "title": "AI Emotion Detector",
+        # Face detector: "haar" (OpenCV only, no TensorFlow) or a DeepFace backend: opencv, ssd, mtcnn, retinaface, ...
+        "detector_backend": os.environ.get("LEADFOCAL_FACE_DETECTOR", "opencv"),
+        # Face detection runs on a proxy whose longest side is at most this (0 = full resolution)
+        "detection_max_side": int(os.environ.get("LEADFOCAL_DETECTION_MAX_SIDE", "1280")),
+        # Emotion classifier runtime: deepface (Keras/TensorFlow), tflite or onnx (exported model file)
+        "emotion_backend": os.environ.get("LEADFOCAL_EMOTION_BACKEND", "deepface"),
+        "emotion_model_path": os.environ.get("LEADFOCAL_EMOTION_MODEL", "models/emotion_int8.tflite"),
+        "emotion_num_threads": int(os.environ.get("LEADFOCAL_EMOTION_THREADS", "0")),
+        # Video mode: frames analyzed per second of video, and how often (in sampled
+        # frames) faces are re-detected; in between, faces are followed by the tracker
+        "video_sample_fps": float(os.environ.get("LEADFOCAL_VIDEO_FPS", "2")),
+        "video_keyframe_interval": int(os.environ.get("LEADFOCAL_VIDEO_KEYFRAME_INTERVAL", "5")),
+        # Mean absolute change of a tracked 48x48 face (0-1) that triggers reclassification
+        "video_drift_threshold": float(os.environ.get("LEADFOCAL_VIDEO_DRIFT", "0.12")),
+        # Longest stretch of video analyzed per file (0 = whole file)
+        "video_max_seconds": float(os.environ.get("LEADFOCAL_VIDEO_MAX_SECONDS", "600")),
         "color_map": {
             "happy": (0, 255, 0),         # Green
             "neutral": (255, 255, 0),     # Yellow
@@ -1,39 +1,297 @@
-from deepface import DeepFace
+import logging
+import threading
+import time
 import cv2
 import numpy as np
+from emotion_utils.backends import create_backend
 from emotion_utils.config import get_config
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.tracing import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Output order of the DeepFace emotion model
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
 
 class EmotionDetector:
-    def __init__(self):
-        self.color_map = get_config()["color_map"]
+    def __init__(self, detector_backend=None, detection_max_side=None, emotion_backend=None,
+                 emotion_model_path=None):
+        config = get_config()
+        self.color_map = config["color_map"]
+        self.detector_backend = detector_backend or config["detector_backend"]
+        self.detection_max_side = (
+            config["detection_max_side"] if detection_max_side is None else detection_max_side
+        )
+        self.emotion_backend = emotion_backend or config["emotion_backend"]
+        self.emotion_model_path = emotion_model_path or config["emotion_model_path"]
+        self.emotion_num_threads = config["emotion_num_threads"]
+        self.ready = False
+        self.warm_up_seconds = None
+        self._warm_lock = threading.Lock()
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cascade = None
+        self._cascade_lock = threading.Lock()
+
+    def warm_up(self):
+        """
+        Load the emotion and face-detector weights and run one dummy inference.
+        Raises if either model fails to load; the detector is not marked ready then.
+        """
+        with self._warm_lock:
+            if self.ready:
+                return
+            start = time.perf_counter()
+            self._emotion_model().predict(np.zeros((1, 48, 48, 1), dtype=np.float32))
+            # The detect_emotions path without its error handling, so load failures surface here
+            dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+            faces = self._extract_faces(dummy)
+            if faces:
+                self._classify(np.stack([crop for crop, _ in faces]), len(faces))
+            self.warm_up_seconds = time.perf_counter() - start
+            self.ready = True
+            logger.info(f"[DETECTOR] Emotion detector warmed up in {self.warm_up_seconds:.1f}s")
+
+    def start_warm_up(self):
+        """Warm up on a background thread; poll is_ready() for completion"""
+        thread = threading.Thread(target=self._warm_up_in_background, name="emotion-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up_in_background(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            # is_ready() stays False, so readiness probes keep failing
+            logger.error(f"[DETECTOR] Warm-up failed: {e}")
+
+    def is_ready(self):
+        return self.ready
 
     def detect_emotions(self, img):
-        """Detect emotions using DeepFace"""
+        """Detect emotions using DeepFace (face detection, then one batched classification).
+        img is a BGR array or an ImageContext (which enables reduced-scale JPEG decoding)."""
         try:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            results = DeepFace.analyze(
-                img_path=img_rgb,
-                actions=['emotion'],
-                enforce_detection=False,
-                detector_backend='opencv',
-                silent=True
-            )
-            
-            detections = []
-            for result in results:
-                detections.append({
-                    "emotion": result['dominant_emotion'],
-                    "confidence": round(result['emotion'][result['dominant_emotion']], 2),
-                    "x": result['region']['x'],
-                    "y": result['region']['y'],
-                    "w": result['region']['w'],
-                    "h": result['region']['h']
-                })
-            return detections
+            return self.detect_emotions_batch([img])[0]
         except Exception as e:
             print(f"Detection error: {e}")
             return []
 
+    def detect_emotions_batch(self, images, batch_size=64):
+        """
+        Detect emotions in several images (BGR arrays or ImageContexts) at once.
+        Faces are detected per image, then every 48x48 face crop (across all
+        images) goes through the emotion model in batched forward passes.
+        Returns one detection list per image, in the detect_emotions format.
+        """
+        crops, owners, regions = [], [], []
+        for i, img in enumerate(images):
+            try:
+                for crop, region in self._extract_faces(img):
+                    crops.append(crop)
+                    owners.append(i)
+                    regions.append(region)
+            except Exception as e:
+                print(f"Face detection error on image {i}: {e}")
+
+        detections = [[] for _ in images]
+        if not crops:
+            return detections
+
+        probs = self._classify(np.stack(crops), batch_size)
+        for scores, i, region in zip(probs, owners, regions):
+            detections[i].append(self._to_detection(scores, region))
+        return detections
+
+    def detect_faces(self, img):
+        """
+        Face detection only: [(48x48 grayscale crop, region), ...] in original coordinates.
+        Unlike detect_emotions, frames without a face yield [] rather than DeepFace's
+        whole-image placeholder.
+        """
+        return self._extract_faces(img, keep_placeholder=False)
+
+    def classify_faces(self, crops, regions, batch_size=64):
+        """Emotion classification only, for crops from detect_faces or model_crop"""
+        if not len(crops):
+            return []
+        probs = self._classify(np.stack(crops), batch_size)
+        return [self._to_detection(scores, region) for scores, region in zip(probs, regions)]
+
+    def _prepare(self, img):
+        """Return (full-resolution BGR, detection proxy BGR, proxy->original scale)"""
+        if isinstance(img, ImageContext):
+            proxy, scale = img.proxy_bgr(self.detection_max_side)
+            return img.bgr, proxy, scale
+        height, width = img.shape[:2]
+        limit = self.detection_max_side
+        if not limit or max(height, width) <= limit:
+            return img, img, 1.0
+        ratio = limit / max(height, width)
+        proxy = cv2.resize(img, (max(1, int(width * ratio)), max(1, int(height * ratio))),
+                           interpolation=cv2.INTER_AREA)
+        return img, proxy, width / proxy.shape[1]
+
+    def _extract_faces(self, img, keep_placeholder=True):
+        """
+        Stage 1: detect faces on a bounded-size proxy; returns [(48x48 grayscale crop, region), ...]
+        in original-image coordinates. Crops always go through DeepFace.analyze's
+        preprocessing (alignment, resize-and-pad, channel order); when the proxy is
+        downscaled, each face is re-extracted from a full-resolution neighbourhood
+        of its box. With enforce_detection=False DeepFace returns
+        the whole image as a placeholder face when it finds none; keep_placeholder=False
+        drops it.
+        """
+        full, proxy, scale = self._prepare(img)
+        if self.detector_backend == "haar":
+            # OpenCV only: no TensorFlow import, no alignment
+            with span("face_detection", backend="haar"):
+                areas = self._haar_faces(proxy)
+            regions = [self._scale_region(area, scale, full.shape) for area in areas]
+            return [(self.model_crop(full, region), region) for region in regions]
+
+        # DeepFace pulls in TensorFlow; import it only when the first image arrives
+        from deepface import DeepFace
+
+        with span("face_detection", backend=self.detector_backend):
+            faces = DeepFace.extract_faces(
+                img_path=cv2.cvtColor(proxy, cv2.COLOR_BGR2RGB),
+                target_size=(224, 224),
+                detector_backend=self.detector_backend,
+                enforce_detection=False,
+                align=True
+            )
+        results = []
+        for face in faces:
+            if not keep_placeholder and self._is_placeholder(face, proxy.shape):
+                continue
+            if scale == 1.0:
+                results.append((self._face_gray(face["face"]), face["facial_area"]))
+                continue
+
+            region = self._scale_region(face["facial_area"], scale, full.shape)
+            results.append((self._aligned_crop(full, region), region))
+        return results
+
+    def _aligned_crop(self, full, region):
+        """Re-extract one proxy-detected face at full resolution, as DeepFace.analyze would"""
+        from deepface import DeepFace
+
+        x, y, w, h = region["x"], region["y"], region["w"], region["h"]
+        margin = max(w, h) // 2
+        x0, y0 = max(0, x - margin), max(0, y - margin)
+        x1, y1 = min(full.shape[1], x + w + margin), min(full.shape[0], y + h + margin)
+        patch = full[y0:y1, x0:x1]
+        with span("face_alignment"):
+            faces = DeepFace.extract_faces(
+                img_path=cv2.cvtColor(patch, cv2.COLOR_BGR2RGB),
+                target_size=(224, 224),
+                detector_backend=self.detector_backend,
+                enforce_detection=False,
+                align=True
+            )
+        cx, cy = x + w / 2 - x0, y + h / 2 - y0
+
+        def distance(face):
+            area = face["facial_area"]
+            return (area["x"] + area["w"] / 2 - cx) ** 2 + (area["y"] + area["h"] / 2 - cy) ** 2
+
+        real = [face for face in faces if not self._is_placeholder(face, patch.shape)]
+        if not real:
+            # Detector misses at full resolution: same resize-and-pad, no alignment
+            return self.model_crop(full, region)
+        return self._face_gray(min(real, key=distance)["face"])
+
+    @staticmethod
+    def _face_gray(face):
+        """DeepFace.extract_faces output -> the 48x48 gray input DeepFace.analyze gives the model"""
+        # extract_faces flips channel order on return; flip back so the grayscale
+        # conversion sees the same (RGB-ordered) buffer analyze converts
+        pixels = np.ascontiguousarray(face[:, :, ::-1], dtype=np.float32)
+        return cv2.resize(cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY), (48, 48))
+
+    @classmethod
+    def model_crop(cls, img, region, target_size=224):
+        """
+        Classifier input for a box of a BGR image without re-detection: DeepFace's
+        aspect-preserving resize and zero padding to 224x224, then _face_gray.
+        """
+        x, y, w, h = region["x"], region["y"], region["w"], region["h"]
+        face = cv2.cvtColor(img[y:y + h, x:x + w], cv2.COLOR_BGR2RGB)
+        factor = min(target_size / face.shape[0], target_size / face.shape[1])
+        face = cv2.resize(face, (max(1, int(face.shape[1] * factor)), max(1, int(face.shape[0] * factor))))
+        d0, d1 = target_size - face.shape[0], target_size - face.shape[1]
+        face = np.pad(face, ((d0 // 2, d0 - d0 // 2), (d1 // 2, d1 - d1 // 2), (0, 0)), "constant")
+        if face.shape[:2] != (target_size, target_size):
+            face = cv2.resize(face, (target_size, target_size))
+        # Same layout as extract_faces output: [0, 1], channel order flipped
+        return cls._face_gray(face[:, :, ::-1].astype(np.float32) / 255)
+
+    @staticmethod
+    def _is_placeholder(face, shape):
+        """DeepFace's stand-in when no face was found: zero confidence or the whole frame"""
+        area = face["facial_area"]
+        height, width = shape[:2]
+        whole_frame = area["x"] <= 0 and area["y"] <= 0 and area["w"] >= width and area["h"] >= height
+        return face.get("confidence", 1) == 0 or whole_frame
+
+    def _haar_faces(self, img):
+        """Frontal-face boxes from OpenCV's bundled Haar cascade (the one DeepFace's opencv backend uses)"""
+        with self._cascade_lock:
+            if self._cascade is None:
+                self._cascade = cv2.CascadeClassifier(
+                    cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+                )
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            boxes = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=10)
+        return [{"x": int(x), "y": int(y), "w": int(w), "h": int(h)} for x, y, w, h in boxes]
+
+    @staticmethod
+    def crop_face(img, region):
+        """Cheap 48x48 grayscale crop of a BGR image in [0, 1]; for comparing frames, not for the classifier"""
+        x, y, w, h = region["x"], region["y"], region["w"], region["h"]
+        crop = cv2.cvtColor(img[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+        return cv2.resize(crop, (48, 48), interpolation=cv2.INTER_AREA).astype(np.float32) / 255
+
+    @staticmethod
+    def _scale_region(region, scale, shape):
+        """Map a proxy-space box back to original coordinates, clipped to the image"""
+        height, width = shape[:2]
+        x = min(width - 1, max(0, int(round(region["x"] * scale))))
+        y = min(height - 1, max(0, int(round(region["y"] * scale))))
+        w = max(1, min(width - x, int(round(region["w"] * scale))))
+        h = max(1, min(height - y, int(round(region["h"] * scale))))
+        return {"x": x, "y": y, "w": w, "h": h}
+
+    def _emotion_model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = create_backend(
+                    self.emotion_backend, self.emotion_model_path, self.emotion_num_threads
+                )
+            return self._model
+
+    def _classify(self, crops, batch_size):
+        """Stage 2: batched forward pass over (N, 48, 48) crops; returns (N, 7) percentages"""
+        batch = crops[..., np.newaxis]
+        model = self._emotion_model()
+        with span("emotion", faces=len(crops)):
+            probs = model.predict(batch, batch_size=batch_size)
+        return 100 * probs / probs.sum(axis=1, keepdims=True)
+
+    def _to_detection(self, scores, region):
+        best = int(np.argmax(scores))
+        return {
+            "emotion": EMOTION_LABELS[best],
+            "confidence": round(float(scores[best]), 2),
+            "x": region['x'],
+            "y": region['y'],
+            "w": region['w'],
+            "h": region['h']
+        }
+
     def draw_detections(self, img, detections):
         """Draw detection boxes with labels"""
         output_img = img.copy()
@@ -55,3 +313,15 @@ class EmotionDetector:
                 0.8, color, 2
             )
         return output_img
+
+
+_shared_lock = threading.Lock()
+_shared_detector = None
+
+def get_shared_detector():
+    """One EmotionDetector per process, shared by every session and worker thread"""
+    global _shared_detector
+    with _shared_lock:
+        if _shared_detector is None:
+            _shared_detector = EmotionDetector()
+        return _shared_detector
@@ -0,0 +1,323 @@
+# emotion_utils/video.py
+"""
+Video mode: per-track emotion timelines without classifying every frame.
+
+Frames are streamed from disk with cv2.VideoCapture (skipped frames are only
+grabbed, never converted) and sampled at `sample_fps`. Faces are detected on
+keyframes only; in between, each face is followed by template matching in a
+small search window. The emotion model runs only for new tracks and for
+tracks whose face crop has drifted since it was last classified; all of those
+crops in a frame go through one batched forward pass.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from emotion_utils.config import get_config
+
+VIDEO_EXTENSIONS = ["mp4", "mov", "avi", "mkv", "webm"]
+
+# Tracking runs on a grayscale frame whose longest side is at most this
+TRACK_MAX_SIDE = 640
+# Normalized cross-correlation below which a tracked face counts as lost
+MIN_MATCH_SCORE = 0.5
+
+
+def spool_upload(fileobj, suffix=".mp4", chunk_size=1 << 20):
+    """Copy an uploaded file object to a temporary file in chunks; the caller removes it"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        shutil.copyfileobj(fileobj, tmp, chunk_size)
+        return tmp.name
+
+
+def iter_sampled_frames(path, sample_fps, max_seconds=0):
+    """
+    Yield (timestamp_seconds, bgr_frame) at roughly `sample_fps` frames per
+    second of video. Only one decoded frame is held at a time.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        step = 1.0 / sample_fps if sample_fps and sample_fps < fps else 0.0
+        next_t = 0.0
+        index = 0
+        while cap.grab():
+            t = index / fps
+            index += 1
+            if max_seconds and t > max_seconds:
+                break
+            if t + 1e-6 < next_t:
+                continue
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            next_t += step
+            yield t, frame
+    finally:
+        cap.release()
+
+
+def video_info(path):
+    """(fps, frame_count, duration_seconds) from the container header"""
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return fps, frames, frames / fps if frames else 0.0
+    finally:
+        cap.release()
+
+
+def iou(a, b):
+    """Intersection over union of two {x, y, w, h} boxes"""
+    x1, y1 = max(a["x"], b["x"]), max(a["y"], b["y"])
+    x2 = min(a["x"] + a["w"], b["x"] + b["w"])
+    y2 = min(a["y"] + a["h"], b["y"] + b["h"])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a["w"] * a["h"] + b["w"] * b["h"] - inter
+    return inter / union if union else 0.0
+
+
+class _Track:
+    def __init__(self, track_id, region, crop, t):
+        self.track_id = track_id
+        self.region = region
+        self.template = None     # grayscale patch in tracking space
+        self.reference = crop    # 48x48 crop at the last classification
+        self.label = None        # last detection dict from the emotion model
+        self.first_seen = t
+        self.last_seen = t
+        self.missed = 0
+        self.timeline = []
+
+
+class VideoEmotionAnalyzer:
+    """
+    Build per-track emotion timelines for a video file.
+    Face detection reruns every `keyframe_interval` sampled frames and the
+    emotion model only on new or drifting tracks.
+    """
+
+    def __init__(self, detector, sample_fps=None, keyframe_interval=None, drift_threshold=None,
+                 iou_threshold=0.3, max_missed=1):
+        config = get_config()
+        self.detector = detector
+        self.sample_fps = config["video_sample_fps"] if sample_fps is None else sample_fps
+        self.keyframe_interval = max(1, keyframe_interval or config["video_keyframe_interval"])
+        self.drift_threshold = config["video_drift_threshold"] if drift_threshold is None else drift_threshold
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+
+    def analyze(self, path, max_seconds=None, progress=None):
+        """
+        Returns {"fps", "duration", "frames_sampled", "keyframes", "classifications",
+        "tracks": [{"track_id", "first_seen", "last_seen", "dominant_emotion",
+        "timeline": [{"t", "emotion", "confidence", "x", "y", "w", "h"}, ...]}, ...]}.
+        `progress(fraction)` is called after every sampled frame when given.
+        """
+        if max_seconds is None:
+            max_seconds = get_config()["video_max_seconds"]
+        fps, _, duration = video_info(path)
+        if max_seconds:
+            duration = min(duration, max_seconds) if duration else max_seconds
+
+        active, finished = [], []
+        next_id = 0
+        sampled = keyframes = classifications = 0
+
+        for t, frame in iter_sampled_frames(path, self.sample_fps, max_seconds):
+            gray, track_scale = self._tracking_view(frame)
+
+            if sampled % self.keyframe_interval == 0:
+                keyframes += 1
+                faces = self.detector.detect_faces(frame)
+                matched = self._associate(active, faces)
+                for track in active:
+                    if track.track_id in matched:
+                        track.missed = 0
+                    else:
+                        track.missed += 1
+                finished.extend(tr for tr in active if tr.missed > self.max_missed)
+                active = [tr for tr in active if tr.missed <= self.max_missed]
+                for i, (crop, region) in enumerate(faces):
+                    if i not in matched.values():
+                        active.append(_Track(next_id, region, crop, t))
+                        next_id += 1
+            else:
+                for track in active:
+                    if self._follow(track, gray, track_scale, frame.shape):
+                        # Found again: a keyframe miss must not hide it until the next keyframe
+                        track.missed = 0
+                    else:
+                        track.missed += 1
+                finished.extend(tr for tr in active if tr.missed > self.max_missed)
+                active = [tr for tr in active if tr.missed <= self.max_missed]
+
+            classifications += self._update_labels(active, frame)
+            for track in active:
+                if track.missed == 0:
+                    self._update_template(track, gray, track_scale)
+                    track.last_seen = t
+                    track.timeline.append(dict(track.label, t=round(t, 3), **track.region))
+
+            sampled += 1
+            if progress is not None and duration:
+                progress(min(1.0, t / duration))
+
+        tracks = [tr for tr in finished + active if tr.timeline]
+        tracks.sort(key=lambda tr: tr.track_id)
+        return {
+            "fps": fps,
+            "duration": duration,
+            "frames_sampled": sampled,
+            "keyframes": keyframes,
+            "classifications": classifications,
+            "tracks": [self._summary(tr) for tr in tracks],
+        }
+
+    def _associate(self, tracks, faces):
+        """Greedy IoU matching of detections to tracks; returns {track_id: face index}"""
+        pairs = []
+        for track in tracks:
+            for i, (_, region) in enumerate(faces):
+                overlap = iou(track.region, region)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, track, i))
+        pairs.sort(key=lambda p: p[0], reverse=True)
+
+        matched, used = {}, set()
+        for _, track, i in pairs:
+            if track.track_id in matched or i in used:
+                continue
+            matched[track.track_id] = i
+            used.add(i)
+            track.region = faces[i][1]
+        return matched
+
+    @staticmethod
+    def _tracking_view(frame):
+        """Grayscale, downscaled copy of the frame for template matching"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        if max(height, width) <= TRACK_MAX_SIDE:
+            return gray, 1.0
+        ratio = TRACK_MAX_SIDE / max(height, width)
+        gray = cv2.resize(gray, (max(1, int(width * ratio)), max(1, int(height * ratio))),
+                          interpolation=cv2.INTER_AREA)
+        return gray, ratio
+
+    @staticmethod
+    def _to_track_space(region, scale, shape):
+        height, width = shape[:2]
+        x = min(width - 1, max(0, int(region["x"] * scale)))
+        y = min(height - 1, max(0, int(region["y"] * scale)))
+        w = max(1, min(width - x, int(region["w"] * scale)))
+        h = max(1, min(height - y, int(region["h"] * scale)))
+        return x, y, w, h
+
+    def _update_template(self, track, gray, scale):
+        x, y, w, h = self._to_track_space(track.region, scale, gray.shape)
+        track.template = gray[y:y + h, x:x + w].copy()
+
+    def _follow(self, track, gray, scale, frame_shape):
+        """Move the track to the best template match near its last position"""
+        if track.template is None or min(track.template.shape) < 4:
+            return False
+        x, y, w, h = self._to_track_space(track.region, scale, gray.shape)
+        pad_x, pad_y = max(8, w // 2), max(8, h // 2)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+        window = gray[y0:y1, x0:x1]
+        th, tw = track.template.shape
+        if window.shape[0] < th or window.shape[1] < tw:
+            return False
+
+        scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best < MIN_MATCH_SCORE:
+            return False
+
+        height, width = frame_shape[:2]
+        nx = min(width - 1, max(0, int(round((x0 + bx) / scale))))
+        ny = min(height - 1, max(0, int(round((y0 + by) / scale))))
+        track.region = {
+            "x": nx,
+            "y": ny,
+            "w": max(1, min(width - nx, track.region["w"])),
+            "h": max(1, min(height - ny, track.region["h"])),
+        }
+        return True
+
+    def _update_labels(self, tracks, frame):
+        """Classify new and drifting tracks in one batch; returns how many were classified"""
+        todo, crops, references = [], [], []
+        for track in tracks:
+            if track.missed:
+                continue
+            crop = self.detector.crop_face(frame, track.region)
+            if track.label is None:
+                # New track: classify the detector's own (aligned) crop
+                todo.append(track)
+                crops.append(track.reference)
+                references.append(crop)
+            elif float(np.abs(crop - track.reference).mean()) > self.drift_threshold:
+                todo.append(track)
+                crops.append(self.detector.model_crop(frame, track.region))
+                references.append(crop)
+        if not todo:
+            return 0
+        results = self.detector.classify_faces(crops, [tr.region for tr in todo])
+        for track, crop, det in zip(todo, references, results):
+            track.reference = crop
+            track.label = {"emotion": det["emotion"], "confidence": det["confidence"]}
+        return len(todo)
+
+    @staticmethod
+    def _summary(track):
+        counts = {}
+        for point in track.timeline:
+            counts[point["emotion"]] = counts.get(point["emotion"], 0) + 1
+        return {
+            "track_id": track.track_id,
+            "first_seen": round(track.first_seen, 3),
+            "last_seen": round(track.last_seen, 3),
+            "dominant_emotion": max(counts, key=counts.get),
+            "timeline": track.timeline,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-face emotion timelines for a video file")
+    parser.add_argument("video")
+    parser.add_argument("--fps", type=float, help="sampled frames per second of video")
+    parser.add_argument("--keyframe-interval", type=int, help="sampled frames between face detections")
+    parser.add_argument("--max-seconds", type=float, help="analyze at most this much video (0 = all)")
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    args = parser.parse_args(argv)
+
+    from emotion_utils.detector import get_shared_detector
+
+    analyzer = VideoEmotionAnalyzer(get_shared_detector(), sample_fps=args.fps,
+                                    keyframe_interval=args.keyframe_interval)
+    result = analyzer.analyze(args.video, max_seconds=args.max_seconds)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
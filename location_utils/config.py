@@ -0,0 +1,41 @@
+# location_utils/config.py
+import os
+
+
+def get_config():
+    return {
+        # CLIP landmark model
+        "clip_model_name": os.environ.get("LEADFOCAL_CLIP_MODEL", "openai/clip-vit-base-patch32"),
+        # CPU inference mode: "float", "int8" (dynamic quantization) or "torchscript" (traced vision encoder)
+        "clip_inference_mode": os.environ.get("LEADFOCAL_CLIP_MODE", "float"),
+        # torch intra-op / inter-op thread counts (0 = torch default)
+        "clip_num_threads": int(os.environ.get("LEADFOCAL_CLIP_THREADS", "0")),
+        "clip_interop_threads": int(os.environ.get("LEADFOCAL_CLIP_INTEROP_THREADS", "0")),
+
+        # Directory for on-disk caches (text embeddings, etc.)
+        "cache_dir": os.environ.get("LEADFOCAL_CACHE_DIR", ".cache"),
+
+        # Reverse-geocoding cache
+        "geocode_cache_enabled": os.environ.get("LEADFOCAL_GEOCODE_CACHE", "1") == "1",
+        "geocode_precision": int(os.environ.get("LEADFOCAL_GEOCODE_PRECISION", "4")),  # ~11 m
+        "geocode_cache_ttl_days": float(os.environ.get("LEADFOCAL_GEOCODE_TTL_DAYS", "30")),
+        "geocode_memory_entries": int(os.environ.get("LEADFOCAL_GEOCODE_MEMORY_ENTRIES", "2048")),
+        "geocode_deadline_seconds": float(os.environ.get("LEADFOCAL_GEOCODE_DEADLINE", "15")),
+
+        # "online" (Nominatim), "offline" (local gazetteer) or "auto" (online, gazetteer on failure)
+        "geocoder_mode": os.environ.get("LEADFOCAL_GEOCODER_MODE", "auto"),
+        "gazetteer_path": os.environ.get("LEADFOCAL_GAZETTEER", "data/gazetteer.csv"),
+        "offline_max_distance_km": float(os.environ.get("LEADFOCAL_OFFLINE_MAX_KM", "50")),
+
+        # Local landmark/POI index consulted before Overpass
+        "landmark_index_path": os.environ.get("LEADFOCAL_LANDMARK_INDEX", "data/landmarks.csv"),
+        "landmark_fuzzy_cutoff": float(os.environ.get("LEADFOCAL_LANDMARK_FUZZY_CUTOFF", "0.85")),
+        "overpass_enabled": os.environ.get("LEADFOCAL_OVERPASS", "1") == "1",
+
+        # External CLIP landmark catalog (CSV/JSON/JSONL); empty = the built-in keywords
+        "landmark_catalog_path": os.environ.get("LEADFOCAL_LANDMARK_CATALOG", ""),
+        # Only match catalog entries in these regions/countries (comma-separated) or "bbox:lat0,lon0,lat1,lon1"
+        "landmark_region": os.environ.get("LEADFOCAL_LANDMARK_REGION", ""),
+        # Catalog rows scored per chunk during matching (bounds peak memory)
+        "landmark_search_chunk": int(os.environ.get("LEADFOCAL_LANDMARK_CHUNK", "8192")),
+    }
@@ -0,0 +1,152 @@
+# location_utils/exif_fast.py
+"""
+GPS-only EXIF reader for JPEGs.
+
+Walks the JPEG marker segments up to the first APP1 "Exif" block (skipping
+every other segment with a seek), then follows IFD0 to the GPS IFD and
+decodes just those entries. Pixel data, thumbnails and all non-GPS tags are
+never read or decoded. Anything that is not a JPEG with a well-formed EXIF
+block raises ValueError so the caller can fall back to PIL.
+"""
+import io
+import struct
+from typing import Optional
+
+from PIL.ExifTags import GPSTAGS
+
+GPS_IFD_TAG = 0x8825
+
+# TIFF field type -> (struct code, size in bytes)
+_TYPES = {
+    1: ("B", 1),   # BYTE
+    2: ("s", 1),   # ASCII
+    3: ("H", 2),   # SHORT
+    4: ("L", 4),   # LONG
+    5: ("LL", 8),  # RATIONAL
+    6: ("b", 1),   # SBYTE
+    7: ("s", 1),   # UNDEFINED
+    8: ("h", 2),   # SSHORT
+    9: ("l", 4),   # SLONG
+    10: ("ll", 8), # SRATIONAL
+    11: ("f", 4),  # FLOAT
+    12: ("d", 8),  # DOUBLE
+    13: ("L", 4),  # IFD (some writers type the GPS IFD pointer this way)
+}
+
+# Markers without a length field
+_STANDALONE = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+
+def _exif_payload(f) -> Optional[bytes]:
+    """Return the TIFF block of the first APP1 Exif segment, or None if there is none"""
+    if f.read(2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            raise ValueError("corrupt JPEG marker")
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE:
+            continue
+        if code in (0xD9, 0xDA):  # end of image / start of scan: no EXIF before the pixels
+            return None
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0]
+        if length < 2:
+            raise ValueError("corrupt JPEG segment length")
+        if code == 0xE1:
+            payload = f.read(length - 2)
+            if payload.startswith(b"Exif\x00\x00"):
+                return payload[6:]
+            # e.g. an XMP packet; keep looking
+        else:
+            f.seek(length - 2, io.SEEK_CUR)
+
+
+def _read_value(tiff: bytes, order: str, field_type: int, count: int, value_offset: int):
+    if field_type not in _TYPES:
+        raise ValueError(f"unsupported EXIF field type {field_type}")
+    code, size = _TYPES[field_type]
+    total = size * count
+    if total > 4:
+        value_offset = struct.unpack_from(order + "L", tiff, value_offset)[0]
+    if value_offset + total > len(tiff):
+        raise ValueError("EXIF value out of range")
+
+    if field_type in (1, 2, 7):
+        # BYTE and UNDEFINED stay raw bytes, as PIL returns them (e.g. GPSVersionID)
+        raw = tiff[value_offset:value_offset + count]
+        return raw.split(b"\x00", 1)[0].decode("ascii", "replace").strip() if field_type == 2 else raw
+
+    values = struct.unpack_from(f"{order}{count * len(code)}{code[0]}", tiff, value_offset)
+    if field_type in (5, 10):
+        values = tuple(
+            num / den if den else float("nan")
+            for num, den in zip(values[0::2], values[1::2])
+        )
+    return values[0] if count == 1 else tuple(values)
+
+
+def _ifd_entries(tiff: bytes, order: str, offset: int):
+    """Yield (tag, type, count, value_offset) for one IFD"""
+    count = struct.unpack_from(order + "H", tiff, offset)[0]
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, field_type, n = struct.unpack_from(order + "HHL", tiff, entry)
+        yield tag, field_type, n, entry + 8
+
+
+def parse_gps_ifd(tiff: bytes) -> Optional[dict]:
+    """Decode the GPS IFD of a TIFF/EXIF block into {GPSTAGS name: value}"""
+    try:
+        if tiff[:2] == b"II":
+            order = "<"
+        elif tiff[:2] == b"MM":
+            order = ">"
+        else:
+            raise ValueError("bad TIFF byte order")
+        if struct.unpack_from(order + "H", tiff, 2)[0] != 42:
+            raise ValueError("bad TIFF magic")
+        ifd0 = struct.unpack_from(order + "L", tiff, 4)[0]
+
+        gps_offset = None
+        for tag, field_type, count, value_offset in _ifd_entries(tiff, order, ifd0):
+            if tag == GPS_IFD_TAG:
+                gps_offset = _read_value(tiff, order, field_type, 1, value_offset)
+                break
+        if not gps_offset:
+            return None
+
+        gps = {}
+        for tag, field_type, count, value_offset in _ifd_entries(tiff, order, gps_offset):
+            if field_type not in _TYPES or count == 0:
+                continue
+            gps[GPSTAGS.get(tag, tag)] = _read_value(tiff, order, field_type, count, value_offset)
+        return gps or None
+    except struct.error as e:
+        raise ValueError(f"truncated EXIF block: {e}") from e
+
+
+def read_gps(source) -> Optional[dict]:
+    """
+    GPS tags of a JPEG file path or bytes, in the same form as
+    extract_gps (names from GPSTAGS, rationals as floats); None if the
+    image has no GPS block. Raises ValueError for non-JPEG or malformed data.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        tiff = _exif_payload(io.BytesIO(source))
+    else:
+        with open(source, "rb") as f:
+            tiff = _exif_payload(f)
+    if tiff is None:
+        return None
+    return parse_gps_ifd(tiff)
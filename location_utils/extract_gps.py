@@ -1,35 +1,57 @@
 # location_utils/extract_gps.py
+import io
 import logging
+import numpy as np
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
+from location_utils.exif_fast import read_gps
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@traced("exif")
 def extract_gps(image_path):
-    """Extract GPS information from image EXIF data"""
+    """Extract GPS information from image EXIF data.
+    Accepts a file path, raw bytes or an ImageContext.
+    JPEGs take the header-only fast path; other formats go through PIL."""
     try:
-       
-        image = Image.open(image_path)
-        exif = image.getexif() or {}
+        source = image_path.data if isinstance(image_path, ImageContext) else image_path
+        try:
+            gps_info = read_gps(source)
+            logger.debug(f"[EXIF] GPS data keys: {list(gps_info) if gps_info else None}")
+            return gps_info
+        except (ValueError, KeyError, IndexError):
+            pass  # not a JPEG, or an EXIF layout the fast reader does not handle
+
+        if isinstance(image_path, ImageContext):
+            exif = image_path.exif or {}
+        elif isinstance(image_path, (bytes, bytearray, memoryview)):
+            exif = Image.open(io.BytesIO(image_path)).getexif() or {}
+        else:
+            exif = Image.open(image_path).getexif() or {}
         if not exif:
-            logger.info("[EXIF] No EXIF data found")
+            logger.debug("[EXIF] No EXIF data found")
             return None
 
         gps_info = {}
         for tag_id, value in exif.items():
             tag = TAGS.get(tag_id)
-            if tag == "GPSInfo" and isinstance(value, dict):
+            if tag == "GPSInfo":
+                # Image.Exif holds the GPS IFD as an offset; get_ifd decodes it
+                if not isinstance(value, dict):
+                    value = exif.get_ifd(tag_id) if hasattr(exif, "get_ifd") else {}
                 for key, val in value.items():
                     decoded = GPSTAGS.get(key, key)
                     gps_info[decoded] = val
 
         if gps_info:
-            logger.info(f"[EXIF] GPS data keys: {list(gps_info.keys())}")
+            logger.debug(f"[EXIF] GPS data keys: {list(gps_info.keys())}")
             return gps_info
         else:
-            logger.info("[EXIF] No GPSInfo field in EXIF data")
+            logger.debug("[EXIF] No GPSInfo field in EXIF data")
             return None
 
     except Exception as e:
@@ -99,24 +121,63 @@ def convert_gps(gps_info):
         required = ["GPSLatitude", "GPSLatitudeRef", "GPSLongitude", "GPSLongitudeRef"]
         missing = [k for k in required if k not in gps_info]
         if missing:
-            logger.info(f"[CONVERT] Missing GPS fields: {missing}")
+            logger.debug(f"[CONVERT] Missing GPS fields: {missing}")
             return None
         
         lat = _safe_convert(gps_info["GPSLatitude"], gps_info["GPSLatitudeRef"])
         lon = _safe_convert(gps_info["GPSLongitude"], gps_info["GPSLongitudeRef"])
         
         if lat is None or lon is None:
-            logger.info("[CONVERT] Failed to convert coordinates")
+            logger.debug("[CONVERT] Failed to convert coordinates")
             return None
             
         # Validate coordinate ranges
         if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
-            logger.info(f"[CONVERT] Invalid coordinates: lat={lat}, lon={lon}")
+            logger.debug(f"[CONVERT] Invalid coordinates: lat={lat}, lon={lon}")
             return None
             
-        logger.info(f"[CONVERT] Success: lat={lat:.6f}, lon={lon:.6f}")
+        logger.debug(f"[CONVERT] Success: lat={lat:.6f}, lon={lon:.6f}")
         return (round(lat, 6), round(lon, 6))
         
     except Exception as e:
         logger.error(f"[CONVERT ERROR] {e}")
         return None
+
+
+def _dms_components(value):
+    """(degrees, minutes, seconds) of one GPS coordinate in any form convert_gps accepts"""
+    if isinstance(value, (int, float)):
+        return float(value), 0.0, 0.0
+    parts = [p[0] / p[1] if isinstance(p, tuple) and len(p) == 2 else float(p) for p in value]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError("unsupported coordinate")
+    return tuple(parts) + (0.0,) * (3 - len(parts))
+
+
+def convert_gps_bulk(gps_infos):
+    """
+    Vectorized convert_gps: turn a sequence of GPS dicts into an (N, 2) float
+    array of decimal (lat, lon), rounded to 6 places. Rows that convert_gps
+    would reject (missing fields, bad values, out of range) are NaN.
+    """
+    n = len(gps_infos)
+    dms = np.full((n, 2, 3), np.nan)
+    positive = np.ones((n, 2), dtype=bool)
+    for i, info in enumerate(gps_infos):
+        try:
+            dms[i, 0] = _dms_components(info["GPSLatitude"])
+            dms[i, 1] = _dms_components(info["GPSLongitude"])
+            positive[i] = (info["GPSLatitudeRef"] in ("N", "E"), info["GPSLongitudeRef"] in ("N", "E"))
+        except Exception:
+            dms[i] = np.nan  # missing key, None or malformed value
+
+    coords = dms @ np.array([1.0, 1 / 60, 1 / 3600])
+    coords = np.where(positive, coords, -coords)
+    valid = (np.abs(coords[:, 0]) <= 90) & (np.abs(coords[:, 1]) <= 180)
+    coords[~valid] = np.nan
+    return np.round(coords, 6)
+
+
+def extract_coords_bulk(images):
+    """(N, 2) decimal lat/lon for many image paths or byte strings; NaN where there is no GPS"""
+    return convert_gps_bulk([extract_gps(image) or {} for image in images])
@@ -0,0 +1,122 @@
+# location_utils/geocode_cache.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCache:
+    """
+    Persistent reverse-geocoding cache.
+    Keys are (lat, lon) rounded to `precision` decimals plus the language.
+    A bounded in-memory LRU sits in front of an SQLite table; entries older
+    than `ttl_seconds` are treated as misses.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        precision: int = 4,
+        ttl_seconds: float = 30 * 24 * 3600,
+        max_memory_entries: int = 2048
+    ):
+        self.path = path
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY,"
+            " address TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def make_key(self, coords: Tuple[float, float], language: str) -> str:
+        lat, lon = coords
+        p = self.precision
+        return f"{round(float(lat), p):.{p}f},{round(float(lon), p):.{p}f}|{language}"
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, coords: Tuple[float, float], language: str = "en") -> Optional[str]:
+        key = self.make_key(coords, language)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            try:
+                row = self._conn.execute(
+                    "SELECT address, created FROM geocode WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"[GEOCACHE] Read failed: {e}")
+                row = None
+
+            if row is None or self._expired(row[1]):
+                self.misses += 1
+                return None
+
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            return row[0]
+
+    def set(self, coords: Tuple[float, float], language: str, address: str):
+        key = self.make_key(coords, language)
+        created = time.time()
+        with self._lock:
+            self._remember(key, address, created)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocode (key, address, created) VALUES (?, ?, ?)",
+                    (key, address, created)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[GEOCACHE] Write failed: {e}")
+
+    def _remember(self, key: str, address: str, created: float):
+        self._memory[key] = (address, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from disk; returns the number removed"""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM geocode WHERE created < ?", (cutoff,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
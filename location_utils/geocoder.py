@@ -1,47 +1,261 @@
 # location_utils/geocoder.py
 
+import asyncio
+import csv
 import logging
+import os
+import random
+import threading
 import time
-from typing import Tuple
+from concurrent.futures import Future
+from typing import Optional, Tuple
 
 from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+
+from location_utils.config import get_config
+from location_utils.geocode_cache import GeocodeCache
+from location_utils.offline_geocoder import OfflineGeocoder
+from pipeline_utils.tracing import record_cache, traced
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize geocoder with rate limiting
+# Initialize geocoder
 geolocator = Nominatim(
     user_agent="geoai_app_v2",
     timeout=10
 )
-reverse_geocode = RateLimiter(
-    geolocator.reverse,
-    min_delay_seconds=1
-)
 
+# Nominatim allows one request per second; shared by the sync and async clients
+MIN_DELAY_SECONDS = 1.0
+_rate_lock = threading.Lock()
+_next_slot = 0.0
+
+
+def _reserve_slot(deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Reserve the next request slot; returns how long the caller must wait for it.
+    If the slot would start at or after `deadline` (a time.monotonic() value)
+    nothing is reserved and None is returned, so callers that give up do not
+    push back everyone queued behind them.
+    """
+    global _next_slot
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, _next_slot)
+        if deadline is not None and slot >= deadline:
+            return None
+        _next_slot = slot + MIN_DELAY_SECONDS
+        return slot - now
+
+
+def _backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[GeocodeCache] = None
+
+
+def get_geocode_cache() -> Optional[GeocodeCache]:
+    """Return the process-wide geocode cache, or None if caching is disabled"""
+    global _cache
+    cfg = get_config()
+    if not cfg["geocode_cache_enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache(
+                os.path.join(cfg["cache_dir"], "geocode.sqlite"),
+                precision=cfg["geocode_precision"],
+                ttl_seconds=cfg["geocode_cache_ttl_days"] * 24 * 3600,
+                max_memory_entries=cfg["geocode_memory_entries"]
+            )
+        return _cache
+
+
+_offline_lock = threading.Lock()
+_offline: Optional[OfflineGeocoder] = None
+_offline_failed = False
+
+
+def get_offline_geocoder() -> Optional[OfflineGeocoder]:
+    """Return the gazetteer-backed geocoder, or None if no gazetteer file is available"""
+    global _offline, _offline_failed
+    with _offline_lock:
+        if _offline is None and not _offline_failed:
+            cfg = get_config()
+            try:
+                _offline = OfflineGeocoder(
+                    cfg["gazetteer_path"],
+                    max_distance_km=cfg["offline_max_distance_km"]
+                )
+            except (OSError, ValueError, AttributeError, csv.Error) as e:
+                logger.warning(f"[GEOCODER] Offline gazetteer unavailable ({e}); build it with tools/build_gazetteer.py")
+                _offline_failed = True
+        return _offline
+
+
+def _address_from_location(location) -> str:
+    if location and location.address:
+        logger.info(f"[GEOCODER] Success: {location.address}")
+        return location.address
+    logger.info("[GEOCODER] No location found")
+    return "Unknown location"
+
+
+def _from_cache(coords: Tuple[float, float], language: str) -> Optional[str]:
+    cache = get_geocode_cache()
+    if cache is None:
+        return None
+    cached = cache.get(coords, language)
+    record_cache("geocode", cached is not None)
+    if cached is not None:
+        logger.info(f"[GEOCODER] Cache hit: {cached}")
+    return cached
+
+
+def _to_cache(coords: Tuple[float, float], language: str, address: str):
+    cache = get_geocode_cache()
+    if cache is not None:
+        cache.set(coords, language, address)
+
+
+class FallbackAddress(str):
+    """
+    An address answered by the offline gazetteer because the online service
+    failed (auto mode). It reads like any other address, but callers that
+    persist results should not keep it: the service may answer next time.
+    """
+
+
+def _unavailable(coords: Tuple[float, float], mode: str) -> str:
+    logger.error(f"[GEOCODER] All geocoding attempts failed for {coords}")
+    if mode == "auto":
+        offline = get_offline_geocoder()
+        if offline is not None:
+            logger.info("[GEOCODER] Falling back to offline gazetteer")
+            return FallbackAddress(offline.reverse(coords))
+    return "Geocoding service unavailable"
+
+
+@traced("geocode")
 def get_address_from_coords(
     coords: Tuple[float, float],
-    language: str = "en"
+    language: str = "en",
+    mode: Optional[str] = None,
+    deadline: Optional[float] = None
 ) -> str:
     """
     Reverse-geocode a (lat, lon) tuple into a human-readable address.
-    Retries up to 3 times on transient errors.
+    mode: "online", "offline" or "auto" (default from config). Offline mode
+    answers from the local gazetteer; online mode uses the geocode cache and
+    then Nominatim, retrying with jittered backoff. Auto falls back to the
+    gazetteer when the online service is unavailable.
+    Blocking wrapper around get_address_async: returns within `deadline`
+    seconds (default from config) however slow Nominatim is.
+    """
+    mode = mode or get_config()["geocoder_mode"]
+    if mode == "offline":
+        offline = get_offline_geocoder()
+        return offline.reverse(coords) if offline else "Unknown location"
+
+    deadline = deadline if deadline is not None else get_config()["geocode_deadline_seconds"]
+    future = start_address_lookup(coords, language=language, mode=mode, deadline=deadline)
+    try:
+        # The coroutine enforces the deadline; the margin only covers scheduling
+        return future.result(timeout=deadline + 1)
+    except Exception as e:
+        future.cancel()
+        logger.warning(f"[GEOCODER] Lookup for {coords} did not finish: {e}")
+        return _unavailable(coords, mode)
+
+
+async def get_address_async(
+    coords: Tuple[float, float],
+    language: str = "en",
+    mode: Optional[str] = None,
+    deadline: Optional[float] = None,
+    max_attempts: int = 4
+) -> str:
     """
-    for attempt in range(3):
+    Asyncio version of get_address_from_coords.
+    Retries with jittered exponential backoff, but never runs past `deadline`
+    seconds in total (default from config); the event loop is never blocked.
+    """
+    cfg = get_config()
+    mode = mode or cfg["geocoder_mode"]
+    if mode == "offline":
+        offline = get_offline_geocoder()
+        return offline.reverse(coords) if offline else "Unknown location"
+
+    cached = _from_cache(coords, language)
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_running_loop()
+    budget = deadline if deadline is not None else cfg["geocode_deadline_seconds"]
+    end = loop.time() + budget
+    # The rate limiter runs on time.monotonic(), which need not match the loop clock
+    slot_deadline = time.monotonic() + budget
+
+    for attempt in range(max_attempts):
+        wait = _reserve_slot(slot_deadline)
+        if wait is None:
+            logger.warning("[GEOCODER] Deadline reached while waiting for a rate-limit slot")
+            break
+        await asyncio.sleep(wait)
         try:
-            location = reverse_geocode(coords, language=language)
-            if location and location.address:
-                logger.info(f"[GEOCODER] Success: {location.address}")
-                return location.address
-            else:
-                logger.info("[GEOCODER] No location found")
-                return "Unknown location"
+            location = await asyncio.wait_for(
+                asyncio.to_thread(geolocator.reverse, coords, language=language),
+                timeout=end - loop.time()
+            )
+            address = _address_from_location(location)
+            _to_cache(coords, language, address)
+            return address
+        except asyncio.TimeoutError:
+            logger.warning(f"[GEOCODER] Deadline reached on attempt {attempt+1}")
+            break
         except Exception as e:
             logger.warning(f"[GEOCODER] Attempt {attempt+1} failed: {e}")
-            if attempt < 2:
-                time.sleep(2)
 
-    logger.error(f"[GEOCODER] All geocoding attempts failed for {coords}")
-    return "Geocoding service unavailable"
+        delay = _backoff_delay(attempt)
+        if loop.time() + delay >= end:
+            break
+        await asyncio.sleep(delay)
+
+    return _unavailable(coords, mode)
+
+
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running in a daemon thread, shared by all background lookups"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="geocoder-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def start_address_lookup(
+    coords: Tuple[float, float],
+    language: str = "en",
+    mode: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> Future:
+    """
+    Start reverse geocoding in the background and return immediately.
+    Call .result() on the returned future to join the address later.
+    """
+    return asyncio.run_coroutine_threadsafe(
+        get_address_async(coords, language=language, mode=mode, deadline=deadline),
+        _background_loop()
+    )
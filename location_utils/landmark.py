@@ -1,25 +1,180 @@
 # location_utils/landmark.py
+import io
 import logging
-from typing import Optional,Tuple  
-import streamlit as st
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
 import requests
-from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
-import torch
+import numpy as np
+from location_utils.config import get_config
+from location_utils.landmark_catalog import LandmarkCatalog
+from location_utils.landmark_index import LandmarkIndex
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.tracing import record_cache, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@st.cache_resource  
+# torch/transformers and the CLIP weights are only loaded on first use
+_clip_lock = threading.RLock()
+_clip_state = {}
+
+
+CLIP_MODES = ("float", "int8", "torchscript")
+
+
+def set_torch_threads(num_threads: int = 0, interop_threads: int = 0):
+    """Apply torch CPU thread counts (0 keeps torch's default)"""
+    import torch
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if interop_threads > 0:
+        try:
+            torch.set_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only allowed before the first parallel op in the process
+            logger.warning(f"[CLIP] Could not set inter-op threads: {e}")
+
+
+def _vision_encoder_cache_path(model_name: str) -> str:
+    import torch
+
+    model_tag = model_name.replace("/", "_")
+    torch_tag = torch.__version__.replace("+", "_")
+    return os.path.join(get_config()["cache_dir"], f"clip_vision_{model_tag}_torch{torch_tag}.pt")
+
+
+def _trace_vision_encoder(model, model_name: str):
+    """TorchScript vision tower + projection (pixel_values -> image embeddings), cached on disk"""
+    import torch
+
+    path = _vision_encoder_cache_path(model_name)
+    if os.path.exists(path):
+        try:
+            return torch.jit.load(path, map_location="cpu")
+        except Exception as e:
+            logger.warning(f"[CLIP] Failed to load traced encoder {path}: {e}")
+
+    class VisionEncoder(torch.nn.Module):
+        def __init__(self, clip_model):
+            super().__init__()
+            self.vision_model = clip_model.vision_model
+            self.visual_projection = clip_model.visual_projection
+
+        def forward(self, pixel_values):
+            pooled = self.vision_model(pixel_values=pixel_values, return_dict=False)[1]
+            return self.visual_projection(pooled)
+
+    size = model.config.vision_config.image_size
+    example = torch.zeros(2, 3, size, size)
+    with torch.no_grad():
+        encoder = torch.jit.trace(VisionEncoder(model).eval(), example, check_trace=False)
+        encoder = torch.jit.optimize_for_inference(torch.jit.freeze(encoder))
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.jit.save(encoder, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"[CLIP] Failed to write {path}: {e}")
+    return encoder
+
+
+def build_clip(model_name: str, mode: str = "float"):
+    """
+    Load CLIP for CPU inference in the given mode; returns (processor, model, vision_encoder).
+      float       - the checkpoint as is
+      int8        - Linear layers dynamically quantized to int8 (smaller, faster matmuls)
+      torchscript - frozen, traced vision encoder; vision_encoder is None in the other modes
+    """
+    from transformers import CLIPProcessor, CLIPModel
+
+    if mode not in CLIP_MODES:
+        raise ValueError(f"Unknown CLIP inference mode {mode!r}; expected one of {CLIP_MODES}")
+    processor = CLIPProcessor.from_pretrained(model_name)
+    model, encoder = apply_clip_mode(CLIPModel.from_pretrained(model_name).eval(), model_name, mode)
+    return processor, model, encoder
+
+
+def apply_clip_mode(model, model_name: str, mode: str):
+    """Convert a loaded float CLIPModel (in place) for an inference mode; returns (model, vision_encoder)"""
+    import torch
+
+    encoder = None
+    if mode == "int8":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    elif mode == "torchscript":
+        encoder = _trace_vision_encoder(model, model_name)
+    return model, encoder
+
+
 def load_models():
-    logger.info("Loading CLIP processor and model...")  
-    processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-    model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-    return processor, model
+    """Load the CLIP processor and model once per process (first call pays the import cost)"""
+    with _clip_lock:
+        if "model" not in _clip_state:
+            cfg = get_config()
+            logger.info(f"Loading CLIP processor and model ({cfg['clip_inference_mode']})...")
+            set_torch_threads(cfg["clip_num_threads"], cfg["clip_interop_threads"])
+            with span("clip_load"):
+                processor, model, encoder = build_clip(cfg["clip_model_name"], cfg["clip_inference_mode"])
+            _clip_state["processor"] = processor
+            _clip_state["model"] = model
+            _clip_state["vision_encoder"] = encoder
+        return _clip_state["processor"], _clip_state["model"]
+
+
+def build_catalog() -> LandmarkCatalog:
+    """A fresh (embedding-less) catalog: LEADFOCAL_LANDMARK_CATALOG if set, else the built-in keywords"""
+    path = get_config()["landmark_catalog_path"]
+    if path and os.path.exists(path):
+        return LandmarkCatalog.load(path)
+    if path:
+        logger.warning(f"[CATALOG] {path} not found; using the built-in landmarks")
+    return LandmarkCatalog.from_keywords(LANDMARK_KEYWORDS)
+
+
+def get_catalog() -> LandmarkCatalog:
+    """The process-wide catalog used by detect_landmark"""
+    with _clip_lock:
+        if "catalog" not in _clip_state:
+            _clip_state["catalog"] = build_catalog()
+        return _clip_state["catalog"]
+
 
+def _catalog_cache_path(catalog: LandmarkCatalog, mode: Optional[str] = None) -> str:
+    """Embedding matrix file keyed by model name, inference mode and catalog contents"""
+    cfg = get_config()
+    model_tag = cfg["clip_model_name"].replace("/", "_")
+    mode = mode or cfg["clip_inference_mode"]
+    # float and torchscript share the float text tower; int8 text embeddings differ slightly
+    mode_tag = "_int8" if mode == "int8" else ""
+    return os.path.join(cfg["cache_dir"], f"clip_catalog_{model_tag}{mode_tag}_{catalog.fingerprint()}.npy")
 
-clip_processor, clip_model = load_models() 
+
+def load_catalog_embeddings(catalog: LandmarkCatalog, processor, model, mode: Optional[str] = None):
+    """Memory-map (building on first use) `catalog`'s text embeddings for a model bundle"""
+    path = _catalog_cache_path(catalog, mode)
+    record_cache("clip_text", os.path.exists(path))
+    return catalog.load_embeddings(processor, model, path)
+
+
+def get_text_embeddings():
+    """Return the (memory-mapped) catalog embedding matrix, loading models and catalog on first use"""
+    with _clip_lock:
+        catalog = get_catalog()
+        if catalog.matrix is None:
+            processor, model = load_models()
+            load_catalog_embeddings(catalog, processor, model)
+        return catalog.matrix
 
 # Predefined landmarks with name, city, latitude, longitude
 LANDMARK_KEYWORDS = {
@@ -81,75 +236,307 @@ LANDMARK_KEYWORDS = {
 
 OVERPASS_URL = "http://overpass-api.de/api/interpreter"
 
+_index_lock = threading.Lock()
+_index_state = {}
+
+
+def get_landmark_index() -> Optional[LandmarkIndex]:
+    """Return the local landmark index, or None if no index file is available"""
+    with _index_lock:
+        if "index" not in _index_state:
+            cfg = get_config()
+            try:
+                _index_state["index"] = LandmarkIndex(
+                    cfg["landmark_index_path"],
+                    fuzzy_cutoff=cfg["landmark_fuzzy_cutoff"]
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"[LANDMARK INDEX] Unavailable: {e}")
+                _index_state["index"] = None
+        return _index_state["index"]
+
+
+def _load_image(image) -> Image.Image:
+    """Accept a file path, raw bytes, an ImageContext or a PIL image and return an RGB PIL image"""
+    if isinstance(image, ImageContext):
+        return image.pil
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image)).convert("RGB")
+    return Image.open(image).convert("RGB")
+
+
+def _encode_images(processor, model, vision_encoder, images):
+    """L2-normalized image embeddings (torch, call under no_grad)"""
+    # Image feature extraction
+    image_inputs = processor.feature_extractor(
+        images=images,
+        return_tensors="pt"
+    )
+
+    # Vision forward pass only; text side comes from the precomputed catalog
+    with span("clip", images=len(images)):
+        if vision_encoder is not None:
+            image_embeds = vision_encoder(image_inputs["pixel_values"])
+        else:
+            image_embeds = model.get_image_features(**image_inputs)
+        return image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+
+
+def embed_images(images: Sequence) -> np.ndarray:
+    """
+    L2-normalized CLIP image embeddings, shape (len(images), dim), float32.
+    Accepts paths, bytes, ImageContexts or PIL images (one vision forward pass).
+    """
+    import torch
+
+    clip_processor, clip_model = load_models()
+    loaded = [_load_image(image) for image in images]
+    with torch.no_grad():
+        image_embeds = _encode_images(clip_processor, clip_model, _clip_state.get("vision_encoder"), loaded)
+    return image_embeds.cpu().numpy().astype(np.float32)
+
+
+def _rank_embeddings(
+    image_embeds: np.ndarray,
+    top_k: int,
+    region: Optional[str],
+    catalog: Optional[LandmarkCatalog] = None,
+    logit_scale: Optional[float] = None
+) -> List[List[Tuple[str, float]]]:
+    """
+    Top-k (catalog key, probability) per image embedding.
+    Defaults to the process-wide catalog and model; tools pass their own bundle.
+    """
+    if catalog is None:
+        get_text_embeddings()
+        catalog = get_catalog()
+    if logit_scale is None:
+        _, clip_model = load_models()
+        logit_scale = float(clip_model.logit_scale.exp())
+    cfg = get_config()
+    return catalog.search(
+        np.atleast_2d(np.asarray(image_embeds, dtype=np.float32)),
+        logit_scale,
+        top_k=max(1, top_k),
+        region=cfg["landmark_region"] if region is None else region,
+        chunk_size=cfg["landmark_search_chunk"]
+    )
+
+
+def _pick_landmark(ranked: List[Tuple[str, float]], threshold: float) -> Optional[str]:
+    """Return the best keyword (lowercased) from one image's ranking if it clears the threshold"""
+    # Top-k for debug
+    for rank, (key, prob) in enumerate(ranked, start=1):
+        logger.debug(f"CLIP rank {rank}: {key} -> {prob:.4f}")
+    if not ranked:
+        logger.info("[CLIP] No catalog entries in the selected region")
+        return None
+
+    best_name, best_score = ranked[0]
+
+    if best_score >= threshold:
+        logger.info(f"[CLIP MATCH] {best_name} ({best_score:.3f})")
+        return best_name.lower()
+    else:
+        logger.info(
+            f"[CLIP LOW CONFIDENCE] best={best_name} ({best_score:.3f}), threshold={threshold}"
+        )
+        return None
+
+
 def detect_landmark(
-    image_path: str,
+    image_path,
     threshold: float = 0.15,
-    top_k: int = 5
+    top_k: int = 5,
+    region: Optional[str] = None,
+    image_embedding: Optional[np.ndarray] = None
 ) -> Optional[str]:
     """
-    Use CLIP to match the image against predefined landmarks.
+    Use CLIP to match the image against the landmark catalog.
+    image_path may be a file path, raw bytes, an ImageContext or a PIL image.
+    region restricts candidates (see LandmarkCatalog.region_rows); None uses LEADFOCAL_LANDMARK_REGION.
+    image_embedding (from embed_images) skips the vision forward pass.
     Returns the matched keyword (lowercased) if score >= threshold, else None.
     """
     try:
-        # Load and preprocess image
-        image = Image.open(image_path).convert("RGB")
-        keywords = list(LANDMARK_KEYWORDS.keys())
-
-        # Text tokenization with padding/truncation
-        text_inputs = clip_processor.tokenizer(
-            keywords,
-            padding=True,
-            truncation=True,
-            return_tensors="pt"
-        )
-        # Image feature extraction
-        image_inputs = clip_processor.feature_extractor(
-            images=image,
-            return_tensors="pt"
-        )
-        # Merge inputs
-        inputs = {**text_inputs, **image_inputs}
-
-        # Forward pass
-        with torch.no_grad():
-            outputs = clip_model(**inputs)
-            logits = outputs.logits_per_image  # shape (1, len(keywords))
-            probs = logits.softmax(dim=1).cpu().numpy().flatten()
-
-        # Top-k for debug
-        top_idxs = probs.argsort()[::-1][:top_k]
-        for rank, idx in enumerate(top_idxs, start=1):
-            logger.info(f"CLIP rank {rank}: {keywords[idx]} -> {probs[idx]:.4f}")
-
-        best_idx = int(top_idxs[0])
-        best_score = float(probs[best_idx])
-        best_name = keywords[best_idx]
-
-        if best_score >= threshold:
-            logger.info(f"[CLIP MATCH] {best_name} ({best_score:.3f})")
-            return best_name.lower()
-        else:
-            logger.info(
-                f"[CLIP LOW CONFIDENCE] best={best_name} ({best_score:.3f}), threshold={threshold}"
-            )
-            return None
+        if image_embedding is None:
+            image_embedding = embed_images([image_path])
+        ranked = _rank_embeddings(image_embedding, top_k, region)[0]
+        return _pick_landmark(ranked, threshold)
     except Exception as e:
         logger.error(f"[CLIP ERROR] {e}")
         return None
 
 
+def detect_landmarks_batch(
+    images: Sequence,
+    threshold: float = 0.15,
+    top_k: int = 5,
+    batch_size: int = 16,
+    region: Optional[str] = None
+) -> List[Optional[str]]:
+    """
+    Batched version of detect_landmark.
+    Accepts paths, bytes, ImageContexts or PIL images and runs them through CLIP batch_size at a time.
+    Returns one result per input, in order; unreadable images yield None.
+    """
+    results: List[Optional[str]] = [None] * len(images)
+
+    for start in range(0, len(images), max(1, batch_size)):
+        loaded, positions = [], []
+        for pos in range(start, min(start + batch_size, len(images))):
+            try:
+                loaded.append(_load_image(images[pos]))
+                positions.append(pos)
+            except Exception as e:
+                logger.error(f"[CLIP ERROR] Could not load image #{pos}: {e}")
+        if not loaded:
+            continue
+
+        try:
+            ranked = _rank_embeddings(embed_images(loaded), top_k, region)
+        except Exception as e:
+            logger.error(f"[CLIP ERROR] Batch starting at #{start} failed: {e}")
+            continue
+
+        for row, pos in zip(ranked, positions):
+            results[pos] = _pick_landmark(row, threshold)
+
+    return results
+
+
+class LandmarkMicroBatcher:
+    """
+    Gathers detect_landmark requests from many threads into shared CLIP forward passes.
+    Requests arriving within max_wait_ms of the first queued one are batched together,
+    up to max_batch_size images per pass.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        threshold: float = 0.15,
+        top_k: int = 5
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.threshold = threshold
+        self.top_k = top_k
+        self._queue = queue.Queue()
+        self._closed = False
+        # Guards _closed and the queue puts, so nothing is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="clip-microbatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image) -> Future:
+        """Queue an image (path, bytes or PIL image); the future resolves to the keyword or None"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("LandmarkMicroBatcher is closed")
+            self._queue.put((image, future))
+        return future
+
+    def detect(self, image, timeout: Optional[float] = None) -> Optional[str]:
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(image).result(timeout=timeout)
+
+    def close(self):
+        """Stop accepting requests; queued requests are still processed"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Futures cancelled by their callers are dropped before the forward pass
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            images = [image for image, _ in batch]
+            try:
+                results = detect_landmarks_batch(
+                    images,
+                    threshold=self.threshold,
+                    top_k=self.top_k,
+                    batch_size=len(images)
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            logger.info(f"[CLIP BATCH] Processed micro-batch of {len(images)}")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def describe_landmark(landmark_name: str) -> Optional[str]:
+    """Human-readable "Name, City" for a matched keyword, or None if unknown"""
+    key = landmark_name.lower()
+    if key in LANDMARK_KEYWORDS:
+        name, city, _, _ = LANDMARK_KEYWORDS[key]
+        return f"{name}, {city}"
+    entry = get_catalog().get(key)
+    if entry:
+        return ", ".join(part for part in (entry["name"], entry["city"] or entry["country"]) if part)
+    return None
+
+
 def query_landmark_coords(
     landmark_name: str
 ) -> Tuple[Optional[Tuple[float, float]], str]:
     """
     Given a landmark keyword, return (lat, lon) and source.
-    First checks predefined dict; if missing, queries Overpass API.
+    Checks the predefined dict, the catalog, then the local landmark index;
+    only if all miss (and Overpass is enabled) queries the Overpass API.
     """
     key = landmark_name.lower()
     if key in LANDMARK_KEYWORDS:
         _, _, lat, lon = LANDMARK_KEYWORDS[key]
         return (lat, lon), "Predefined"
 
+    entry = get_catalog().get(key)
+    if entry and entry["coords"]:
+        return entry["coords"], "Catalog"
+
+    index = get_landmark_index()
+    if index is not None:
+        match = index.lookup(landmark_name)
+        record_cache("landmark_index", bool(match))
+        if match:
+            coords, matched_name, match_type = match
+            logger.info(f"[LANDMARK INDEX] {landmark_name} -> {matched_name} ({match_type})")
+            return coords, "Local index"
+
+    if not get_config()["overpass_enabled"]:
+        return None, "No coordinates available"
+
     # Build Overpass QL
     query = f"""
     [out:json][timeout:25];
@@ -163,9 +550,10 @@ def query_landmark_coords(
     # Try up to 3 times
     for attempt in range(1, 4):
         try:
-            resp = requests.post(OVERPASS_URL, data=query, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
+            with span("overpass", attempt=attempt):
+                resp = requests.post(OVERPASS_URL, data=query, timeout=15)
+                resp.raise_for_status()
+                data = resp.json()
             elements = data.get("elements", [])
             if elements:
                 elem = elements[0]
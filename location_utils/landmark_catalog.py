@@ -0,0 +1,291 @@
+# location_utils/landmark_catalog.py
+"""
+Landmark catalog for CLIP matching, loaded from a data file.
+
+A catalog entry has a key, a display name, optional city/country/region and
+coordinates, and one or more text prompts. Each entry is embedded as the
+normalized mean of its prompt embeddings, and the embeddings are stored as a
+float16 .npy matrix that is memory-mapped, so the catalog costs page cache
+rather than heap. Matching scans the matrix in fixed-size chunks, keeping a
+running top-k and a streaming log-sum-exp. Returned probabilities are
+therefore exactly the softmax over the whole (or region-filtered) catalog,
+and the detect_landmark threshold keeps its meaning, with memory bounded by
+the chunk size.
+
+File formats (by extension):
+  .csv    columns key?, name, city?, country?, region?, lat?, lon?, prompts? ("|"-separated)
+  .jsonl  one object per line with the same fields (prompts may be a list)
+  .json   a list of such objects, or {"templates": [...], "landmarks": [...]}
+
+Entries without prompts use the templates, formatted with the entry fields.
+Templates that reference a field the entry lacks are skipped.
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES = [
+    "a photo of {name}",
+    "a photo of {name} in {city}",
+    "{name}, a famous landmark in {country}",
+]
+
+_FIELDS = ("key", "name", "city", "country", "region")
+
+
+def _float_or_nan(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class LandmarkCatalog:
+    def __init__(self, entries: Sequence[dict], templates: Optional[Sequence[str]] = None, source: str = ""):
+        self.templates = list(templates or DEFAULT_TEMPLATES)
+        self.source = source
+        self.keys: List[str] = []
+        self.names: List[str] = []
+        self.cities: List[str] = []
+        self.countries: List[str] = []
+        self.regions: List[str] = []
+        self.prompts: List[List[str]] = []
+        lats, lons = [], []
+        self._rows: Dict[str, int] = {}
+        duplicates = 0
+
+        for entry in entries:
+            name = str(entry.get("name") or "").strip()
+            if not name:
+                continue
+            key = str(entry.get("key") or name).strip().lower()
+            if key in self._rows:
+                duplicates += 1
+                continue
+            self._rows[key] = len(self.keys)
+            self.keys.append(key)
+            self.names.append(name)
+            self.cities.append(str(entry.get("city") or "").strip())
+            self.countries.append(str(entry.get("country") or "").strip())
+            self.regions.append(str(entry.get("region") or "").strip())
+            lats.append(_float_or_nan(entry.get("lat")))
+            lons.append(_float_or_nan(entry.get("lon")))
+            prompts = entry.get("prompts")
+            if isinstance(prompts, str):
+                prompts = [p.strip() for p in prompts.split("|") if p.strip()]
+            self.prompts.append(list(prompts) if prompts else self._from_templates(len(self.keys) - 1))
+
+        self.lats = np.array(lats, dtype=np.float64)
+        self.lons = np.array(lons, dtype=np.float64)
+        self.matrix = None
+        self._region_rows: Dict[str, np.ndarray] = {}
+        if duplicates:
+            logger.warning(f"[CATALOG] Skipped {duplicates} duplicate keys in {source or 'catalog'}")
+        logger.info(f"[CATALOG] {len(self.keys)} landmarks from {source or 'built-in keywords'}")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _from_templates(self, row: int) -> List[str]:
+        fields = {
+            "name": self.names[row],
+            "city": self.cities[row],
+            "country": self.countries[row],
+            "region": self.regions[row],
+        }
+        prompts = []
+        for template in self.templates:
+            try:
+                text = template.format(**fields)
+            except (KeyError, IndexError):
+                continue
+            if all(fields[f] for f in fields if "{" + f + "}" in template):
+                prompts.append(text)
+        return prompts or [self.names[row]]
+
+    # ----------------- Loading -----------------
+    @classmethod
+    def load(cls, path: str, templates: Optional[Sequence[str]] = None):
+        lower = path.lower()
+        with open(path, newline="", encoding="utf-8") as f:
+            if lower.endswith(".jsonl"):
+                entries = [json.loads(line) for line in f if line.strip()]
+            elif lower.endswith(".json"):
+                data = json.load(f)
+                if isinstance(data, dict):
+                    templates = templates or data.get("templates")
+                    entries = data.get("landmarks", [])
+                else:
+                    entries = data
+            else:
+                entries = list(csv.DictReader(f))
+        return cls(entries, templates=templates, source=path)
+
+    @classmethod
+    def from_keywords(cls, keywords: Dict[str, list]):
+        """The built-in LANDMARK_KEYWORDS dict; each keyword is its own single prompt"""
+        entries = [
+            {"key": key, "name": name, "city": city, "lat": lat, "lon": lon, "prompts": [key]}
+            for key, (name, city, lat, lon) in keywords.items()
+        ]
+        return cls(entries, source="")
+
+    def fingerprint(self) -> str:
+        """Hash of everything that determines the embedding matrix"""
+        digest = hashlib.sha256()
+        for key, prompts in zip(self.keys, self.prompts):
+            digest.update(json.dumps([key, prompts], ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    # ----------------- Lookup -----------------
+    def get(self, key: str) -> Optional[dict]:
+        row = self._rows.get(key.lower())
+        if row is None:
+            return None
+        lat, lon = self.lats[row], self.lons[row]
+        return {
+            "key": self.keys[row],
+            "name": self.names[row],
+            "city": self.cities[row],
+            "country": self.countries[row],
+            "region": self.regions[row],
+            "coords": None if np.isnan(lat) or np.isnan(lon) else (float(lat), float(lon)),
+        }
+
+    def region_rows(self, region: Optional[str]) -> Optional[np.ndarray]:
+        """
+        Row indices allowed by a region filter, or None for no filter.
+        `region` is a comma-separated list of region/country names, or
+        "bbox:lat_min,lon_min,lat_max,lon_max".
+        """
+        if not region:
+            return None
+        if region not in self._region_rows:
+            if region.startswith("bbox:"):
+                lat0, lon0, lat1, lon1 = (float(v) for v in region[5:].split(","))
+                mask = (self.lats >= lat0) & (self.lats <= lat1) & (self.lons >= lon0) & (self.lons <= lon1)
+            else:
+                wanted = {r.strip().lower() for r in region.split(",") if r.strip()}
+                mask = np.array([
+                    reg.lower() in wanted or country.lower() in wanted
+                    for reg, country in zip(self.regions, self.countries)
+                ], dtype=bool)
+            self._region_rows[region] = np.flatnonzero(mask)
+        return self._region_rows[region]
+
+    # ----------------- Embeddings -----------------
+    def load_embeddings(self, processor, model, cache_path: str, batch_size: int = 256):
+        """
+        Memory-map the embedding matrix from cache_path, building it first if needed.
+        Building streams entries through the text encoder and writes rows
+        straight into the output file, so memory stays bounded.
+        """
+        if os.path.exists(cache_path):
+            try:
+                matrix = np.load(cache_path, mmap_mode="r")
+                if matrix.shape[0] == len(self.keys):
+                    self.matrix = matrix
+                    return matrix
+                logger.warning(f"[CATALOG] Row mismatch in {cache_path}, rebuilding")
+            except Exception as e:
+                logger.warning(f"[CATALOG] Failed to read {cache_path}: {e}")
+
+        import torch
+
+        dim = model.config.projection_dim
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npy"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(len(self.keys), dim))
+        logger.info(f"[CATALOG] Encoding {len(self.keys)} landmarks...")
+
+        row = 0
+        while row < len(self.keys):
+            # Take whole entries until the prompt batch is full
+            rows, prompts, owners = [], [], []
+            while row < len(self.keys) and (not prompts or len(prompts) + len(self.prompts[row]) <= batch_size):
+                rows.append(row)
+                owners.extend([len(rows) - 1] * len(self.prompts[row]))
+                prompts.extend(self.prompts[row])
+                row += 1
+            inputs = processor.tokenizer(prompts, padding=True, truncation=True, return_tensors="pt")
+            with torch.no_grad():
+                embeds = model.get_text_features(**inputs)
+                embeds = (embeds / embeds.norm(dim=-1, keepdim=True)).cpu().numpy()
+            sums = np.zeros((len(rows), dim), dtype=np.float32)
+            np.add.at(sums, np.array(owners), embeds)
+            sums /= np.linalg.norm(sums, axis=1, keepdims=True)
+            out[rows[0]:rows[-1] + 1] = sums
+
+        out.flush()
+        del out
+        os.replace(tmp_path, cache_path)
+        self.matrix = np.load(cache_path, mmap_mode="r")
+        return self.matrix
+
+    def search(
+        self,
+        image_embeds: np.ndarray,
+        logit_scale: float,
+        top_k: int = 5,
+        region: Optional[str] = None,
+        chunk_size: int = 8192
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k (key, probability) per image, best first. Probabilities are the
+        softmax of logit_scale * cosine over every candidate row, computed with
+        a streaming log-sum-exp so only one chunk of the matrix is in memory.
+        """
+        if self.matrix is None:
+            raise RuntimeError("Catalog embeddings are not loaded")
+        rows = self.region_rows(region)
+        total = len(self.keys) if rows is None else len(rows)
+        n = image_embeds.shape[0]
+        if total == 0:
+            return [[] for _ in range(n)]
+
+        image_embeds = np.asarray(image_embeds, dtype=np.float32)
+        best_logits = np.empty((n, 0), dtype=np.float32)
+        best_rows = np.empty((n, 0), dtype=np.int64)
+        running_max = np.full(n, -np.inf)
+        running_sum = np.zeros(n)
+
+        for start in range(0, total, chunk_size):
+            end = min(start + chunk_size, total)
+            if rows is None:
+                idx = np.arange(start, end)
+                chunk = np.asarray(self.matrix[start:end], dtype=np.float32)
+            else:
+                idx = rows[start:end]
+                chunk = np.asarray(self.matrix[idx], dtype=np.float32)
+            logits = logit_scale * (image_embeds @ chunk.T)
+
+            new_max = np.maximum(running_max, logits.max(axis=1))
+            running_sum = running_sum * np.exp(running_max - new_max) + np.exp(logits - new_max[:, None]).sum(axis=1)
+            running_max = new_max
+
+            merged_logits = np.concatenate([best_logits, logits], axis=1)
+            merged_rows = np.concatenate([best_rows, np.broadcast_to(idx, logits.shape)], axis=1)
+            if merged_logits.shape[1] > top_k:
+                keep = np.argpartition(-merged_logits, top_k - 1, axis=1)[:, :top_k]
+                merged_logits = np.take_along_axis(merged_logits, keep, axis=1)
+                merged_rows = np.take_along_axis(merged_rows, keep, axis=1)
+            best_logits, best_rows = merged_logits, merged_rows
+
+        log_norm = running_max + np.log(running_sum)
+        order = np.argsort(-best_logits, axis=1)
+        results = []
+        for i in range(n):
+            results.append([
+                (self.keys[best_rows[i, j]], float(np.exp(best_logits[i, j] - log_norm[i])))
+                for j in order[i]
+            ])
+        return results
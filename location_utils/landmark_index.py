@@ -0,0 +1,149 @@
+# location_utils/landmark_index.py
+import bisect
+import csv
+import difflib
+import json
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _geometry_center(geometry: dict) -> Optional[Tuple[float, float]]:
+    """(lat, lon) for a GeoJSON Point, or the mean vertex of a line/polygon"""
+    if not geometry:
+        return None
+    coords = geometry.get("coordinates")
+    kind = geometry.get("type")
+    if kind == "Point":
+        return coords[1], coords[0]
+    if kind in ("LineString", "MultiPoint"):
+        ring = coords
+    elif kind in ("Polygon", "MultiLineString"):
+        ring = coords[0]
+    elif kind == "MultiPolygon":
+        ring = coords[0][0]
+    else:
+        return None
+    if not ring:
+        return None
+    return (
+        sum(p[1] for p in ring) / len(ring),
+        sum(p[0] for p in ring) / len(ring),
+    )
+
+
+class LandmarkIndex:
+    """
+    In-process landmark/POI name index loaded from a CSV or GeoJSON dump.
+    CSV needs name, lat, lon columns; GeoJSON features need a `name` property.
+    Supports exact, prefix and fuzzy (trigram + difflib) lookups.
+    """
+
+    def __init__(self, path: str, fuzzy_cutoff: float = 0.85):
+        self.path = path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._entries: Dict[str, Tuple[float, float, str]] = {}
+        self._trigram_index = defaultdict(list)
+
+        if path.lower().endswith((".geojson", ".json")):
+            self._load_geojson(path)
+        else:
+            self._load_csv(path)
+
+        self._sorted_names: List[str] = sorted(self._entries)
+        for key in self._sorted_names:
+            for gram in _trigrams(key):
+                self._trigram_index[gram].append(key)
+        logger.info(f"[LANDMARK INDEX] Loaded {len(self._entries)} names from {path}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, name: str, lat: float, lon: float):
+        key = normalize_name(name)
+        if key and key not in self._entries:
+            self._entries[key] = (float(lat), float(lon), name)
+
+    def _load_csv(self, path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat = row.get("lat") or row["latitude"]
+                    lon = row.get("lon") or row["longitude"]
+                    self._add(row["name"], float(lat), float(lon))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    def _load_geojson(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for feature in data.get("features", []):
+            name = (feature.get("properties") or {}).get("name")
+            center = _geometry_center(feature.get("geometry"))
+            if name and center:
+                self._add(name, *center)
+
+    def exact(self, name: str) -> Optional[Tuple[float, float, str]]:
+        return self._entries.get(normalize_name(name))
+
+    def prefix(self, name: str, limit: int = 10) -> List[Tuple[float, float, str]]:
+        """Entries whose normalized name starts with `name`, shortest names first"""
+        key = normalize_name(name)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._sorted_names, key)
+        matches = []
+        for candidate in self._sorted_names[start:]:
+            if not candidate.startswith(key):
+                break
+            matches.append(candidate)
+        matches.sort(key=len)
+        return [self._entries[m] for m in matches[:limit]]
+
+    def fuzzy(self, name: str, max_candidates: int = 50) -> Optional[Tuple[float, float, str]]:
+        """Closest name by similarity ratio, considering only names that share trigrams"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        overlap = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._trigram_index.get(gram, ()):
+                overlap[candidate] += 1
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[:max_candidates]
+        best = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        return self._entries[best[0]] if best else None
+
+    def lookup(self, name: str) -> Optional[Tuple[Tuple[float, float], str, str]]:
+        """Try exact, then prefix, then fuzzy; returns ((lat, lon), matched_name, match_type)"""
+        entry = self.exact(name)
+        match_type = "exact"
+        if entry is None:
+            prefixed = self.prefix(name, limit=1)
+            entry = prefixed[0] if prefixed else None
+            match_type = "prefix"
+        if entry is None:
+            entry = self.fuzzy(name)
+            match_type = "fuzzy"
+        if entry is None:
+            return None
+        lat, lon, matched = entry
+        return (lat, lon), matched, match_type
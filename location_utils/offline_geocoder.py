@@ -0,0 +1,119 @@
+# location_utils/offline_geocoder.py
+import csv
+import logging
+import math
+from typing import List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Unit-sphere coordinates; chord distance grows monotonically with great-circle distance"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class _KDTree:
+    """Minimal 3-d KD-tree over unit vectors (nearest-neighbour queries only)"""
+
+    def __init__(self, points: List[Tuple[float, float, float]]):
+        self.points = points
+        # Each node: (point_index, axis, left_node, right_node)
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, idxs, depth):
+        if not idxs:
+            return None
+        axis = depth % 3
+        idxs.sort(key=lambda i: self.points[i][axis])
+        mid = len(idxs) // 2
+        return (
+            idxs[mid],
+            axis,
+            self._build(idxs[:mid], depth + 1),
+            self._build(idxs[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, target) -> Tuple[int, float]:
+        """Return (index, squared_chord_distance) of the closest point"""
+        best_idx, best_d2 = -1, float("inf")
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            idx, axis, left, right = node
+            p = self.points[idx]
+            d2 = (p[0] - target[0]) ** 2 + (p[1] - target[1]) ** 2 + (p[2] - target[2]) ** 2
+            if d2 < best_d2:
+                best_idx, best_d2 = idx, d2
+            diff = target[axis] - p[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Visit the far side only if the splitting plane is closer than the best match
+            if diff * diff < best_d2:
+                stack.append(far)
+            stack.append(near)
+        return best_idx, best_d2
+
+
+class OfflineGeocoder:
+    """
+    Reverse geocoder backed by a local gazetteer CSV.
+    Expected columns: name, admin, country, lat, lon (admin/country may be empty;
+    latitude/longitude are accepted as column names too). Rows without a name
+    or with unusable coordinates are skipped. tools/build_gazetteer.py builds
+    the file from a GeoNames dump.
+    """
+
+    def __init__(self, gazetteer_path: str, max_distance_km: float = 50.0):
+        self.path = gazetteer_path
+        self.max_distance_km = max_distance_km
+        self.places = []
+        points = []
+        skipped = 0
+
+        with open(gazetteer_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                # Short rows come back with None for the missing fields
+                parts = [(row.get(k) or "").strip() for k in ("name", "admin", "country")]
+                try:
+                    lat = float(row.get("lat") or row["latitude"])
+                    lon = float(row.get("lon") or row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    skipped += 1
+                    continue
+                if not parts[0] or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    skipped += 1
+                    continue
+                self.places.append(", ".join(p for p in parts if p))
+                points.append(_to_xyz(lat, lon))
+
+        self._tree = _KDTree(points)
+        if skipped:
+            logger.warning(f"[OFFLINE GEOCODER] Skipped {skipped} malformed rows in {gazetteer_path}")
+        logger.info(f"[OFFLINE GEOCODER] Indexed {len(self.places)} places from {gazetteer_path}")
+
+    def lookup(self, coords: Tuple[float, float]) -> Optional[Tuple[str, float]]:
+        """Return (address, distance_km) of the nearest place within max_distance_km, else None"""
+        if not self.places:
+            return None
+        idx, d2 = self._tree.nearest(_to_xyz(*coords))
+        distance_km = _chord_to_km(math.sqrt(d2))
+        if distance_km > self.max_distance_km:
+            return None
+        return self.places[idx], distance_km
+
+    def reverse(self, coords: Tuple[float, float]) -> str:
+        """Same contract as get_address_from_coords"""
+        match = self.lookup(coords)
+        if match is None:
+            return "Unknown location"
+        return match[0]
@@ -0,0 +1,17 @@
+# pipeline_utils/config.py
+import os
+
+
+def get_config():
+    return {
+        # Content-addressed cache of full pipeline results
+        "result_cache_enabled": os.environ.get("LEADFOCAL_RESULT_CACHE", "1") == "1",
+        "result_cache_path": os.path.join(os.environ.get("LEADFOCAL_CACHE_DIR", ".cache"), "results.sqlite"),
+        "result_cache_max_entries": int(os.environ.get("LEADFOCAL_RESULT_CACHE_MAX_ENTRIES", "5000")),
+        # Max dHash Hamming distance for near-duplicate hits among one user's uploads (0 = exact matches only)
+        "near_duplicate_max_distance": int(os.environ.get("LEADFOCAL_NEAR_DUPLICATE_DISTANCE", "0")),
+        # One JSON log line per traced request (stage timings)
+        "trace_log_enabled": os.environ.get("LEADFOCAL_TRACE_LOG", "1") == "1",
+        # Comma-separated usernames that see the per-request waterfall panel
+        "admin_users": {u.strip() for u in os.environ.get("LEADFOCAL_ADMIN_USERS", "").split(",") if u.strip()},
+    }
@@ -0,0 +1,106 @@
+# pipeline_utils/image_context.py
+import io
+import cv2
+import numpy as np
+from PIL import Image
+
+from pipeline_utils.tracing import span
+
+
+class ImageContext:
+    """
+    One uploaded image, held in memory and decoded at most once.
+    EXIF, the RGB PIL image and the BGR array are produced lazily and shared
+    by every pipeline stage, so no stage re-reads or re-decodes the file.
+    Pixels are held twice: PIL keeps its own buffer (CLIP and display use it)
+    and OpenCV needs a contiguous BGR array; the RGB array is a view of that.
+    """
+
+    def __init__(self, data: bytes, name: str = ""):
+        self.data = bytes(data)
+        self.name = name
+        self._pil = None
+        self._exif = None
+        self._rgb = None
+        self._bgr = None
+        self._header_size = None
+        self._proxies = {}
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str = ""):
+        return cls(data, name=name)
+
+    @classmethod
+    def from_path(cls, path: str):
+        with open(path, "rb") as f:
+            return cls(f.read(), name=path)
+
+    def _open(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.data))
+
+    @property
+    def exif(self) -> Image.Exif:
+        """EXIF block; parsed from the header without decoding pixels"""
+        if self._exif is None:
+            self._exif = self._open().getexif()
+        return self._exif
+
+    @property
+    def pil(self) -> Image.Image:
+        """Decoded RGB image"""
+        if self._pil is None:
+            with span("decode"):
+                image = self._open()
+                if self._exif is None:
+                    self._exif = image.getexif()
+                self._pil = image.convert("RGB")
+        return self._pil
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """Read-only RGB view of the BGR array (no extra copy)"""
+        if self._rgb is None:
+            self._rgb = self.bgr[:, :, ::-1]
+        return self._rgb
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Read-only BGR array for OpenCV/DeepFace, converted once from the decoded image"""
+        if self._bgr is None:
+            # np.asarray copies PIL's buffer; the RGB copy is dropped once converted
+            self._bgr = cv2.cvtColor(np.asarray(self.pil), cv2.COLOR_RGB2BGR)
+            self._bgr.flags.writeable = False
+        return self._bgr
+
+    @property
+    def size(self):
+        """(width, height) of the image, read from the header without decoding"""
+        if self._pil is not None:
+            return self._pil.size
+        if self._header_size is None:
+            self._header_size = self._open().size
+        return self._header_size
+
+    def proxy_bgr(self, max_side: int):
+        """
+        BGR image whose longest side is at most max_side, plus the factor that
+        maps proxy coordinates back to the original (original = proxy * scale).
+        JPEGs are decoded directly at reduced scale via PIL draft mode.
+        """
+        width, height = self.size
+        if not max_side or max(width, height) <= max_side:
+            return self.bgr, 1.0
+        if max_side not in self._proxies:
+            with span("decode_proxy"):
+                ratio = max_side / max(width, height)
+                target = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+                image = self._open()
+                if image.format == "JPEG":
+                    # Decodes at 1/2, 1/4 or 1/8 scale, never smaller than target
+                    image.draft("RGB", target)
+                image = image.convert("RGB")
+                if max(image.size) > max_side:
+                    image.thumbnail((max_side, max_side), Image.BILINEAR)
+                proxy = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+                self._proxies[max_side] = (proxy, width / proxy.shape[1])
+        return self._proxies[max_side]
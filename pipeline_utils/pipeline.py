@@ -0,0 +1,173 @@
+# pipeline_utils/pipeline.py
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+from emotion_utils.config import get_config as get_emotion_config
+from location_utils.config import get_config as get_location_config
+from location_utils.extract_gps import extract_gps, convert_gps
+from location_utils.geocoder import FallbackAddress, get_address_from_coords, start_address_lookup
+from location_utils.landmark import describe_landmark, detect_landmark, embed_images, query_landmark_coords
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.result_cache import ResultCache
+from pipeline_utils.tracing import span, start_trace, track_future
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INVALID_ADDRESSES = ("Unknown location", "Geocoding service unavailable")
+
+# CLIP landmark fallback: minimum softmax score and ranks logged
+LANDMARK_THRESHOLD = 0.15
+LANDMARK_TOP_K = 5
+
+
+def _degraded(address: str) -> bool:
+    """True if geocoding failed or only the auto-mode gazetteer fallback answered"""
+    return address == "Geocoding service unavailable" or isinstance(address, FallbackAddress)
+
+
+def _file_stamp(path: str):
+    """(mtime, size) of a data file, so edits to it change the fingerprint"""
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def config_fingerprint() -> str:
+    """Digest of every setting that changes analyze_upload's output; keys the result cache"""
+    emotion = get_emotion_config()
+    location = get_location_config()
+    settings = {
+        "detector_backend": emotion["detector_backend"],
+        "detection_max_side": emotion["detection_max_side"],
+        "emotion_backend": emotion["emotion_backend"],
+        "emotion_model": [emotion["emotion_model_path"], _file_stamp(emotion["emotion_model_path"])]
+        if emotion["emotion_backend"] != "deepface" else None,
+        "clip_model_name": location["clip_model_name"],
+        "clip_inference_mode": location["clip_inference_mode"],
+        "landmark_catalog": [location["landmark_catalog_path"], _file_stamp(location["landmark_catalog_path"])],
+        "landmark_region": location["landmark_region"],
+        "landmark_index": [location["landmark_index_path"], _file_stamp(location["landmark_index_path"])],
+        "overpass_enabled": location["overpass_enabled"],
+        "geocoder_mode": location["geocoder_mode"],
+        "gazetteer": [location["gazetteer_path"], _file_stamp(location["gazetteer_path"])],
+        "offline_max_distance_km": location["offline_max_distance_km"],
+        "landmark_threshold": LANDMARK_THRESHOLD,
+        "landmark_top_k": LANDMARK_TOP_K,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def analyze_upload(
+    image_ctx: ImageContext,
+    detector,
+    result_cache: Optional[ResultCache] = None,
+    geocode: bool = True,
+    embed: bool = False,
+    user: Optional[str] = None
+) -> dict:
+    """
+    Run the full upload pipeline on one image:
+    EXIF GPS (geocoded in the background while emotions run), emotion
+    detection, then CLIP landmark + coordinates as the location fallback.
+    Returns a dict with detections, landmark, coords, location and
+    location_method; `cached` tells whether it came from the result cache.
+    With embed=True it also holds the CLIP image embedding (a list of floats),
+    which the landmark fallback reuses instead of running CLIP again.
+    `user` owns the upload; near-duplicate cache hits only reuse that user's results.
+    Results computed with geocode=False, or whose geocoding failed or fell back
+    to the gazetteer in auto mode, are not stored in the cache.
+    Runs as one trace (or as a span of the caller's trace).
+    """
+    with start_trace("analyze_upload", image=image_ctx.name):
+        return _analyze(image_ctx, detector, result_cache, geocode, embed, user)
+
+
+def _embed(image_ctx: ImageContext) -> Optional[list]:
+    """CLIP image embedding as a JSON-friendly list of full-precision floats, or None if CLIP fails"""
+    try:
+        with span("embed_image"):
+            return embed_images([image_ctx])[0].tolist()
+    except Exception as e:
+        logger.warning(f"[PIPELINE] Image embedding failed: {e}")
+        return None
+
+
+def _analyze(image_ctx, detector, result_cache, geocode, embed, user):
+    if result_cache is not None:
+        with span("result_cache_lookup"):
+            cached = result_cache.lookup(image_ctx, owner=user)
+        if cached is not None:
+            cached["cached"] = True
+            if embed and not cached.get("embedding"):
+                cached["embedding"] = _embed(image_ctx)
+            return cached
+
+    result = {
+        "detections": [],
+        "landmark": None,
+        "coords": None,
+        "location": "Unknown",
+        "location_method": "",
+        "cached": False,
+    }
+    if embed:
+        result["embedding"] = _embed(image_ctx)
+
+    # 1) Try EXIF GPS (header only) and start geocoding in the background
+    address_future = None
+    degraded = not geocode
+    gps_info = extract_gps(image_ctx)
+    if gps_info:
+        coords = convert_gps(gps_info)
+        if coords:
+            result["coords"] = coords
+            result["location_method"] = "GPS Metadata"
+            if geocode:
+                address_future = track_future(start_address_lookup(coords), "geocode")
+
+    with span("detect_emotions"):
+        result["detections"] = detector.detect_emotions(image_ctx)
+
+    if address_future is not None:
+        join_timeout = get_location_config()["geocode_deadline_seconds"] + 1
+        try:
+            with span("geocode_wait"):
+                result["location"] = address_future.result(timeout=join_timeout)
+        except Exception as e:
+            logger.warning(f"[PIPELINE] Geocoding error: {e}")
+            result["location"] = "Geocoding service unavailable"
+        degraded = degraded or _degraded(result["location"])
+
+    # 2) Fallback to CLIP landmark
+    if result["coords"] is None:
+        with span("detect_landmark"):
+            landmark = detect_landmark(image_ctx, threshold=LANDMARK_THRESHOLD, top_k=LANDMARK_TOP_K,
+                                       image_embedding=result.get("embedding"))
+        result["landmark"] = landmark
+        if landmark:
+            coords_loc, source = query_landmark_coords(landmark)
+            if coords_loc:
+                result["coords"] = coords_loc
+                result["location_method"] = f"Landmark ({source})"
+                addr = get_address_from_coords(coords_loc) if geocode else INVALID_ADDRESSES[0]
+                degraded = degraded or _degraded(addr)
+                if addr not in INVALID_ADDRESSES:  # Valid address
+                    result["location"] = addr
+                else:
+                    description = describe_landmark(landmark)
+                    if description:
+                        result["location"] = description
+                    else:
+                        lat, lon = coords_loc
+                        result["location"] = f"{landmark.title()} ({lat:.4f}, {lon:.4f})"
+
+    if result_cache is not None and not degraded:
+        result_cache.store(image_ctx, result, owner=user)
+    return result
@@ -0,0 +1,64 @@
+# pipeline_utils/readiness.py
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_server_lock = threading.Lock()
+_servers: Dict[int, ThreadingHTTPServer] = {}
+
+
+def start_readiness_server(
+    port: int,
+    checks: Dict[str, Callable[[], bool]],
+    host: str = "0.0.0.0",
+    metrics: Optional[Callable[[], str]] = None
+):
+    """
+    Serve health probes for a load balancer on a side port (once per process):
+      GET /live    -> 200 while the process is up
+      GET /ready   -> 200 when every check returns True, else 503 (body lists each check)
+      GET /metrics -> Prometheus text from `metrics()`, when given
+    """
+    with _server_lock:
+        if port in _servers:
+            return _servers[port]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/live":
+                    self._reply(200, "ok\n")
+                elif self.path == "/ready":
+                    results = {}
+                    for name, check in checks.items():
+                        try:
+                            results[name] = bool(check())
+                        except Exception:
+                            results[name] = False
+                    body = "".join(f"{name} {'ok' if ok else 'pending'}\n" for name, ok in results.items())
+                    self._reply(200 if all(results.values()) else 503, body)
+                elif self.path == "/metrics" and metrics is not None:
+                    self._reply(200, metrics(), "text/plain; version=0.0.4; charset=utf-8")
+                else:
+                    self._reply(404, "not found\n")
+
+            def _reply(self, status, body, content_type="text/plain; charset=utf-8"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # probes arrive every few seconds; keep them out of the logs
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="readiness-server", daemon=True).start()
+        _servers[port] = server
+        logger.info(f"[READINESS] Serving /live, /ready{' and /metrics' if metrics else ''} on port {port}")
+        return server
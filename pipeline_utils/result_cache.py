@@ -0,0 +1,225 @@
+# pipeline_utils/result_cache.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.tracing import inc_counter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def difference_hash(image_ctx: ImageContext) -> int:
+    """64-bit dHash; robust to re-encoding and resizing"""
+    proxy, _ = image_ctx.proxy_bgr(256)
+    gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _json_default(value):
+    """Detector boxes may hold numpy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class ResultCache:
+    """
+    Content-addressed cache of full pipeline results.
+    Exact lookups use the SHA-256 of the uploaded bytes combined with
+    `fingerprint` (a digest of the model/config settings that shape results),
+    so changing those settings invalidates earlier entries. Optionally
+    (max_distance > 0), a perceptual dHash within `max_distance` bits catches
+    re-encoded or resized copies of the same owner's uploads (detection boxes
+    are rescaled to the new image size). The least recently used entries are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_distance: int = 0, fingerprint: str = ""):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(results)")}
+        with self._conn:
+            if columns and "fingerprint" not in columns:
+                # Entries from before fingerprinting can't be attributed to a config
+                self._conn.execute("DROP TABLE results")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " sha256 TEXT PRIMARY KEY,"
+                " phash INTEGER NOT NULL,"
+                " width INTEGER NOT NULL,"
+                " height INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " owner TEXT,"
+                " fingerprint TEXT NOT NULL)"
+            )
+            stale = self._conn.execute(
+                "DELETE FROM results WHERE fingerprint != ?", (fingerprint,)
+            ).rowcount
+        if stale:
+            logger.info(f"[RESULT CACHE] Dropped {stale} entries from a different model/config")
+
+        # Perceptual hashes kept in memory for vectorized Hamming-distance scans
+        rows = self._conn.execute("SELECT sha256, phash, owner FROM results").fetchall()
+        self._keys = [r[0] for r in rows]
+        self._key_set = set(self._keys)
+        self._phashes = np.array([r[1] for r in rows], dtype=np.int64).view(np.uint64)
+        self._owners = [r[2] for r in rows]
+
+    def _key(self, image_ctx: ImageContext) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8") + b"\0")
+        digest.update(image_ctx.data)
+        return digest.hexdigest()
+
+    def lookup(self, image_ctx: ImageContext, owner: Optional[str] = None) -> Optional[dict]:
+        """
+        Cached result for these exact bytes; with near-duplicate matching
+        enabled, also for a near-identical earlier upload of the same owner.
+        """
+        key = self._key(image_ctx)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM results WHERE sha256 = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._touch(key)
+                self.hits += 1
+                inc_counter("leadfocal_cache_requests_total", cache="result", result="hit")
+                return json.loads(row[0])
+
+        if self.max_distance > 0 and owner is not None:
+            match = self._nearest(difference_hash(image_ctx), owner)
+            if match is not None:
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT payload, width, height FROM results WHERE sha256 = ?", (match,)
+                    ).fetchone()
+                    if row is not None:
+                        self._touch(match)
+                        self.near_hits += 1
+                        inc_counter("leadfocal_cache_requests_total", cache="result", result="near_hit")
+                        return self._rescale(json.loads(row[0]), (row[1], row[2]), image_ctx.size)
+
+        self.misses += 1
+        inc_counter("leadfocal_cache_requests_total", cache="result", result="miss")
+        return None
+
+    def store(self, image_ctx: ImageContext, result: dict, owner: Optional[str] = None):
+        key = self._key(image_ctx)
+        phash = difference_hash(image_ctx)
+        width, height = image_ctx.size
+        # The embedding is recomputed on demand rather than stored per entry
+        payload = {k: v for k, v in result.items() if k not in ("cached", "embedding")}
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results "
+                    "(sha256, phash, width, height, payload, last_access, owner, fingerprint) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, _to_signed(phash), width, height, json.dumps(payload, default=_json_default),
+                     time.time(), owner, self.fingerprint)
+                )
+            if key not in self._key_set:
+                self._keys.append(key)
+                self._key_set.add(key)
+                self._phashes = np.append(self._phashes, np.uint64(phash))
+                self._owners.append(owner)
+            self._evict()
+
+    def _touch(self, key: str):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE results SET last_access = ? WHERE sha256 = ?", (time.time(), key)
+            )
+
+    def _nearest(self, phash: int, owner: str) -> Optional[str]:
+        """Closest entry stored by `owner` within max_distance bits"""
+        with self._lock:
+            if not self._keys:
+                return None
+            xor = np.bitwise_xor(self._phashes, np.uint64(phash))
+            distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+            # Other owners' uploads are never reused
+            same_owner = np.fromiter((o == owner for o in self._owners), dtype=bool, count=len(self._owners))
+            distances = np.where(same_owner, distances, 65)
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                return None
+            return self._keys[best]
+
+    def _evict(self):
+        """Drop the least recently used ~10% once over capacity (call with _lock held)"""
+        if len(self._keys) <= self.max_entries:
+            return
+        excess = len(self._keys) - self.max_entries + max(1, self.max_entries // 10)
+        with self._conn:
+            victims = [r[0] for r in self._conn.execute(
+                "SELECT sha256 FROM results ORDER BY last_access LIMIT ?", (excess,)
+            )]
+            self._conn.executemany("DELETE FROM results WHERE sha256 = ?", [(v,) for v in victims])
+        self._key_set.difference_update(victims)
+        keep = np.array([k in self._key_set for k in self._keys], dtype=bool)
+        self._keys = [k for k, kept in zip(self._keys, keep) if kept]
+        self._owners = [o for o, kept in zip(self._owners, keep) if kept]
+        self._phashes = self._phashes[keep]
+        logger.info(f"[RESULT CACHE] Evicted {len(victims)} entries")
+
+    @staticmethod
+    def _rescale(result: dict, cached_size, new_size) -> dict:
+        """Map cached detection boxes onto a resized copy of the same image"""
+        sx = new_size[0] / cached_size[0] if cached_size[0] else 1.0
+        sy = new_size[1] / cached_size[1] if cached_size[1] else 1.0
+        if abs(sx - 1) < 1e-6 and abs(sy - 1) < 1e-6:
+            return result
+        result = copy.deepcopy(result)
+        for det in result.get("detections", []):
+            det["x"], det["w"] = int(round(det["x"] * sx)), int(round(det["w"] * sx))
+            det["y"], det["h"] = int(round(det["y"] * sy)), int(round(det["h"] * sy))
+        return result
+
+    def stats(self) -> dict:
+        total = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._keys),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.near_hits) / total if total else 0.0,
+        }
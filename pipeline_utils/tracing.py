@@ -0,0 +1,237 @@
+# pipeline_utils/tracing.py
+"""
+Lightweight tracing and metrics for the upload hot path.
+
+    with start_trace("upload", user=username) as trace:
+        with span("decode"):
+            ...
+
+Every span feeds the `leadfocal_stage_duration_seconds` histogram, whether
+or not a trace is active; inside a trace it is also recorded on the trace for
+the per-request waterfall. A finished trace is written as one JSON log line.
+Counters and histograms are exported in Prometheus text format by
+render_prometheus().
+"""
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from pipeline_utils.config import get_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the stage-duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("leadfocal_trace", default=None)
+_current_depth = contextvars.ContextVar("leadfocal_span_depth", default=0)
+
+
+# ----------------- Metrics -----------------
+_metrics_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_histograms: Dict[Tuple[str, Tuple], List] = {}
+_help: Dict[str, Tuple[str, str]] = {
+    "leadfocal_stage_duration_seconds": ("histogram", "Time spent in each pipeline stage"),
+    "leadfocal_cache_requests_total": ("counter", "Cache lookups by cache and result"),
+}
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc_counter(name: str, value: float = 1.0, **labels):
+    key = (name, _label_key(labels))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, **labels):
+    """Record one histogram observation"""
+    key = (name, _label_key(labels))
+    with _metrics_lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            # [bucket counts..., count, sum]
+            entry = _histograms[key] = [0] * len(DURATION_BUCKETS) + [0, 0.0]
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                entry[i] += 1
+        entry[-2] += 1
+        entry[-1] += value
+
+
+def record_cache(cache: str, hit: bool):
+    """Count one lookup against `cache` as a hit or a miss"""
+    inc_counter("leadfocal_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def _escape_label_value(value: str) -> str:
+    """Backslash, double quote and newline must be escaped in the text format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """All counters and histograms in the Prometheus text exposition format"""
+    with _metrics_lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    described = set()
+
+    def describe(name):
+        if name not in described and name in _help:
+            kind, text = _help[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), entry in sorted(histograms.items()):
+        describe(name)
+        for bound, count in zip(DURATION_BUCKETS, entry):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {entry[-2]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {entry[-2]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {entry[-1]:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------- Traces -----------------
+class Trace:
+    """Spans recorded for one request; safe to add to from other threads"""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float, depth: int = 0, **attrs):
+        """Record a span from perf_counter() start/end times"""
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "depth": depth,
+                **attrs,
+            })
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return {
+            "event": "trace",
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+# Recently finished traces, newest last
+recent_traces = deque(maxlen=50)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """
+    Begin a trace for one request. Inside an active trace this is only a span,
+    so callers such as analyze_upload can start one unconditionally.
+    """
+    if _current_trace.get() is not None:
+        with span(name, **attrs):
+            yield _current_trace.get()
+        return
+
+    trace = Trace(name, **attrs)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace.started
+        observe("leadfocal_stage_duration_seconds", trace.duration, stage=name)
+        recent_traces.append(trace)
+        if get_config()["trace_log_enabled"]:
+            logger.info(json.dumps(trace.to_dict(), default=str))
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as pipeline stage `name`"""
+    trace = _current_trace.get()
+    depth = _current_depth.get()
+    token = _current_depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _current_depth.reset(token)
+        observe("leadfocal_stage_duration_seconds", end - start, stage=name)
+        if trace is not None:
+            trace.add_span(name, start, end, depth=depth, **attrs)
+
+
+def traced(name: str):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def track_future(future, name: str):
+    """
+    Record a span for work running on another thread (e.g. the background
+    geocoder) from now until `future` completes, on the caller's trace.
+    """
+    trace = _current_trace.get()
+    depth = _current_depth.get()
+    start = time.perf_counter()
+
+    def _done(_):
+        end = time.perf_counter()
+        observe("leadfocal_stage_duration_seconds", end - start, stage=name)
+        if trace is not None:
+            trace.add_span(name, start, end, depth=depth, background=True)
+
+    future.add_done_callback(_done)
+    return future
+
+
+def is_admin(username: str) -> bool:
+    return bool(username) and username in get_config()["admin_users"]
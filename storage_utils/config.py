@@ -0,0 +1,23 @@
+# storage_utils/config.py
+import os
+
+
+def get_config():
+    return {
+        # Upload history
+        "history_db_path": os.environ.get("LEADFOCAL_HISTORY_DB", "history.db"),
+        "history_csv_path": os.environ.get("LEADFOCAL_HISTORY_CSV", "history.csv"),
+        "history_max_batch": int(os.environ.get("LEADFOCAL_HISTORY_MAX_BATCH", "256")),
+        "history_commit_latency_ms": float(os.environ.get("LEADFOCAL_HISTORY_COMMIT_LATENCY_MS", "200")),
+
+        # CLIP image embeddings of uploads, for "find similar" on the History page
+        "embedding_store_enabled": os.environ.get("LEADFOCAL_EMBEDDINGS", "0") == "1",
+        "embedding_store_path": os.path.join(os.environ.get("LEADFOCAL_CACHE_DIR", ".cache"), "embeddings"),
+        # Rows scored per block during similarity search (bounds peak memory)
+        "embedding_search_block": int(os.environ.get("LEADFOCAL_EMBEDDING_BLOCK", "65536")),
+
+        # User directory: "csv" (users.csv) or "sqlite" (users.db)
+        "users_backend": os.environ.get("LEADFOCAL_USERS_BACKEND", "csv"),
+        "users_csv_path": os.environ.get("LEADFOCAL_USERS_CSV", "users.csv"),
+        "users_db_path": os.environ.get("LEADFOCAL_USERS_DB", "users.db"),
+    }
@@ -0,0 +1,228 @@
+# storage_utils/embedding_store.py
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    row       INTEGER PRIMARY KEY,
+    username  TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    deleted   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_user_ts ON embeddings (username, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class EmbeddingStore:
+    """
+    On-disk store of CLIP image embeddings for past uploads.
+    Vectors are appended as float16 rows to `<path>.f16`, which is read
+    through a memory map; `<path>.sqlite` maps each row to the history
+    record it belongs to, keyed like HistoryStore uploads by
+    (username, timestamp). Deletes only tombstone the ID-map row.
+    search() is an exact cosine nearest-neighbour scan done in blocks of
+    `block_size` rows, so memory stays bounded however large the store gets.
+    """
+
+    def __init__(self, path: str = ".cache/embeddings", block_size: int = 65536):
+        self.data_path = path + ".f16"
+        self.block_size = block_size
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path + ".sqlite", check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+        self._matrix = None
+        self._live = {}
+
+    # ----------------- Writes -----------------
+    def add(self, username: str, timestamp: str, embedding: Sequence[float]):
+        """Store the embedding of one upload (replaces an earlier one for the same record)"""
+        self.add_many([(username, timestamp, embedding)])
+
+    def add_many(self, items: Iterable[Tuple[str, str, Sequence[float]]]):
+        items = list(items)
+        if not items:
+            return
+        vectors = np.asarray([np.asarray(v, dtype=np.float32).ravel() for _, _, v in items])
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding has {vectors.shape[1]} dimensions, store holds {self.dim}")
+
+            row_bytes = self.dim * 2
+            with open(self.data_path, "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    size = os.fstat(f.fileno()).st_size
+                    if size % row_bytes:  # torn write from a crash: drop the partial row
+                        f.truncate(size - size % row_bytes)
+                        size -= size % row_bytes
+                    f.write(vectors.astype(np.float16).tobytes())
+                    f.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+            first = size // row_bytes
+
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE embeddings SET deleted = 1 WHERE username = ? AND timestamp = ?",
+                    [(username, timestamp) for username, timestamp, _ in items]
+                )
+                self._conn.executemany(
+                    "INSERT INTO embeddings (row, username, timestamp) VALUES (?, ?, ?)",
+                    [(first + i, username, timestamp) for i, (username, timestamp, _) in enumerate(items)]
+                )
+            self._live.clear()
+
+    def delete(self, username: str, timestamps: Iterable[str]) -> int:
+        """Tombstone the embeddings of the given uploads; returns the number marked"""
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE embeddings SET deleted = 1 WHERE username = ? AND timestamp = ? AND deleted = 0",
+                [(username, ts) for ts in timestamps]
+            )
+            self._live.clear()
+            return cur.rowcount
+
+    # ----------------- Reads -----------------
+    def _rows_on_disk(self) -> int:
+        if self.dim is None or not os.path.exists(self.data_path):
+            return 0
+        return os.path.getsize(self.data_path) // (self.dim * 2)
+
+    def _get_matrix(self) -> Optional[np.ndarray]:
+        """Memory map over every complete row; reopened when rows were appended"""
+        rows = self._rows_on_disk()
+        if rows == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.data_path, dtype=np.float16, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def _live_mask(self, username: Optional[str], rows: int) -> np.ndarray:
+        """Boolean mask of live rows (optionally one user's), cached until the next write"""
+        key = (username, rows)
+        if key not in self._live:
+            if username is None:
+                ids = self._conn.execute("SELECT row FROM embeddings WHERE deleted = 0").fetchall()
+            else:
+                ids = self._conn.execute(
+                    "SELECT row FROM embeddings WHERE username = ? AND deleted = 0", (username,)
+                ).fetchall()
+            mask = np.zeros(rows, dtype=bool)
+            ids = np.array([r[0] for r in ids], dtype=np.int64)
+            mask[ids[ids < rows]] = True
+            self._live[key] = mask
+        return self._live[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE deleted = 0").fetchone()[0]
+
+    def get(self, username: str, timestamp: str) -> Optional[np.ndarray]:
+        """The stored (float32) embedding of one upload, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row FROM embeddings WHERE username = ? AND timestamp = ? AND deleted = 0 "
+                "ORDER BY row DESC LIMIT 1",
+                (username, timestamp)
+            ).fetchone()
+            matrix = self._get_matrix()
+        if row is None or matrix is None or row[0] >= matrix.shape[0]:
+            return None
+        return np.asarray(matrix[row[0]], dtype=np.float32)
+
+    def search(
+        self,
+        query: Sequence[float],
+        top_k: int = 10,
+        username: Optional[str] = None,
+        exclude: Iterable[Tuple[str, str]] = ()
+    ) -> List[Tuple[str, str, float]]:
+        """
+        The top_k most similar live uploads as (username, timestamp, cosine), best first.
+        `username` restricts the search to one user's uploads; `exclude` drops
+        (username, timestamp) records, e.g. the query upload itself.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            matrix = self._get_matrix()
+            if matrix is None:
+                return []
+            mask = self._live_mask(username, matrix.shape[0]).copy()
+            for user, ts in exclude:
+                for (row,) in self._conn.execute(
+                    "SELECT row FROM embeddings WHERE username = ? AND timestamp = ?", (user, ts)
+                ):
+                    if row < mask.shape[0]:
+                        mask[row] = False
+
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, matrix.shape[0], self.block_size):
+            end = min(start + self.block_size, matrix.shape[0])
+            live = mask[start:end]
+            if not live.any():
+                continue
+            scores = np.asarray(matrix[start:end], dtype=np.float32) @ query
+            idx = np.flatnonzero(live)
+            best_scores = np.concatenate([best_scores, scores[idx]])
+            best_rows = np.concatenate([best_rows, idx + start])
+            if best_scores.shape[0] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        order = np.argsort(-best_scores)
+        rows = [int(r) for r in best_rows[order]]
+        if not rows:
+            return []
+        with self._lock:
+            owners = dict(
+                (row, (user, ts)) for row, user, ts in self._conn.execute(
+                    f"SELECT row, username, timestamp FROM embeddings WHERE row IN ({','.join('?' * len(rows))})",
+                    rows
+                )
+            )
+        return [(*owners[row], float(score)) for row, score in zip(rows, best_scores[order]) if row in owners]
+
+    def similar_to(
+        self,
+        username: str,
+        timestamp: str,
+        top_k: int = 10,
+        scope: Optional[str] = None
+    ) -> List[Tuple[str, str, float]]:
+        """Uploads most similar to a stored one (itself excluded); scope = username to search, None = everyone"""
+        embedding = self.get(username, timestamp)
+        if embedding is None:
+            return []
+        return self.search(embedding, top_k=top_k, username=scope, exclude=[(username, timestamp)])
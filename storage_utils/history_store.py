@@ -0,0 +1,375 @@
+# storage_utils/history_store.py
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ["username", "Location", "Emotion", "Confidence", "timestamp"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    username   TEXT NOT NULL,
+    location   TEXT,
+    emotion    TEXT,
+    confidence REAL,
+    timestamp  TEXT NOT NULL,
+    deleted    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history (username, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_ts ON history (timestamp);
+CREATE TABLE IF NOT EXISTS uploads (
+    username       TEXT NOT NULL,
+    timestamp      TEXT NOT NULL,
+    location       TEXT,
+    emotion_counts TEXT NOT NULL,
+    faces          INTEGER NOT NULL,
+    deleted        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, timestamp)
+);
+CREATE TABLE IF NOT EXISTS emotion_totals (
+    username TEXT NOT NULL,
+    emotion  TEXT NOT NULL,
+    count    INTEGER NOT NULL,
+    PRIMARY KEY (username, emotion)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPLOAD_COLUMNS = ["timestamp", "Location", "emotion_counts", "faces"]
+
+
+def format_emotion_counts(counts: Dict[str, int]) -> str:
+    """{'happy': 2, 'sad': 1} -> '2 happy, 1 sad'"""
+    return ", ".join(f"{n} {emo}" for emo, n in counts.items())
+
+
+class HistoryStore:
+    """
+    SQLite-backed upload history.
+    Appends are single-transaction inserts; deletes only mark rows as
+    tombstones and a background thread purges them once enough accumulate.
+    Per-upload and per-user emotion counts are maintained on every write,
+    and a version counter changes whenever the data does.
+    An existing history.csv is imported once on first open.
+    """
+
+    def __init__(
+        self,
+        path: str = "history.db",
+        csv_path: str = "history.csv",
+        compaction_threshold: int = 1000
+    ):
+        self.path = path
+        self.compaction_threshold = compaction_threshold
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+        if csv_path:
+            self._migrate_csv(csv_path)
+        self._build_rollups()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate_csv(self, csv_path: str):
+        """
+        One-time import of the legacy history.csv (renamed to *.migrated afterwards).
+        Several processes may open the store at once: the flag is re-checked and
+        set inside one BEGIN IMMEDIATE transaction, so exactly one of them imports.
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'csv_migrated'"
+            ).fetchone()
+        if done or not os.path.exists(csv_path):
+            return
+
+        rows = []
+        try:
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                for rec in csv.DictReader(f):
+                    try:
+                        confidence = float(rec.get("Confidence") or 0)
+                    except ValueError:
+                        confidence = 0.0
+                    rows.append((
+                        rec.get("username") or "",
+                        rec.get("Location"),
+                        rec.get("Emotion"),
+                        confidence,
+                        rec.get("timestamp") or "",
+                    ))
+        except FileNotFoundError:
+            return  # another process migrated and renamed it meanwhile
+
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                done = self._conn.execute(
+                    "SELECT value FROM meta WHERE key = 'csv_migrated'"
+                ).fetchone()
+                if not done:
+                    self._conn.executemany(
+                        "INSERT INTO history (username, location, emotion, confidence, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)",
+                        (csv_path,)
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        if done:
+            return
+        try:
+            os.replace(csv_path, csv_path + ".migrated")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[HISTORY] Imported {csv_path} but could not rename it: {e}")
+        logger.info(f"[HISTORY] Migrated {len(rows)} rows from {csv_path}")
+
+    def append(
+        self,
+        username: str,
+        location: str,
+        emotions: Sequence[str],
+        confidences: Sequence[float],
+        timestamp: str
+    ):
+        """Record one upload (one row per detected face) and update its rollups"""
+        self.append_many([(username, location, emotions, confidences, timestamp)])
+
+    def append_many(self, uploads: Iterable[Tuple[str, str, Sequence[str], Sequence[float], str]]):
+        """Record several uploads in a single transaction.
+        Each item is (username, location, emotions, confidences, timestamp)."""
+        with self._lock, self._conn:
+            for username, location, emotions, confidences, timestamp in uploads:
+                self._conn.executemany(
+                    "INSERT INTO history (username, location, emotion, confidence, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (username, location, emo, float(conf), timestamp)
+                        for emo, conf in zip(emotions, confidences)
+                    ]
+                )
+                self._add_rollup(username, timestamp, location, Counter(emotions))
+            self._bump_version()
+
+    def _add_rollup(self, username: str, timestamp: str, location: str, counts: Counter):
+        row = self._conn.execute(
+            "SELECT emotion_counts FROM uploads WHERE username = ? AND timestamp = ? AND deleted = 0",
+            (username, timestamp)
+        ).fetchone()
+        merged = Counter(json.loads(row[0])) if row else Counter()
+        merged.update(counts)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO uploads (username, timestamp, location, emotion_counts, faces, deleted) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (username, timestamp, location, json.dumps(dict(merged)), sum(merged.values()))
+        )
+        self._conn.executemany(
+            "INSERT INTO emotion_totals (username, emotion, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (username, emotion) DO UPDATE SET count = count + excluded.count",
+            [(username, emo, n) for emo, n in counts.items()]
+        )
+
+    def _bump_version(self):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _build_rollups(self):
+        """One-time rollup build for rows written before rollups existed"""
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'rollups_built'"
+            ).fetchone()
+            if done:
+                return
+            try:
+                # Re-checked under the write lock: another process may have built them meanwhile
+                self._conn.execute("BEGIN IMMEDIATE")
+                done = self._conn.execute(
+                    "SELECT value FROM meta WHERE key = 'rollups_built'"
+                ).fetchone()
+                if not done:
+                    rows = self._conn.execute(
+                        "SELECT username, timestamp, MIN(location), emotion, COUNT(*) FROM history "
+                        "WHERE deleted = 0 GROUP BY username, timestamp, emotion ORDER BY MIN(id)"
+                    ).fetchall()
+                    for username, timestamp, location, emotion, n in rows:
+                        self._add_rollup(username, timestamp, location, Counter({emotion: n}))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('rollups_built', '1')"
+                    )
+                    self._bump_version()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def version(self) -> int:
+        """Changes on every write; use it as a cache key for loaded views"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def count_uploads(self, username: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM uploads WHERE username = ? AND deleted = 0",
+                (username,)
+            ).fetchone()[0]
+
+    def load_uploads(
+        self,
+        username: str,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> pd.DataFrame:
+        """One row per upload (oldest first) with its emotion-count rollup; supports paging"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, location, emotion_counts, faces FROM uploads "
+                "WHERE username = ? AND deleted = 0 ORDER BY timestamp LIMIT ? OFFSET ?",
+                (username, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return pd.DataFrame(
+            [(ts, loc, json.loads(counts), faces) for ts, loc, counts, faces in rows],
+            columns=UPLOAD_COLUMNS
+        )
+
+    def emotion_totals(self, username: str, timestamp: Optional[str] = None) -> Dict[str, int]:
+        """Emotion counts for one upload, or across all of a user's uploads"""
+        with self._lock:
+            if timestamp is None:
+                rows = self._conn.execute(
+                    "SELECT emotion, count FROM emotion_totals WHERE username = ? AND count > 0",
+                    (username,)
+                ).fetchall()
+                return dict(rows)
+            row = self._conn.execute(
+                "SELECT emotion_counts FROM uploads WHERE username = ? AND timestamp = ? AND deleted = 0",
+                (username, timestamp)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def latest_timestamp(self, username: str) -> Optional[str]:
+        """Newest upload timestamp ever recorded for a user (deleted uploads included)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(timestamp) FROM uploads WHERE username = ?", (username,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def upload_locations(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Location of each live upload among the given (username, timestamp) keys"""
+        found = {}
+        with self._lock:
+            for username, timestamp in keys:
+                row = self._conn.execute(
+                    "SELECT location FROM uploads WHERE username = ? AND timestamp = ? AND deleted = 0",
+                    (username, timestamp)
+                ).fetchone()
+                if row:
+                    found[(username, timestamp)] = row[0]
+        return found
+
+    def load_user(self, username: str) -> pd.DataFrame:
+        """All live rows for one user, oldest first, in the legacy CSV column layout"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT username, location, emotion, confidence, timestamp FROM history "
+                "WHERE username = ? AND deleted = 0 ORDER BY timestamp, id",
+                (username,)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+    def delete_uploads(self, username: str, timestamps: Iterable[str]) -> int:
+        """Tombstone every row of the given uploads; returns the number of rows marked"""
+        timestamps = list(timestamps)
+        if not timestamps:
+            return 0
+        with self._lock, self._conn:
+            for ts in timestamps:
+                row = self._conn.execute(
+                    "SELECT emotion_counts FROM uploads WHERE username = ? AND timestamp = ? AND deleted = 0",
+                    (username, ts)
+                ).fetchone()
+                if row:
+                    self._conn.executemany(
+                        "UPDATE emotion_totals SET count = count - ? WHERE username = ? AND emotion = ?",
+                        [(n, username, emo) for emo, n in json.loads(row[0]).items()]
+                    )
+            self._conn.executemany(
+                "UPDATE uploads SET deleted = 1 WHERE username = ? AND timestamp = ?",
+                [(username, ts) for ts in timestamps]
+            )
+            cur = self._conn.executemany(
+                "UPDATE history SET deleted = 1 "
+                "WHERE username = ? AND timestamp = ? AND deleted = 0",
+                [(username, ts) for ts in timestamps]
+            )
+            marked = cur.rowcount
+            self._bump_version()
+            tombstones = self._conn.execute(
+                "SELECT COUNT(*) FROM history WHERE deleted = 1"
+            ).fetchone()[0]
+        if tombstones >= self.compaction_threshold:
+            self.compact_in_background()
+        return marked
+
+    def compact(self) -> int:
+        """Purge tombstoned rows; returns the number removed"""
+        conn = self._connect()
+        try:
+            with conn:
+                removed = conn.execute("DELETE FROM history WHERE deleted = 1").rowcount
+                conn.execute("DELETE FROM uploads WHERE deleted = 1")
+                conn.execute("DELETE FROM emotion_totals WHERE count <= 0")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        logger.info(f"[HISTORY] Compaction removed {removed} tombstoned rows")
+        return removed
+
+    def compact_in_background(self):
+        """Start compact() on a daemon thread unless one is already running"""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def _run():
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                logger.warning(f"[HISTORY] Compaction failed: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=_run, name="history-compaction", daemon=True).start()
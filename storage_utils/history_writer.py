@@ -0,0 +1,132 @@
+# storage_utils/history_writer.py
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Sequence
+
+from pipeline_utils.tracing import span
+from storage_utils.history_store import HistoryStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """
+    Single background writer shared by every session in the process.
+    Uploads are queued by submit() and group-committed to the HistoryStore
+    in one transaction per batch; a batch is committed once it reaches
+    max_batch uploads or its oldest upload has waited max_latency_ms.
+    A batch that still fails after max_retries attempts is dropped; the
+    next flush() raises for it. Pending uploads are flushed at interpreter
+    shutdown.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        max_batch: int = 256,
+        max_latency_ms: float = 200.0,
+        max_retries: int = 3
+    ):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_retries = max_retries
+        self.committed = 0
+        self.batches = 0
+        self.dropped = 0
+        self._error: Optional[Exception] = None
+        self._error_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(
+        self,
+        username: str,
+        location: str,
+        emotions: Sequence[str],
+        confidences: Sequence[float],
+        timestamp: str
+    ):
+        """Queue one upload for the next group commit (returns immediately)"""
+        if self._closed:
+            raise RuntimeError("HistoryWriter is closed")
+        self._queue.put((username, location, list(emotions), list(confidences), timestamp))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything submitted so far is committed; False on timeout.
+        Raises RuntimeError if uploads were dropped since the previous flush.
+        """
+        finished = True
+        if not self._closed:
+            done = threading.Event()
+            self._queue.put(done)
+            finished = done.wait(timeout)
+        with self._error_lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError(f"History uploads were dropped: {error}") from error
+        return finished
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Commit pending uploads and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.max_latency
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                # Flush requests and shutdown only take what is already queued
+                timeout = 0 if (stopping or waiters) else deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._commit(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _commit(self, batch):
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with span("history_write", uploads=len(batch)):
+                    self.store.append_many(batch)
+                self.committed += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                error = e
+                logger.warning(f"[HISTORY WRITER] Commit of {len(batch)} uploads failed (attempt {attempt}): {e}")
+                time.sleep(0.1 * attempt)
+        logger.error(f"[HISTORY WRITER] Dropped {len(batch)} uploads after {self.max_retries} attempts")
+        with self._error_lock:
+            self.dropped += len(batch)
+            self._error = error
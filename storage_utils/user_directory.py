@@ -0,0 +1,141 @@
+# storage_utils/user_directory.py
+import csv
+import hashlib
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+class UserDirectory:
+    """
+    Username -> password-hash lookup for login and signup.
+    The "csv" backend keeps users.csv in an in-memory dict that is reloaded
+    only when the file's mtime/size changes; registrations append under an
+    exclusive file lock. The "sqlite" backend stores users in a keyed table
+    (importing an existing users.csv once).
+    """
+
+    def __init__(self, path: str = "users.csv", backend: str = "csv", db_path: str = "users.db"):
+        self.path = path
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+
+        if backend == "sqlite":
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT NOT NULL)"
+                )
+            self._import_csv()
+        elif backend != "csv":
+            raise ValueError(f"Unknown user directory backend: {backend}")
+
+    # ----------------- CSV backend -----------------
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_csv(self) -> Dict[str, str]:
+        index = {}
+        if not os.path.exists(self.path):
+            return index
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                username = row.get("username")
+                if username and username not in index:
+                    index[username] = row.get("password", "")
+        return index
+
+    def _refresh(self):
+        """Reload the index if users.csv changed since the last read (call with _lock held)"""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._index = self._read_csv()
+            self._stamp = stamp
+            logger.info(f"[USERS] Loaded {len(self._index)} users from {self.path}")
+
+    def _register_csv(self, username: str, hashed: str) -> bool:
+        with self._lock, open(self.path, "a+", newline="", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since our last read
+                self._refresh()
+                if username in self._index:
+                    return False
+                writer = csv.writer(f)
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    writer.writerow(["username", "password"])
+                writer.writerow([username, hashed])
+                f.flush()
+                os.fsync(f.fileno())
+                self._index[username] = hashed
+                self._stamp = self._file_stamp()
+                return True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ----------------- SQLite backend -----------------
+    def _import_csv(self):
+        index = self._read_csv()
+        if not index:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                index.items()
+            )
+
+    # ----------------- Public API -----------------
+    def get_password_hash(self, username: str) -> Optional[str]:
+        with self._lock:
+            if self.backend == "sqlite":
+                row = self._conn.execute(
+                    "SELECT password FROM users WHERE username = ?", (username,)
+                ).fetchone()
+                return row[0] if row else None
+            self._refresh()
+            return self._index.get(username)
+
+    def authenticate(self, username: str, password: str) -> bool:
+        stored = self.get_password_hash(username)
+        if stored is None:
+            return False
+        return hmac.compare_digest(stored, hash_password(password))
+
+    def register(self, username: str, password: str) -> bool:
+        """Add a user; returns False if the username is already taken"""
+        hashed = hash_password(password)
+        if self.backend == "sqlite":
+            try:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed)
+                    )
+                return True
+            except sqlite3.IntegrityError:
+                return False
+        return self._register_csv(username, hashed)
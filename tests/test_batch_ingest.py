@@ -0,0 +1,158 @@
+# tests/test_batch_ingest.py
+"""
+Input expansion, history timestamps, checkpoint/resume and the result cache
+setup of the batch ingestion CLI. The models are stubbed out; nothing here
+starts a worker pool.
+"""
+import logging
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+
+import batch_ingest
+from batch_ingest import TIMESTAMP_FORMAT, collect_inputs, load_checkpoint, next_timestamp
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return str(path)
+
+
+def test_collect_inputs(tmp_path):
+    a = touch(tmp_path / "album" / "b.JPG")
+    b = touch(tmp_path / "album" / "a.png")
+    c = touch(tmp_path / "album" / "nested" / "c.jpeg")
+    touch(tmp_path / "album" / "notes.txt")
+    d = touch(tmp_path / "loose" / "d.jpg")
+    e = touch(tmp_path / "loose" / "e.jpg")
+    manifest = tmp_path / "list.txt"
+    manifest.write_text(f"# backfill\n{e}\n\n{b}\n/missing/f.jpg\n", encoding="utf-8")
+
+    paths = collect_inputs([str(tmp_path / "album"), str(tmp_path / "loose" / "*.jpg"), d], str(manifest))
+    # Directories sorted per folder, then the glob, then the manifest; duplicates keep their first position
+    assert paths == [b, a, c, d, e, "/missing/f.jpg"]
+
+    csv_manifest = tmp_path / "list.csv"
+    csv_manifest.write_text(f"path,note\n{c},x\n,empty\n{a},y\n", encoding="utf-8")
+    assert collect_inputs([], str(csv_manifest)) == [c, a]
+
+
+def test_next_timestamp_steps_past_previous():
+    now = datetime.now().replace(microsecond=0)
+    first = next_timestamp()
+    assert datetime.strptime(first, TIMESTAMP_FORMAT) >= now
+    # Faster than one image per second: each upload still gets its own second
+    stamps = [first]
+    for _ in range(5):
+        stamps.append(next_timestamp(stamps[-1]))
+    parsed = [datetime.strptime(s, TIMESTAMP_FORMAT) for s in stamps]
+    assert all((b - a).total_seconds() >= 1 for a, b in zip(parsed, parsed[1:]))
+    # An old or unparsable previous timestamp falls back to the clock
+    assert datetime.strptime(next_timestamp("2001-01-01 00:00:00"), TIMESTAMP_FORMAT) >= now
+    assert datetime.strptime(next_timestamp("yesterday"), TIMESTAMP_FORMAT) >= now
+
+
+class RecordingWriter:
+    def __init__(self, log):
+        self.log = log
+
+    def flush(self):
+        self.log.append("flush")
+        return True
+
+
+def test_checkpoint_written_after_flush(tmp_path):
+    log = []
+    path = tmp_path / "checkpoint"
+    with open(path, "a", encoding="utf-8") as f:
+        batch_ingest._write_checkpoint(f, RecordingWriter(log), [])
+        assert log == []                    # nothing finished, nothing to flush
+        batch_ingest._write_checkpoint(f, RecordingWriter(log), ["a.jpg", "b.jpg"])
+        assert log == ["flush"]
+        batch_ingest._write_checkpoint(f, None, ["c.jpg"])
+    assert path.read_text(encoding="utf-8") == "a.jpg\nb.jpg\nc.jpg\n"
+    assert load_checkpoint(str(path)) == {"a.jpg", "b.jpg", "c.jpg"}
+    assert load_checkpoint(str(tmp_path / "missing")) == set() and load_checkpoint("") == set()
+
+
+class FailingWriter:
+    def flush(self):
+        raise RuntimeError("History uploads were dropped: disk I/O error")
+
+
+def test_dropped_history_rows_are_not_checkpointed(tmp_path):
+    path = tmp_path / "checkpoint"
+    with open(path, "a", encoding="utf-8") as f:
+        batch_ingest._write_checkpoint(f, FailingWriter(), ["a.jpg"])
+    # Left out of the checkpoint, so the next run retries it
+    assert load_checkpoint(str(path)) == set()
+
+
+class InlinePool:
+    """Runs each submitted image immediately in this process"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, path):
+        future = Future()
+        future.set_result(fn(path))
+        return future
+
+
+def test_resume_from_checkpoint(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    images = [touch(tmp_path / "photos" / f"{i}.jpg") for i in range(4)]
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.write_text(images[0] + "\n", encoding="utf-8")
+    processed = []
+
+    def fake_process(path):
+        processed.append(path)
+        if path == images[2]:
+            return {"path": path, "status": "error", "error": "corrupt", "detections": [], "seconds": 0.0}
+        return {"path": path, "status": "ok", "error": "", "detections": [], "location": "Unknown",
+                "seconds": 0.0}
+
+    monkeypatch.setattr(batch_ingest, "ProcessPoolExecutor", InlinePool)
+    monkeypatch.setattr(batch_ingest, "_process", fake_process)
+    argv = [str(tmp_path / "photos"), "--checkpoint", str(checkpoint), "--no-history", "--geocoder", "none"]
+
+    assert batch_ingest.main(argv) == 0
+    assert processed == images[1:]
+    assert "4 images found, 1 already done, 3 to process" in caplog.text
+    # The failed image is not checkpointed, so only it is retried
+    assert load_checkpoint(str(checkpoint)) == {images[0], images[1], images[3]}
+    processed.clear()
+    assert batch_ingest.main(argv) == 1
+    assert processed == [images[2]]
+
+
+class StubDetector:
+    def warm_up(self):
+        pass
+
+
+@pytest.mark.parametrize("mode, cached", [("offline", True), ("none", False)])
+def test_worker_cache_only_with_geocoding(tmp_path, monkeypatch, mode, cached):
+    import emotion_utils.detector
+    import location_utils.landmark
+
+    monkeypatch.setattr(emotion_utils.detector, "get_shared_detector", StubDetector)
+    monkeypatch.setattr(location_utils.landmark, "get_text_embeddings", lambda: None)
+    monkeypatch.setenv("LEADFOCAL_CACHE_DIR", str(tmp_path))
+    # _init_worker exports the mode for the pipeline; restored after the test
+    monkeypatch.delenv("LEADFOCAL_GEOCODER_MODE", raising=False)
+    monkeypatch.setattr(batch_ingest, "_worker", {})
+
+    batch_ingest._init_worker(mode, True, "batch", False)
+    assert (batch_ingest._worker["cache"] is not None) == cached
+    assert batch_ingest._worker["geocode"] == cached
@@ -0,0 +1,137 @@
+# tests/test_clip_parity.py
+"""
+The int8 and TorchScript CLIP modes must rank images against the landmark
+catalog like the float model. A small randomly initialised CLIP stands in for
+the checkpoint, so this runs without network access or downloaded weights.
+Each mode gets its own catalog embeddings and goes through the same
+score_bundle/compare path as tools/clip_parity.py.
+"""
+import copy
+import json
+import string
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from location_utils import landmark  # noqa: E402
+from location_utils.landmark import LANDMARK_KEYWORDS, apply_clip_mode  # noqa: E402
+from location_utils.landmark_catalog import LandmarkCatalog  # noqa: E402
+from tools.clip_parity import compare, score_bundle  # noqa: E402
+
+TOP_K = 5
+
+
+def tiny_processor(directory):
+    """CLIPProcessor with a character-level BPE vocabulary (no merges) and 32x32 images"""
+    from transformers import CLIPImageProcessor, CLIPProcessor, CLIPTokenizer
+
+    chars = sorted(set(string.printable.lower().strip()) | set("àáâãäåçèéêëìíîïñòóôõöùúûüí"))
+    tokens = ["<|startoftext|>", "<|endoftext|>"] + chars + [c + "</w>" for c in chars]
+    vocab_path, merges_path = directory / "vocab.json", directory / "merges.txt"
+    vocab_path.write_text(json.dumps({t: i for i, t in enumerate(tokens)}), encoding="utf-8")
+    merges_path.write_text("#version: 0.2\n", encoding="utf-8")
+    tokenizer = CLIPTokenizer(str(vocab_path), str(merges_path))
+    image_processor = CLIPImageProcessor(size={"shortest_edge": 32}, crop_size={"height": 32, "width": 32})
+    return CLIPProcessor(image_processor=image_processor, tokenizer=tokenizer), len(tokens)
+
+
+def tiny_model(vocab_size):
+    from transformers import CLIPConfig, CLIPModel
+
+    torch.manual_seed(0)
+    config = CLIPConfig(
+        text_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=4,
+                         vocab_size=vocab_size, max_position_embeddings=77, bos_token_id=0, eos_token_id=1),
+        vision_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=4,
+                           image_size=32, patch_size=8),
+        projection_dim=32,
+    )
+    model = CLIPModel(config).eval()
+    # The default init maps every image to nearly the same embedding; wider weights
+    # give each image its own ranking, so top-1 agreement means something
+    generator = torch.Generator().manual_seed(0)
+    with torch.no_grad():
+        for module in model.modules():
+            if isinstance(module, (torch.nn.Linear, torch.nn.Conv2d, torch.nn.Embedding)):
+                module.weight.normal_(0, 0.2, generator=generator)
+    return model
+
+
+def synthetic_images(count=16):
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        # Smooth blobs rather than white noise, so the embeddings are not all alike
+        small = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+        images.append(Image.fromarray(small).resize((48, 40), Image.BILINEAR))
+    return images
+
+
+@pytest.fixture(scope="module")
+def bundles(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("clip")
+    processor, vocab_size = tiny_processor(directory)
+    float_model = tiny_model(vocab_size)
+    images = synthetic_images()
+
+    def run(mode, model, encoder):
+        catalog = LandmarkCatalog.from_keywords(LANDMARK_KEYWORDS)
+        catalog.load_embeddings(processor, model, str(directory / f"catalog_{mode}.npy"))
+        return (catalog,) + score_bundle(processor, model, encoder, catalog, images, batch_size=4, top_k=TOP_K)
+
+    results = {"float": run("float", float_model, None)}
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(landmark, "_vision_encoder_cache_path", lambda name: str(directory / "vision.pt"))
+        for mode in ("int8", "torchscript"):
+            model, encoder = apply_clip_mode(copy.deepcopy(float_model), "tiny", mode)
+            results[mode] = run(mode, model, encoder)
+    return results, float_model
+
+
+def test_images_rank_differently(bundles):
+    results, _ = bundles
+    _, ranked, _, _ = results["float"]
+    assert len({image_ranked[0][0] for image_ranked in ranked}) >= 3
+
+
+def test_ranking_matches_dense_softmax(bundles):
+    results, model = bundles
+    catalog, ranked, embeds, _ = results["float"]
+    logits = float(model.logit_scale.exp()) * embeds @ np.asarray(catalog.matrix, dtype=np.float32).T
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    for row, image_ranked in zip(probs, ranked):
+        top = np.argsort(-row)[:TOP_K]
+        assert [key for key, _ in image_ranked] == [catalog.keys[i] for i in top]
+        np.testing.assert_allclose([p for _, p in image_ranked], row[top], rtol=1e-4)
+
+
+def test_torchscript_matches_float(bundles):
+    results, _ = bundles
+    _, ref_ranked, ref_embeds, _ = results["float"]
+    _, ranked, embeds, _ = results["torchscript"]
+    agree, max_diff, cosine, overlap = compare(ref_ranked, ref_embeds, ranked, embeds, TOP_K)
+    assert agree.all()
+    assert overlap == 1.0
+    assert cosine.min() > 0.9999
+    assert max_diff.max() < 1e-4
+
+
+def test_int8_close_to_float(bundles):
+    results, _ = bundles
+    _, ref_ranked, ref_embeds, _ = results["float"]
+    _, ranked, embeds, _ = results["int8"]
+    agree, max_diff, cosine, overlap = compare(ref_ranked, ref_embeds, ranked, embeds, TOP_K)
+    assert cosine.mean() >= 0.99  # the tool's default --min-cosine
+    assert overlap >= 0.8
+    # A random model has near-ties that a trained checkpoint does not, so a top-1 flip
+    # is tolerated as long as it stays within the float top-k (the tool gates real
+    # checkpoints at 95% agreement)
+    assert agree.mean() >= 0.75
+    for ref, candidate in zip(ref_ranked, ranked):
+        assert candidate[0][0] in {key for key, _ in ref}
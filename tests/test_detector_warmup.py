@@ -0,0 +1,90 @@
+# tests/test_detector_warmup.py
+"""
+warm_up marks the detector ready only after both models actually loaded and
+ran; a load failure raises (or, in the background, is logged) and readiness
+stays False. Stubs stand in for the emotion model and face detection.
+"""
+import logging
+
+import numpy as np
+import pytest
+
+from emotion_utils.detector import EMOTION_LABELS, EmotionDetector
+
+
+class StubModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, batch, batch_size=64):
+        self.calls += 1
+        return np.full((len(batch), len(EMOTION_LABELS)), 1.0 / len(EMOTION_LABELS), dtype=np.float32)
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    detector = EmotionDetector(detector_backend="haar", emotion_backend="deepface")
+    model = StubModel()
+    monkeypatch.setattr(detector, "_emotion_model", lambda: model)
+    # A blank frame has no faces
+    monkeypatch.setattr(detector, "_extract_faces", lambda img, keep_placeholder=True: [])
+    return detector, model
+
+
+def test_warm_up_sets_ready_once(detector, caplog):
+    caplog.set_level(logging.INFO)
+    detector, model = detector
+    assert not detector.is_ready()
+    detector.warm_up()
+    assert detector.is_ready() and detector.warm_up_seconds is not None
+    assert "Emotion detector warmed up" in caplog.text
+    calls = model.calls
+    detector.warm_up()
+    assert model.calls == calls
+
+
+def test_emotion_model_failure_is_not_ready(detector, monkeypatch):
+    detector, _ = detector
+
+    def missing():
+        raise FileNotFoundError("emotion.tflite")
+
+    monkeypatch.setattr(detector, "_emotion_model", missing)
+    with pytest.raises(FileNotFoundError):
+        detector.warm_up()
+    assert not detector.is_ready()
+
+
+def test_face_detector_failure_is_not_swallowed(detector, monkeypatch):
+    detector, _ = detector
+
+    def broken(img, keep_placeholder=True):
+        raise ImportError("No module named 'deepface'")
+
+    monkeypatch.setattr(detector, "_extract_faces", broken)
+    # detect_emotions hides the error, as it should for uploads...
+    assert detector.detect_emotions(np.zeros((64, 64, 3), dtype=np.uint8)) == []
+    # ...but warm-up must not report the detector as ready
+    with pytest.raises(ImportError):
+        detector.warm_up()
+    assert not detector.is_ready()
+
+
+def test_placeholder_faces_are_classified(detector, monkeypatch):
+    detector, model = detector
+    region = {"x": 0, "y": 0, "w": 224, "h": 224}
+    monkeypatch.setattr(detector, "_extract_faces", lambda img, keep_placeholder=True: [(np.zeros((48, 48), np.float32), region)])
+    detector.warm_up()
+    assert model.calls == 2 and detector.is_ready()
+
+
+def test_background_failure_is_logged(detector, monkeypatch, caplog):
+    detector, _ = detector
+
+    def missing():
+        raise FileNotFoundError("emotion.tflite")
+
+    monkeypatch.setattr(detector, "_emotion_model", missing)
+    detector.start_warm_up().join(5)
+    assert not detector.is_ready()
+    assert "Warm-up failed" in caplog.text
@@ -0,0 +1,124 @@
+# tests/test_embedding_store.py
+"""
+The blocked float16 scan must rank like a brute-force cosine search over the
+same vectors, whatever the block size; stored vectors round-trip through
+float16, and tombstoned or replaced uploads never come back from a search.
+"""
+import numpy as np
+import pytest
+
+from storage_utils.embedding_store import EmbeddingStore
+
+DIM = 64
+USERS = ["alice", "bob", "carol"]
+
+
+def random_uploads(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIM)).astype(np.float32)
+    keys = [(USERS[i % 3], f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}") for i in range(count)]
+    return keys, vectors
+
+
+def stored(vectors):
+    """What the store keeps: unit vectors rounded to float16"""
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return unit.astype(np.float16).astype(np.float32)
+
+
+def brute_force(keys, matrix, query, top_k, allowed):
+    query = query / np.linalg.norm(query)
+    scores = matrix @ query
+    order = [i for i in np.argsort(-scores) if allowed(keys[i])][:top_k]
+    return [(*keys[i], float(scores[i])) for i in order]
+
+
+def assert_same(got, want):
+    assert [(u, t) for u, t, _ in got] == [(u, t) for u, t, _ in want]
+    np.testing.assert_allclose([s for _, _, s in got], [s for _, _, s in want], rtol=1e-5, atol=1e-6)
+
+
+@pytest.fixture
+def filled(tmp_path):
+    keys, vectors = random_uploads(500)
+    store = EmbeddingStore(str(tmp_path / "emb"), block_size=37)
+    # Several appends, so rows land in the file in more than one write
+    for start in range(0, 500, 120):
+        store.add_many((*keys[i], vectors[i]) for i in range(start, min(start + 120, 500)))
+    return store, keys, vectors
+
+
+@pytest.mark.parametrize("block_size", [1, 37, 500, 4096])
+def test_top_k_matches_brute_force(filled, block_size):
+    store, keys, vectors = filled
+    store.block_size = block_size
+    matrix = stored(vectors)
+    rng = np.random.default_rng(1)
+    for query in rng.normal(size=(5, DIM)).astype(np.float32):
+        assert_same(store.search(query, top_k=10), brute_force(keys, matrix, query, 10, lambda k: True))
+        assert_same(store.search(query, top_k=7, username="bob"),
+                    brute_force(keys, matrix, query, 7, lambda k: k[0] == "bob"))
+    # More results asked for than there are live rows
+    assert len(store.search(vectors[0], top_k=1000)) == 500
+
+
+def test_similar_to_excludes_the_query_upload(filled):
+    store, keys, vectors = filled
+    matrix = stored(vectors)
+    results = store.similar_to(*keys[4], top_k=5)
+    assert keys[4] not in [(u, t) for u, t, _ in results]
+    assert_same(results, brute_force(keys, matrix, matrix[4], 5, lambda k: k != keys[4]))
+    assert store.similar_to("nobody", "2024-01-01 00:00:00") == []
+
+
+def test_float16_round_trip(tmp_path):
+    keys, vectors = random_uploads(10)
+    path = str(tmp_path / "emb")
+    EmbeddingStore(path).add_many((*k, v) for k, v in zip(keys, vectors))
+    reopened = EmbeddingStore(path)
+    assert reopened.dim == DIM and len(reopened) == 10
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for key, expected in zip(keys, unit):
+        got = reopened.get(*key)
+        assert got.dtype == np.float32
+        np.testing.assert_allclose(got, expected, atol=1e-3)
+        assert float(got @ expected) == pytest.approx(1.0, abs=1e-3)
+    assert reopened.get("alice", "never") is None
+    with pytest.raises(ValueError):
+        reopened.add("alice", "2025-01-01 00:00:00", np.ones(DIM + 1))
+
+
+def test_deleted_and_replaced_uploads_never_returned(filled):
+    store, keys, vectors = filled
+    gone = keys[:50:3] + [keys[7]]
+    assert store.delete(gone[0][0], [ts for user, ts in gone if user == gone[0][0]]) > 0
+    for user in USERS[1:]:
+        store.delete(user, [ts for u, ts in gone if u == user])
+    # Replacing an upload's embedding tombstones the old row
+    store.add(*keys[100], -vectors[100])
+    live = len(store)
+    assert live == 500 - len(set(gone))
+
+    rng = np.random.default_rng(2)
+    queries = [vectors[i] for i, key in enumerate(keys) if key in gone][:5] + [vectors[100]]
+    queries += list(rng.normal(size=(3, DIM)).astype(np.float32))
+    for query in queries:
+        results = store.search(query, top_k=live + 10)
+        found = [(u, t) for u, t, _ in results]
+        assert len(found) == live == len(set(found))
+        assert not set(found) & set(gone)
+    # Only the replacement vector is left for the replaced upload
+    np.testing.assert_allclose(store.get(*keys[100]), -stored(vectors[100:101])[0], atol=1e-3)
+    best = store.search(vectors[100], top_k=1)[0]
+    assert (best[0], best[1]) != keys[100]
+
+
+def test_torn_write_is_dropped(tmp_path):
+    keys, vectors = random_uploads(3)
+    store = EmbeddingStore(str(tmp_path / "emb"))
+    store.add(*keys[0], vectors[0])
+    with open(store.data_path, "ab") as f:
+        f.write(b"\x00" * (DIM + 3))     # half a row from a crash
+    store.add(*keys[1], vectors[1])
+    assert [(u, t) for u, t, _ in store.search(vectors[1], top_k=5)] == [keys[1], keys[0]]
+    np.testing.assert_allclose(store.get(*keys[1]), stored(vectors[1:2])[0], atol=1e-6)
@@ -0,0 +1,83 @@
+# tests/test_emotion_backends.py
+"""
+Exported emotion backends must classify like the Keras model they came from,
+and a missing export must not take the app down. A small random Keras model
+with the emotion model's input and output shapes stands in for DeepFace's
+weights, so the parity check runs offline; tools/emotion_parity.py does the
+same comparison against the real model on photos.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from emotion_utils import backends
+from emotion_utils.backends import TFLiteBackend, create_backend
+
+
+class _StubDeepFace:
+    name = "deepface"
+
+
+@pytest.mark.parametrize("name", ["tflite", "onnx"])
+def test_missing_model_falls_back_to_deepface(name, tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(backends, "DeepFaceBackend", _StubDeepFace)
+    missing = str(tmp_path / "emotion.tflite")
+    backend = create_backend(name, missing)
+    assert isinstance(backend, _StubDeepFace)
+    assert missing in caplog.text and "Falling back" in caplog.text
+
+    with pytest.raises(FileNotFoundError):
+        create_backend(name, missing, fallback=False)
+
+
+def synthetic_faces(count, seed):
+    """Smooth 48x48 grayscale patches in [0, 1]"""
+    rng = np.random.default_rng(seed)
+    return np.stack([
+        cv2.resize(rng.random((6, 6), dtype=np.float32), (48, 48), interpolation=cv2.INTER_CUBIC).clip(0, 1)
+        for _ in range(count)
+    ])
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    tf = pytest.importorskip("tensorflow")
+
+    tf.keras.utils.set_random_seed(0)
+    # Same input/output contract as DeepFace's emotion CNN, a fraction of its size
+    return tf.keras.Sequential([
+        tf.keras.layers.Input((48, 48, 1)),
+        tf.keras.layers.Conv2D(16, 5, activation="relu"),
+        tf.keras.layers.MaxPooling2D(4),
+        tf.keras.layers.Conv2D(32, 3, activation="relu"),
+        tf.keras.layers.AveragePooling2D(3),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(64, activation="relu"),
+        # A wide output layer, so the classes are not all near 1/7
+        tf.keras.layers.Dense(7, activation="softmax",
+                              kernel_initializer=tf.keras.initializers.RandomNormal(stddev=1.0)),
+    ])
+
+
+@pytest.mark.parametrize("kind, min_agreement, max_diff", [
+    ("float32", 1.0, 1e-5),
+    ("float16", 1.0, 1e-3),
+    ("int8", 0.9, 0.03),
+])
+def test_tflite_export_matches_keras(keras_model, kind, min_agreement, max_diff, tmp_path):
+    from tools.export_emotion_model import convert
+
+    path = tmp_path / f"emotion_{kind}.tflite"
+    path.write_bytes(convert(keras_model, kind, synthetic_faces(64, seed=1)))
+    backend = create_backend("tflite", str(path))
+    assert isinstance(backend, TFLiteBackend)
+
+    batch = synthetic_faces(40, seed=2)[..., np.newaxis]
+    expected = keras_model.predict(batch, verbose=0)
+    # 40 faces in batches of 16 exercise the interpreter's tensor resizing
+    probs = backend.predict(batch, batch_size=16)
+    probs = probs / probs.sum(axis=1, keepdims=True)
+
+    assert probs.shape == (40, 7)
+    assert (probs.argmax(axis=1) == expected.argmax(axis=1)).mean() >= min_agreement
+    assert np.abs(probs - expected).max() <= max_diff
@@ -0,0 +1,76 @@
+# tests/test_emotion_batching.py
+"""
+detect_emotions_batch classifies every face of every image together, and
+maps the scores back to the image and box each face came from. A stub
+stands in for the emotion model and face detection is patched out.
+"""
+import numpy as np
+import pytest
+
+from emotion_utils.detector import EMOTION_LABELS, EmotionDetector
+
+
+class StubModel:
+    """Scores a crop by its mean brightness, so each face's label is predictable"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, batch, batch_size=64):
+        self.batches.append(len(batch))
+        scores = np.full((len(batch), len(EMOTION_LABELS)), 0.1, dtype=np.float32)
+        labels = np.round(batch.reshape(len(batch), -1).mean(axis=1) * 10).astype(int) % len(EMOTION_LABELS)
+        scores[np.arange(len(batch)), labels] = 0.4
+        return scores
+
+
+def face(label):
+    return np.full((48, 48), label / 10, dtype=np.float32)
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    detector = EmotionDetector(detector_backend="haar", emotion_backend="deepface")
+    model = StubModel()
+    monkeypatch.setattr(detector, "_emotion_model", lambda: model)
+    # Each "image" is the list of labels of its faces
+    monkeypatch.setattr(detector, "_extract_faces", lambda labels: [
+        (face(label), {"x": 10 * k, "y": 0, "w": 8, "h": 8}) for k, label in enumerate(labels)
+    ])
+    return detector, model
+
+
+def test_faces_from_all_images_share_one_pass(detector):
+    detector, model = detector
+    results = detector.detect_emotions_batch([[3, 4], [], [6], [0, 1, 2]])
+    assert model.batches == [6]
+    assert [[d["emotion"] for d in dets] for dets in results] == [
+        ["happy", "sad"], [], ["neutral"], ["angry", "disgust", "fear"]
+    ]
+    assert [d["x"] for d in results[3]] == [0, 10, 20]
+    # Scores are normalized to percentages
+    assert results[0][0]["confidence"] == 40.0
+
+
+def test_batch_size_is_passed_through(detector, monkeypatch):
+    detector, model = detector
+    sizes = []
+    predict = model.predict
+    monkeypatch.setattr(model, "predict", lambda batch, batch_size=64: sizes.append(batch_size) or predict(batch))
+    detector.detect_emotions_batch([[1] * 5], batch_size=2)
+    assert sizes == [2]
+
+
+def test_failing_image_does_not_drop_the_others(detector, monkeypatch):
+    detector, model = detector
+    extract = detector._extract_faces
+
+    def flaky(labels):
+        if labels is None:
+            raise ValueError("unreadable image")
+        return extract(labels)
+
+    monkeypatch.setattr(detector, "_extract_faces", flaky)
+    results = detector.detect_emotions_batch([[3], None, [5]])
+    assert [[d["emotion"] for d in dets] for dets in results] == [["happy"], [], ["surprise"]]
+    assert detector.detect_emotions_batch([[], None]) == [[], []] and model.batches == [2]
@@ -0,0 +1,63 @@
+# tests/test_emotion_preprocessing.py
+"""
+The emotion classifier must see the same 48x48 input whether or not faces
+were detected on a downscaled proxy, and that input must match what
+DeepFace.analyze (the original detector) fed the model.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from emotion_utils.detector import EmotionDetector
+
+
+def analyze_input(rgb_face):
+    """DeepFace 0.0.79 analyze: extract_faces resize-and-pad to 224, /255, BGR2GRAY, resize to 48"""
+    factor = min(224 / rgb_face.shape[0], 224 / rgb_face.shape[1])
+    face = cv2.resize(rgb_face, (int(rgb_face.shape[1] * factor), int(rgb_face.shape[0] * factor)))
+    d0, d1 = 224 - face.shape[0], 224 - face.shape[1]
+    face = np.pad(face, ((d0 // 2, d0 - d0 // 2), (d1 // 2, d1 - d1 // 2), (0, 0)), "constant")
+    face = face.astype(np.float32) / 255
+    return cv2.resize(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY), (48, 48))
+
+
+@pytest.mark.parametrize("shape", [(120, 90), (90, 160), (224, 224)])
+def test_model_crop_matches_analyze_preprocessing(shape):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    region = {"x": 40, "y": 30, "w": shape[1], "h": shape[0]}
+    crop = image[30:30 + shape[0], 40:40 + shape[1]]
+
+    # The original detector passed an RGB buffer to DeepFace.analyze
+    expected = analyze_input(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+    np.testing.assert_allclose(EmotionDetector.model_crop(image, region), expected, atol=1e-6)
+
+
+def test_face_gray_undoes_extract_faces_channel_flip():
+    rng = np.random.default_rng(1)
+    content = rng.random((224, 224, 3), dtype=np.float32)  # analyze's view of the face
+    public = content[:, :, ::-1]  # what DeepFace.extract_faces returns
+    expected = cv2.resize(cv2.cvtColor(content, cv2.COLOR_BGR2GRAY), (48, 48))
+    np.testing.assert_allclose(EmotionDetector._face_gray(public), expected, atol=1e-6)
+
+
+def test_detect_emotions_matches_deepface_analyze():
+    """End to end against DeepFace.analyze; needs deepface and its model weights"""
+    DeepFace = pytest.importorskip("deepface.DeepFace")
+    try:
+        DeepFace.build_model("Emotion")
+    except Exception as e:
+        pytest.skip(f"emotion weights unavailable: {e}")
+
+    # No face in the image: both take the whole-image path, at full size and via the proxy
+    rng = np.random.default_rng(2)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (600, 800, 3), dtype=np.uint8), (0, 0), 5)
+    baseline = DeepFace.analyze(img_path=cv2.cvtColor(image, cv2.COLOR_BGR2RGB), actions=["emotion"],
+                                enforce_detection=False, detector_backend="opencv", silent=True)
+    for max_side in (0, 320):
+        detector = EmotionDetector(detector_backend="opencv", detection_max_side=max_side,
+                                   emotion_backend="deepface")
+        detections = detector.detect_emotions(image)
+        assert [d["emotion"] for d in detections] == [r["dominant_emotion"] for r in baseline]
+        for det, ref in zip(detections, baseline):
+            assert det["confidence"] == pytest.approx(ref["emotion"][ref["dominant_emotion"]], abs=0.5)
@@ -0,0 +1,133 @@
+# tests/test_exif_fast.py
+"""
+The header-only GPS reader must decode the same values PIL does, in both
+TIFF byte orders, and raise ValueError (so extract_gps falls back to PIL)
+for anything it does not handle.
+"""
+import io
+import struct
+
+import pytest
+from PIL import Image
+from PIL.ExifTags import GPSTAGS
+
+from location_utils.exif_fast import GPS_IFD_TAG, read_gps
+from location_utils.extract_gps import extract_gps
+
+# (tag, field type, values); rationals as (numerator, denominator) pairs
+GPS_ENTRIES = [
+    (0, 1, (2, 3, 0, 0)),                         # GPSVersionID
+    (1, 2, "N"),                                  # GPSLatitudeRef
+    (2, 5, ((3, 1), (9, 1), (2844, 100))),        # GPSLatitude
+    (3, 2, "E"),                                  # GPSLongitudeRef
+    (4, 5, ((101, 1), (42, 1), (4176, 100))),     # GPSLongitude
+    (5, 1, (0,)),                                 # GPSAltitudeRef
+    (6, 5, ((4215, 100),)),                       # GPSAltitude
+]
+_CODES = {1: "B", 3: "H", 4: "L", 5: "L"}
+
+
+def _value_bytes(order, field_type, values):
+    if field_type == 2:
+        return values.encode("ascii") + b"\x00"
+    if field_type == 5:
+        values = [v for pair in values for v in pair]
+    return struct.pack(f"{order}{len(values)}{_CODES[field_type]}", *values)
+
+
+def _count(field_type, values):
+    return len(values) + 1 if field_type == 2 else len(values)
+
+
+def build_tiff(order, entries=GPS_ENTRIES, pointer_type=4):
+    """TIFF block with an IFD0 holding only the GPS IFD pointer"""
+    gps_offset = 8 + 2 + 12 + 4
+    data_offset = gps_offset + 2 + 12 * len(entries) + 4
+    ifd, data = b"", b""
+    for tag, field_type, values in entries:
+        raw = _value_bytes(order, field_type, values)
+        if len(raw) <= 4:
+            ifd += struct.pack(order + "HHL", tag, field_type, _count(field_type, values)) + raw.ljust(4, b"\x00")
+        else:
+            ifd += struct.pack(order + "HHLL", tag, field_type, _count(field_type, values), data_offset + len(data))
+            data += raw
+    header = (b"II" if order == "<" else b"MM") + struct.pack(order + "HL", 42, 8)
+    ifd0 = struct.pack(order + "H", 1) + struct.pack(order + "HHLL", GPS_IFD_TAG, pointer_type, 1, gps_offset)
+    return header + ifd0 + struct.pack(order + "L", 0) + struct.pack(order + "H", len(entries)) + ifd + \
+        struct.pack(order + "L", 0) + data
+
+
+def build_jpeg(tiff=None):
+    """A small JPEG, with an APP1 Exif segment holding `tiff` when given"""
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 12), (200, 120, 40)).save(buf, "JPEG")
+    jpeg = buf.getvalue()
+    if tiff is None:
+        return jpeg
+    payload = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+
+def pil_gps(jpeg):
+    """GPS tags as PIL reads them, in read_gps's form"""
+    ifd = Image.open(io.BytesIO(jpeg)).getexif().get_ifd(GPS_IFD_TAG)
+    out = {}
+    for tag, value in ifd.items():
+        if isinstance(value, tuple):
+            value = tuple(float(v) for v in value)
+        elif not isinstance(value, (str, bytes)):
+            value = float(value)
+        out[GPSTAGS.get(tag, tag)] = value
+    return out
+
+
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_matches_pil(order):
+    jpeg = build_jpeg(build_tiff(order))
+    fast = read_gps(jpeg)
+    reference = pil_gps(jpeg)
+    assert set(fast) == set(reference)
+    for name, value in reference.items():
+        if isinstance(value, tuple):
+            assert fast[name] == pytest.approx(value)
+        elif isinstance(value, float):
+            assert fast[name] == pytest.approx(value)
+        else:
+            assert fast[name] == value
+    assert fast["GPSLatitude"] == pytest.approx((3.0, 9.0, 28.44))
+
+
+def test_pil_written_exif():
+    exif = Image.Exif()
+    exif.get_ifd(GPS_IFD_TAG).update({1: "S", 2: (33.0, 51.0, 35.9), 3: "E", 4: (151.0, 12.0, 40.2)})
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 12)).save(buf, "JPEG", exif=exif)
+    fast = read_gps(buf.getvalue())
+    assert fast["GPSLatitudeRef"] == "S"
+    assert fast["GPSLongitude"] == pytest.approx((151.0, 12.0, 40.2))
+
+
+def test_no_exif_or_no_gps():
+    assert read_gps(build_jpeg()) is None
+    assert read_gps(build_jpeg(build_tiff("<", entries=[]))) is None
+
+
+@pytest.mark.parametrize("data", [
+    b"\x89PNG\r\n\x1a\n" + b"\x00" * 32,                    # not a JPEG
+    build_jpeg(build_tiff("<"))[:40],                        # EXIF block cut short
+    build_jpeg(build_tiff("<", pointer_type=99)),            # GPS pointer of an unknown type
+])
+def test_unhandled_input_raises_value_error(data):
+    with pytest.raises(ValueError):
+        read_gps(data)
+
+
+def test_extract_gps_falls_back_to_pil():
+    # An unknown pointer type defeats the fast reader, and PIL finds no GPS either
+    assert extract_gps(build_jpeg(build_tiff("<", pointer_type=99))) is None
+    # Not a JPEG: PIL reads the eXIf chunk
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 12)).save(buf, "PNG", exif=b"Exif\x00\x00" + build_tiff(">"))
+    gps = extract_gps(buf.getvalue())
+    assert gps["GPSLatitudeRef"] == "N"
+    assert tuple(float(v) for v in gps["GPSLatitude"]) == pytest.approx((3.0, 9.0, 28.44))
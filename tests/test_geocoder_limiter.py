@@ -0,0 +1,134 @@
+# tests/test_geocoder_limiter.py
+"""
+The shared Nominatim rate limiter, the per-lookup deadline and the retry
+backoff. A stub stands in for Nominatim, so nothing goes over the network.
+"""
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from location_utils import geocoder
+
+DELAY = 0.2
+
+
+class StubNominatim:
+    """Fails the first `failures` calls, then answers after `latency` seconds"""
+
+    def __init__(self, failures=0, latency=0.0):
+        self.failures = failures
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def reverse(self, coords, language="en"):
+        with self._lock:
+            self.calls.append(time.monotonic())
+            failing = len(self.calls) <= self.failures
+        time.sleep(self.latency)
+        if failing:
+            raise ConnectionError("service unavailable")
+        return SimpleNamespace(address=f"Somewhere near {coords[0]:.1f}, {coords[1]:.1f}")
+
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    monkeypatch.setattr(geocoder, "MIN_DELAY_SECONDS", DELAY)
+    monkeypatch.setattr(geocoder, "_next_slot", 0.0)
+    monkeypatch.setattr(geocoder, "get_geocode_cache", lambda: None)
+
+
+def lookup(stub, monkeypatch, coords=(3.1, 101.7), deadline=5.0, **kwargs):
+    monkeypatch.setattr(geocoder, "geolocator", stub)
+    return geocoder.get_address_async(coords, mode="online", deadline=deadline, **kwargs)
+
+
+def test_slots_are_spaced(monkeypatch):
+    waits = [geocoder._reserve_slot() for _ in range(3)]
+    assert waits[0] == pytest.approx(0.0, abs=0.01)
+    assert waits[1] == pytest.approx(DELAY, abs=0.01)
+    assert waits[2] == pytest.approx(2 * DELAY, abs=0.01)
+
+
+def test_slot_past_deadline_is_not_reserved():
+    geocoder._reserve_slot()
+    booked = geocoder._next_slot
+    assert geocoder._reserve_slot(deadline=time.monotonic() + DELAY / 2) is None
+    assert geocoder._next_slot == booked
+    assert geocoder._reserve_slot(deadline=time.monotonic() + 2 * DELAY) is not None
+    assert geocoder._next_slot == pytest.approx(booked + DELAY)
+
+
+def test_concurrent_lookups_respect_the_rate_limit(monkeypatch):
+    stub = StubNominatim()
+
+    async def run():
+        return await asyncio.gather(*(lookup(stub, monkeypatch, coords=(i, i)) for i in range(4)))
+
+    addresses = asyncio.run(run())
+    assert addresses == [f"Somewhere near {i:.1f}, {i:.1f}" for i in range(4)]
+    gaps = [b - a for a, b in zip(sorted(stub.calls), sorted(stub.calls)[1:])]
+    assert all(gap >= DELAY * 0.9 for gap in gaps)
+
+
+def test_abandoned_lookups_do_not_grow_the_backlog(monkeypatch):
+    stub = StubNominatim()
+
+    async def burst():
+        # Only the first two fit before the deadline; the rest give up
+        return await asyncio.gather(*(lookup(stub, monkeypatch, coords=(i, i), deadline=1.5 * DELAY)
+                                      for i in range(20)))
+
+    addresses = asyncio.run(burst())
+    assert sum(a.startswith("Somewhere") for a in addresses) == 2
+    assert addresses.count("Geocoding service unavailable") == 18
+    # The limiter only moved on for the two requests that were sent
+    assert geocoder._next_slot - time.monotonic() < 2 * DELAY
+    start = time.monotonic()
+    assert asyncio.run(lookup(stub, monkeypatch, deadline=3 * DELAY)).startswith("Somewhere")
+    assert time.monotonic() - start < 3 * DELAY
+
+
+def test_retries_with_backoff(monkeypatch):
+    stub = StubNominatim(failures=2)
+    attempts = []
+
+    def no_wait(attempt):
+        attempts.append(attempt)
+        return 0.0
+
+    monkeypatch.setattr(geocoder, "_backoff_delay", no_wait)
+    assert asyncio.run(lookup(stub, monkeypatch)).startswith("Somewhere")
+    assert attempts == [0, 1] and len(stub.calls) == 3
+
+    stub = StubNominatim(failures=10)
+    attempts.clear()
+    assert asyncio.run(lookup(stub, monkeypatch, max_attempts=3)) == "Geocoding service unavailable"
+    assert len(stub.calls) == 3
+
+
+def test_backoff_delay_bounds():
+    random.seed(0)
+    for attempt in range(8):
+        ceiling = min(8.0, 0.5 * 2 ** attempt)
+        delays = [geocoder._backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= ceiling for d in delays)
+        # Full jitter: spread over the whole range, not pinned to the ceiling
+        assert min(delays) < ceiling / 4 and max(delays) > ceiling * 3 / 4
+
+
+def test_deadline_bounds_a_slow_service(monkeypatch):
+    stub = StubNominatim(latency=1.0)
+
+    async def timed():
+        start = time.monotonic()
+        address = await lookup(stub, monkeypatch, deadline=0.3)
+        return address, time.monotonic() - start
+
+    address, elapsed = asyncio.run(timed())
+    assert address == "Geocoding service unavailable"
+    assert elapsed < 0.6
@@ -0,0 +1,125 @@
+# tests/test_history_store.py
+"""
+Legacy CSV import (once, even with several processes opening the store),
+rollups kept in step with appends and deletes, and compaction of tombstones.
+"""
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import pytest
+
+from storage_utils.history_store import HistoryStore
+
+CSV_HEADER = "username,Location,Emotion,Confidence,timestamp\n"
+
+
+def write_legacy_csv(path, uploads=20):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(CSV_HEADER)
+        for i in range(uploads):
+            ts = f"2024-01-01 10:00:{i:02d}"
+            f.write(f"alice,Kuala Lumpur,happy,0.9,{ts}\n")
+            f.write(f"alice,Kuala Lumpur,{'sad' if i % 2 else 'happy'},0.8,{ts}\n")
+        f.write("bob,Paris,neutral,not-a-number,2024-01-02 09:00:00\n")
+
+
+def test_csv_migrated_once(tmp_path):
+    db, csv_path = str(tmp_path / "history.db"), str(tmp_path / "history.csv")
+    write_legacy_csv(csv_path)
+    store = HistoryStore(db, csv_path=csv_path)
+    assert len(store.load_user("alice")) == 40
+    assert store.load_user("bob")["Confidence"].tolist() == [0.0]
+    assert not os.path.exists(csv_path) and os.path.exists(csv_path + ".migrated")
+    # Rollups are built from the imported rows
+    assert store.count_uploads("alice") == 20
+    assert store.emotion_totals("alice") == {"happy": 30, "sad": 10}
+
+    # A CSV reappearing later is not imported again
+    write_legacy_csv(csv_path)
+    assert len(HistoryStore(db, csv_path=csv_path).load_user("alice")) == 40
+
+
+def _open_store(args):
+    db, csv_path = args
+    store = HistoryStore(db, csv_path=csv_path)
+    return len(store.load_user("alice")), store.emotion_totals("alice")
+
+
+def test_concurrent_migration_imports_once(tmp_path):
+    db, csv_path = str(tmp_path / "history.db"), str(tmp_path / "history.csv")
+    write_legacy_csv(csv_path)
+    with multiprocessing.get_context("spawn").Pool(6) as pool:
+        results = pool.map(_open_store, [(db, csv_path)] * 6)
+    assert results == [(40, {"happy": 30, "sad": 10})] * 6
+    assert not os.path.exists(csv_path) and os.path.exists(csv_path + ".migrated")
+
+
+def test_append_and_rollups(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), csv_path="")
+    version = store.version()
+    store.append_many([
+        ("alice", "KL", ["happy", "happy", "sad"], [0.9, 0.8, 0.7], "2024-01-01 10:00:00"),
+        ("alice", "Paris", ["neutral"], [0.6], "2024-01-01 11:00:00"),
+        ("bob", "Rome", ["angry"], [0.5], "2024-01-01 12:00:00"),
+    ])
+    assert store.version() > version
+    uploads = store.load_uploads("alice")
+    assert uploads["timestamp"].tolist() == ["2024-01-01 10:00:00", "2024-01-01 11:00:00"]
+    assert uploads["faces"].tolist() == [3, 1]
+    assert store.emotion_totals("alice", "2024-01-01 10:00:00") == {"happy": 2, "sad": 1}
+    assert store.emotion_totals("alice") == {"happy": 2, "sad": 1, "neutral": 1}
+    assert store.load_uploads("alice", limit=1, offset=1)["Location"].tolist() == ["Paris"]
+    assert store.latest_timestamp("alice") == "2024-01-01 11:00:00"
+
+
+def test_delete_and_compact(tmp_path):
+    db = str(tmp_path / "history.db")
+    store = HistoryStore(db, csv_path="", compaction_threshold=10 ** 6)
+    store.append("alice", "KL", ["happy", "sad"], [0.9, 0.8], "2024-01-01 10:00:00")
+    store.append("alice", "KL", ["happy"], [0.7], "2024-01-01 11:00:00")
+
+    assert store.delete_uploads("alice", ["2024-01-01 10:00:00"]) == 2
+    assert store.count_uploads("alice") == 1
+    assert store.emotion_totals("alice") == {"happy": 1}
+    assert len(store.load_user("alice")) == 1
+
+    assert store.compact() == 2
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM history WHERE deleted = 1").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0] == 1
+        assert conn.execute("SELECT emotion FROM emotion_totals").fetchall() == [("happy",)]
+    # Re-uploading under a compacted timestamp starts from zero
+    store.append("alice", "KL", ["neutral"], [0.5], "2024-01-01 10:00:00")
+    assert store.emotion_totals("alice", "2024-01-01 10:00:00") == {"neutral": 1}
+
+
+def test_rollups_built_for_legacy_rows(tmp_path):
+    db = str(tmp_path / "history.db")
+    HistoryStore(db, csv_path="")
+    with sqlite3.connect(db) as conn:
+        conn.executemany(
+            "INSERT INTO history (username, location, emotion, confidence, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [("carol", "Oslo", "fear", 0.4, "2023-05-05 08:00:00"),
+             ("carol", "Oslo", "fear", 0.3, "2023-05-05 08:00:00")]
+        )
+        conn.execute("DELETE FROM meta WHERE key = 'rollups_built'")
+    store = HistoryStore(db, csv_path="")
+    assert store.emotion_totals("carol") == {"fear": 2}
+    assert HistoryStore(db, csv_path="").emotion_totals("carol") == {"fear": 2}
+
+
+@pytest.mark.parametrize("threshold, expect_compaction", [(1, True), (10 ** 6, False)])
+def test_background_compaction_threshold(tmp_path, threshold, expect_compaction):
+    db = str(tmp_path / "history.db")
+    store = HistoryStore(db, csv_path="", compaction_threshold=threshold)
+    store.append("alice", "KL", ["happy"], [0.9], "2024-01-01 10:00:00")
+    store.delete_uploads("alice", ["2024-01-01 10:00:00"])
+    for _ in range(100):
+        if not store._compacting:
+            break
+        time.sleep(0.02)
+    with sqlite3.connect(db) as conn:
+        tombstones = conn.execute("SELECT COUNT(*) FROM history WHERE deleted = 1").fetchone()[0]
+    assert tombstones == (0 if expect_compaction else 1)
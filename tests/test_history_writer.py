@@ -0,0 +1,126 @@
+# tests/test_history_writer.py
+"""
+HistoryWriter group commits: uploads arriving within the latency window share
+one transaction, flush() returns only once they are durable, close() drains
+the queue, and failed commits are retried, then reported by flush().
+"""
+import threading
+import time
+
+import pytest
+
+from storage_utils.history_store import HistoryStore
+from storage_utils.history_writer import HistoryWriter
+
+
+class RecordingStore:
+    """A HistoryStore whose append_many can be made to fail or block"""
+
+    def __init__(self, path, failures=0, gate=None):
+        self.store = HistoryStore(path, csv_path="")
+        self.failures = failures
+        self.gate = gate
+        self.batches = []
+
+    def append_many(self, uploads):
+        uploads = list(uploads)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.store.append_many(uploads)
+        self.batches.append(len(uploads))
+
+
+def upload(i, username="alice"):
+    return username, "KL", ["happy", "sad"], [0.9, 0.4], f"2024-01-01 10:{i // 60:02d}:{i % 60:02d}"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def uploads_on_disk(db, username="alice"):
+    # A separate connection: only committed rows are visible
+    return HistoryStore(db, csv_path="").count_uploads(username)
+
+
+def test_latency_window_is_one_transaction(db):
+    store = RecordingStore(db)
+    writer = HistoryWriter(store, max_batch=256, max_latency_ms=300)
+    version = store.store.version()
+    for i in range(10):
+        writer.submit(*upload(i))
+    time.sleep(0.6)
+    assert store.batches == [10] and writer.batches == 1 and writer.committed == 10
+    assert store.store.version() == version + 1
+    assert uploads_on_disk(db) == 10
+    writer.close()
+
+
+def test_max_batch_splits_commits(db):
+    store = RecordingStore(db)
+    writer = HistoryWriter(store, max_batch=4, max_latency_ms=10_000)
+    for i in range(10):
+        writer.submit(*upload(i))
+    assert writer.flush(timeout=5)
+    assert store.batches == [4, 4, 2]
+    writer.close()
+
+
+def test_flush_waits_for_durable_rows(db):
+    gate = threading.Event()
+    store = RecordingStore(db, gate=gate)
+    # Without a flush these would sit in the queue for ten seconds
+    writer = HistoryWriter(store, max_batch=256, max_latency_ms=10_000)
+    for i in range(5):
+        writer.submit(*upload(i))
+    assert not writer.flush(timeout=0.2)     # the commit is still blocked
+    assert uploads_on_disk(db) == 0
+    gate.set()
+    start = time.monotonic()
+    assert writer.flush(timeout=5)
+    assert time.monotonic() - start < 1.0
+    assert uploads_on_disk(db) == 5
+    writer.close()
+
+
+def test_close_drains_the_queue(db):
+    writer = HistoryWriter(HistoryStore(db, csv_path=""), max_batch=3, max_latency_ms=10_000)
+    for i in range(8):
+        writer.submit(*upload(i))
+    writer.close()
+    assert uploads_on_disk(db) == 8 and writer.committed == 8
+    with pytest.raises(RuntimeError):
+        writer.submit(*upload(99))
+    assert writer.flush(timeout=0)           # nothing left to wait for
+    writer.close()                           # idempotent
+
+
+def test_failed_commit_is_retried(db):
+    store = RecordingStore(db, failures=2)
+    writer = HistoryWriter(store, max_latency_ms=5, max_retries=3)
+    writer.submit(*upload(0))
+    assert writer.flush(timeout=5)
+    assert store.batches == [1] and writer.dropped == 0
+    assert uploads_on_disk(db) == 1
+    writer.close()
+
+
+def test_dropped_uploads_are_reported_by_flush(db, caplog):
+    store = RecordingStore(db, failures=3)
+    writer = HistoryWriter(store, max_latency_ms=5, max_retries=3)
+    writer.submit(*upload(0))
+    writer.submit(*upload(1))
+    with pytest.raises(RuntimeError, match="database is locked"):
+        writer.flush(timeout=5)
+    assert writer.dropped == 2 and uploads_on_disk(db) == 0
+    assert "Dropped 2 uploads after 3 attempts" in caplog.text
+
+    # Reported once; later uploads commit normally
+    writer.submit(*upload(2))
+    assert writer.flush(timeout=5)
+    assert uploads_on_disk(db) == 1
+    writer.close()
@@ -0,0 +1,78 @@
+# tests/test_image_context.py
+"""
+An ImageContext decodes its file once, however many stages ask for pixels;
+header reads (size, EXIF) never decode, and the RGB array is a view of the
+BGR one rather than another copy.
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFile
+
+from pipeline_utils.image_context import ImageContext
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Counts full pixel decodes (loads with tiles still pending) by image size"""
+    counts = []
+    load = ImageFile.ImageFile.load
+
+    def counting_load(self):
+        if self.tile:
+            counts.append(self.size)
+        return load(self)
+
+    monkeypatch.setattr(ImageFile.ImageFile, "load", counting_load)
+    return counts
+
+
+def jpeg(size=(640, 480)):
+    rng = np.random.default_rng(0)
+    small = Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8))
+    buf = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "TestCam"
+    small.resize(size, Image.BICUBIC).save(buf, "JPEG", quality=90, exif=exif)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "PNG"])
+def test_decoded_once(decodes, fmt):
+    data = jpeg()
+    if fmt == "PNG":
+        buf = io.BytesIO()
+        Image.open(io.BytesIO(data)).save(buf, "PNG")
+        data = buf.getvalue()
+        decodes.clear()
+    ctx = ImageContext(data)
+    assert ctx.size == (640, 480)
+    if fmt == "JPEG":
+        assert ctx.exif[0x010F] == "TestCam"
+    assert decodes == []
+
+    pil, bgr, rgb = ctx.pil, ctx.bgr, ctx.rgb
+    assert ctx.pil is pil and ctx.bgr is bgr and ctx.rgb is rgb
+    assert ctx.proxy_bgr(1024)[0] is bgr
+    assert ctx.size == (640, 480)
+    assert decodes == [(640, 480)]
+
+
+def test_rgb_is_a_read_only_view_of_bgr():
+    ctx = ImageContext(jpeg())
+    np.testing.assert_array_equal(ctx.rgb, np.asarray(ctx.pil))
+    np.testing.assert_array_equal(ctx.bgr[:, :, ::-1], ctx.rgb)
+    assert np.shares_memory(ctx.rgb, ctx.bgr)
+    assert not ctx.bgr.flags.writeable and not ctx.rgb.flags.writeable
+    with pytest.raises(ValueError):
+        ctx.bgr[0, 0] = 0
+
+
+def test_proxy_decoded_once_per_size(decodes):
+    ctx = ImageContext(jpeg((1600, 1200)))
+    proxy, scale = ctx.proxy_bgr(400)
+    assert max(proxy.shape[:2]) <= 400 and scale == pytest.approx(1600 / proxy.shape[1])
+    assert ctx.proxy_bgr(400)[0] is proxy
+    # A reduced-scale JPEG draft decode, never the full-size image
+    assert len(decodes) == 1 and decodes[0][0] < 1600
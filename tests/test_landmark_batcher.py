@@ -0,0 +1,120 @@
+# tests/test_landmark_batcher.py
+"""
+LandmarkMicroBatcher coalesces concurrent requests into shared passes,
+flushes a lone request after max_wait_ms, and resolves every accepted
+request when closed. detect_landmarks_batch is replaced by a stub that
+records the batches it is given, so CLIP is never loaded.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pytest
+
+from location_utils import landmark
+from location_utils.landmark import LandmarkMicroBatcher
+
+
+class StubBatch:
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.batches = []
+
+    def __call__(self, images, threshold, top_k, batch_size):
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        self.batches.append(list(images))
+        return [f"landmark-{image}" for image in images]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubBatch()
+    monkeypatch.setattr(landmark, "detect_landmarks_batch", stub)
+    return stub
+
+
+def test_concurrent_requests_are_coalesced(stub):
+    batcher = LandmarkMicroBatcher(max_batch_size=4, max_wait_ms=200)
+    try:
+        with ThreadPoolExecutor(10) as pool:
+            results = list(pool.map(lambda i: batcher.detect(i, timeout=5), range(10)))
+    finally:
+        batcher.close()
+    assert results == [f"landmark-{i}" for i in range(10)]
+    assert sorted(i for batch in stub.batches for i in batch) == list(range(10))
+    assert all(len(batch) <= 4 for batch in stub.batches)
+    assert len(stub.batches) <= 4
+
+
+def test_lone_request_flushed_after_max_wait(stub):
+    batcher = LandmarkMicroBatcher(max_batch_size=16, max_wait_ms=50)
+    try:
+        start = time.monotonic()
+        assert batcher.detect("solo", timeout=5) == "landmark-solo"
+        elapsed = time.monotonic() - start
+    finally:
+        batcher.close()
+    assert 0.04 <= elapsed < 1.0
+    assert stub.batches == [["solo"]]
+
+
+def test_errors_reach_every_future_in_the_batch(monkeypatch):
+    def broken(images, **kwargs):
+        raise RuntimeError("CLIP failed")
+
+    monkeypatch.setattr(landmark, "detect_landmarks_batch", broken)
+    batcher = LandmarkMicroBatcher(max_batch_size=4, max_wait_ms=100)
+    futures = [batcher.submit(i) for i in range(3)]
+    batcher.close()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="CLIP failed"):
+            future.result(timeout=1)
+
+
+def test_close_processes_pending_requests(monkeypatch):
+    gate = threading.Event()
+    stub = StubBatch(gate=gate)
+    monkeypatch.setattr(landmark, "detect_landmarks_batch", stub)
+    batcher = LandmarkMicroBatcher(max_batch_size=3, max_wait_ms=1)
+    futures = [batcher.submit(i) for i in range(8)]
+    futures[7].cancel()
+
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    gate.set()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert [f.result(timeout=0) for f in futures[:7]] == [f"landmark-{i}" for i in range(7)]
+    assert 7 not in [i for batch in stub.batches for i in batch]
+    with pytest.raises(RuntimeError):
+        batcher.submit("late")
+    batcher.close()  # idempotent
+
+
+def test_submit_racing_close_never_strands_a_future(stub):
+    for _ in range(20):
+        batcher = LandmarkMicroBatcher(max_batch_size=8, max_wait_ms=1)
+        accepted = []
+        start = threading.Barrier(5)
+
+        def submitter():
+            start.wait()
+            for i in range(200):
+                try:
+                    accepted.append(batcher.submit(i))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submitter) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        batcher.close()
+        for thread in threads:
+            thread.join()
+        # Every request submit() accepted was answered before close() returned
+        done, not_done = wait(accepted, timeout=0)
+        assert not not_done
@@ -0,0 +1,123 @@
+# tests/test_landmark_catalog.py
+"""
+The chunked streaming search must return what a dense softmax over the whole
+(or region-filtered) catalog would: the same top-k keys and probabilities,
+whatever the chunk size.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from location_utils.landmark_catalog import LandmarkCatalog
+
+LOGIT_SCALE = 100.0
+
+
+def random_catalog(tmp_path, rows=200, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    regions = ["asia", "europe", "americas"]
+    entries = [
+        {"key": f"lm{i}", "name": f"Landmark {i}", "country": f"C{i % 7}", "region": regions[i % 3],
+         "lat": float(rng.uniform(-60, 60)), "lon": float(rng.uniform(-180, 180))}
+        for i in range(rows)
+    ]
+    catalog = LandmarkCatalog(entries)
+    matrix = rng.normal(size=(rows, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    # An existing cache file is memory-mapped without touching the model
+    path = tmp_path / "catalog.npy"
+    np.save(path, matrix.astype(np.float16))
+    catalog.load_embeddings(None, None, str(path))
+    queries = rng.normal(size=(6, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return catalog, queries
+
+
+def dense_top_k(catalog, queries, top_k, rows=None):
+    matrix = np.asarray(catalog.matrix, dtype=np.float32)
+    rows = np.arange(len(catalog)) if rows is None else rows
+    logits = LOGIT_SCALE * queries @ matrix[rows].T
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    results = []
+    for row in probs:
+        order = np.argsort(-row)[:top_k]
+        results.append([(catalog.keys[rows[j]], float(row[j])) for j in order])
+    return results
+
+
+def assert_same(ranked, expected):
+    for got, want in zip(ranked, expected):
+        assert [k for k, _ in got] == [k for k, _ in want]
+        np.testing.assert_allclose([p for _, p in got], [p for _, p in want], rtol=1e-4, atol=1e-7)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10000])
+def test_search_matches_dense_softmax(tmp_path, chunk_size):
+    catalog, queries = random_catalog(tmp_path)
+    ranked = catalog.search(queries, LOGIT_SCALE, top_k=5, chunk_size=chunk_size)
+    assert_same(ranked, dense_top_k(catalog, queries, 5))
+    # Argmax agrees with a plain dense argmax
+    dense_best = np.argmax(queries @ np.asarray(catalog.matrix, dtype=np.float32).T, axis=1)
+    assert [r[0][0] for r in ranked] == [catalog.keys[i] for i in dense_best]
+
+
+def test_region_filter(tmp_path):
+    catalog, queries = random_catalog(tmp_path)
+    rows = catalog.region_rows("europe, C3")
+    assert all(catalog.regions[i] == "europe" or catalog.countries[i] == "C3" for i in rows)
+    ranked = catalog.search(queries, LOGIT_SCALE, top_k=3, region="europe, C3", chunk_size=16)
+    # Probabilities are renormalized over the filtered rows only
+    assert_same(ranked, dense_top_k(catalog, queries, 3, rows=rows))
+
+
+def test_bbox_filter(tmp_path):
+    catalog, queries = random_catalog(tmp_path)
+    region = "bbox:0,0,60,180"
+    rows = catalog.region_rows(region)
+    assert len(rows) and all(catalog.lats[i] >= 0 and catalog.lons[i] >= 0 for i in rows)
+    assert_same(catalog.search(queries, LOGIT_SCALE, top_k=4, region=region, chunk_size=5),
+                dense_top_k(catalog, queries, 4, rows=rows))
+
+
+def test_empty_region_and_large_k(tmp_path):
+    catalog, queries = random_catalog(tmp_path, rows=6)
+    assert catalog.search(queries, LOGIT_SCALE, region="antarctica") == [[] for _ in queries]
+    ranked = catalog.search(queries, LOGIT_SCALE, top_k=50, chunk_size=4)
+    assert all(len(r) == 6 for r in ranked)
+    assert all(sum(p for _, p in r) == pytest.approx(1.0, abs=1e-6) for r in ranked)
+
+
+def test_search_needs_embeddings():
+    with pytest.raises(RuntimeError):
+        LandmarkCatalog([{"name": "x"}]).search(np.zeros((1, 4)), LOGIT_SCALE)
+
+
+def test_loading_and_templates(tmp_path):
+    data = {
+        "templates": ["a photo of {name}", "{name} in {city}"],
+        "landmarks": [
+            {"name": "Big Ben", "city": "London", "lat": 51.5, "lon": -0.12},
+            {"name": "Uluru"},                                   # no city: only the first template
+            {"name": "Taj Mahal", "prompts": ["the taj mahal"]},
+            {"name": "big ben"},                                 # duplicate key
+            {"name": ""},                                        # skipped
+        ],
+    }
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    catalog = LandmarkCatalog.load(str(path))
+    assert catalog.keys == ["big ben", "uluru", "taj mahal"]
+    assert catalog.prompts == [["a photo of Big Ben", "Big Ben in London"], ["a photo of Uluru"], ["the taj mahal"]]
+    assert catalog.get("BIG BEN")["coords"] == (51.5, -0.12)
+    assert catalog.get("uluru")["coords"] is None
+
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text("name,city,prompts\nBig Ben,London,a photo of Big Ben|Big Ben in London\n"
+                        "Uluru,,a photo of Uluru\nTaj Mahal,,the taj mahal\n", encoding="utf-8")
+    # Same keys and prompts, so the same cached embedding matrix
+    assert LandmarkCatalog.load(str(csv_path)).fingerprint() == catalog.fingerprint()
+    data["landmarks"][1]["prompts"] = ["uluru at sunset"]
+    path.write_text(json.dumps(data), encoding="utf-8")
+    assert LandmarkCatalog.load(str(path)).fingerprint() != catalog.fingerprint()
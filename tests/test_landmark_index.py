@@ -0,0 +1,76 @@
+# tests/test_landmark_index.py
+"""Exact, prefix and fuzzy name lookups over CSV and GeoJSON landmark dumps."""
+import json
+
+import pytest
+
+from location_utils.landmark_index import LandmarkIndex, normalize_name
+
+ROWS = [
+    ("Petronas Twin Towers", 3.1579, 101.7116),
+    ("Petronas Tower 3", 3.1569, 101.7122),
+    ("Sagrada Família", 41.4036, 2.1744),
+    ("Leaning Tower of Pisa", 43.7230, 10.3966),
+    ("Big Ben", 51.5007, -0.1246),
+]
+
+
+@pytest.fixture
+def csv_index(tmp_path):
+    path = tmp_path / "landmarks.csv"
+    lines = ["name,lat,lon"] + [f'"{name}",{lat},{lon}' for name, lat, lon in ROWS]
+    lines += ["No coords,,", "Bad,abc,1.0", ",1.0,2.0", '"Big Ben",0,0']  # skipped or duplicate
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return LandmarkIndex(str(path), fuzzy_cutoff=0.8)
+
+
+def test_normalize_name():
+    assert normalize_name("  Sagrada  Família! ") == "sagrada familia"
+    assert normalize_name("St. Paul's-Cathedral") == "st paul s cathedral"
+
+
+def test_csv_loading_skips_bad_rows(csv_index):
+    assert len(csv_index) == len(ROWS)
+    # The first occurrence of a name wins
+    assert csv_index.exact("big ben") == (51.5007, -0.1246, "Big Ben")
+
+
+def test_exact_ignores_case_accents_and_punctuation(csv_index):
+    assert csv_index.exact("SAGRADA FAMILIA")[2] == "Sagrada Família"
+    assert csv_index.exact("leaning tower of pisa!")[:2] == (43.7230, 10.3966)
+    assert csv_index.exact("petronas") is None
+
+
+def test_prefix_shortest_first(csv_index):
+    names = [entry[2] for entry in csv_index.prefix("petronas")]
+    assert names == ["Petronas Tower 3", "Petronas Twin Towers"]
+    assert csv_index.prefix("petronas", limit=1)[0][2] == "Petronas Tower 3"
+    assert csv_index.prefix("") == []
+
+
+def test_fuzzy(csv_index):
+    assert csv_index.fuzzy("Sagrada Familla")[2] == "Sagrada Família"
+    assert csv_index.fuzzy("Eiffel Tower") is None
+
+
+def test_lookup_order(csv_index):
+    assert csv_index.lookup("Big Ben") == ((51.5007, -0.1246), "Big Ben", "exact")
+    assert csv_index.lookup("Leaning Tower")[1:] == ("Leaning Tower of Pisa", "prefix")
+    assert csv_index.lookup("Leanin Tower of Pisa")[1:] == ("Leaning Tower of Pisa", "fuzzy")
+    assert csv_index.lookup("Statue of Liberty") is None
+
+
+def test_geojson_centers(tmp_path):
+    features = [
+        {"properties": {"name": "Point Park"}, "geometry": {"type": "Point", "coordinates": [10.0, 20.0]}},
+        {"properties": {"name": "Square"}, "geometry": {
+            "type": "Polygon", "coordinates": [[[0, 0], [2, 0], [2, 4], [0, 4]]]}},
+        {"properties": {"name": "Nameless?"}, "geometry": None},
+        {"properties": {}, "geometry": {"type": "Point", "coordinates": [1.0, 1.0]}},
+    ]
+    path = tmp_path / "pois.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    index = LandmarkIndex(str(path))
+    assert len(index) == 2
+    assert index.exact("point park")[:2] == (20.0, 10.0)
+    assert index.exact("square")[:2] == (2.0, 1.0)
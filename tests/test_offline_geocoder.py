@@ -0,0 +1,87 @@
+# tests/test_offline_geocoder.py
+"""
+The KD-tree must return the same nearest place as a brute-force great-circle
+scan, and malformed gazetteer rows must be skipped rather than crash loading.
+"""
+import csv
+import math
+
+import numpy as np
+import pytest
+
+from location_utils.offline_geocoder import EARTH_RADIUS_KM, OfflineGeocoder
+
+
+def haversine_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def write_gazetteer(path, rows, fields=("name", "admin", "country", "lat", "lon")):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def places():
+    rng = np.random.default_rng(0)
+    # Uniform on the sphere, plus a dense cluster and points near the poles and the antimeridian
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, 1500)))
+    lons = rng.uniform(-180, 180, 1500)
+    lats = np.concatenate([lats, rng.normal(3.1, 0.05, 300), [89.9, -89.9, 0.0, 0.0]])
+    lons = np.concatenate([lons, rng.normal(101.7, 0.05, 300), [10.0, -170.0, 179.99, -179.99]])
+    return [(f"place{i}", float(lat), float(lon)) for i, (lat, lon) in enumerate(zip(lats, lons))]
+
+
+def test_kdtree_matches_brute_force(places, tmp_path):
+    path = write_gazetteer(tmp_path / "g.csv", [(name, "", "", lat, lon) for name, lat, lon in places])
+    geocoder = OfflineGeocoder(path, max_distance_km=40000)
+
+    rng = np.random.default_rng(1)
+    queries = list(zip(np.degrees(np.arcsin(rng.uniform(-1, 1, 300))), rng.uniform(-180, 180, 300)))
+    queries += [(3.1, 101.7), (89.95, -100.0), (0.0, 180.0), (0.0, -180.0)]
+    for query in queries:
+        distances = [haversine_km(query, (lat, lon)) for _, lat, lon in places]
+        best = int(np.argmin(distances))
+        name, distance = geocoder.lookup(query)
+        # Ties aside, the same place; always the same distance
+        assert distance == pytest.approx(distances[best], abs=1e-6)
+        assert name == places[best][0] or distances[int(name[5:])] == pytest.approx(distances[best])
+
+
+def test_max_distance_and_address(tmp_path):
+    path = write_gazetteer(tmp_path / "g.csv", [("Kuala Lumpur", "Wilayah Persekutuan", "Malaysia", 3.1390, 101.6869)])
+    geocoder = OfflineGeocoder(path, max_distance_km=50)
+    assert geocoder.reverse((3.15, 101.70)) == "Kuala Lumpur, Wilayah Persekutuan, Malaysia"
+    assert geocoder.lookup((1.35, 103.82)) is None  # Singapore, ~300 km away
+    assert geocoder.reverse((1.35, 103.82)) == "Unknown location"
+
+
+def test_malformed_rows_are_skipped(tmp_path, caplog):
+    path = tmp_path / "g.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("name,admin,country,lat,lon\n")
+        f.write("Good,,Malaysia,3.1,101.7\n")
+        f.write("Short row\n")                 # missing fields come back as None
+        f.write(",,Malaysia,3.0,101.0\n")      # no name
+        f.write("Bad lat,,X,north,101.0\n")
+        f.write("Off the map,,X,95.0,10.0\n")
+        f.write("Also good,,,-33.86,151.21\n")
+    geocoder = OfflineGeocoder(str(path))
+    assert geocoder.places == ["Good, Malaysia", "Also good"]
+    assert "Skipped 4 malformed rows" in caplog.text
+
+
+def test_latitude_longitude_columns(tmp_path):
+    path = write_gazetteer(tmp_path / "g.csv", [("Pisa", "Tuscany", "Italy", 43.72, 10.40)],
+                           fields=("name", "admin", "country", "latitude", "longitude"))
+    assert OfflineGeocoder(path).reverse((43.72, 10.39)) == "Pisa, Tuscany, Italy"
+
+
+def test_empty_gazetteer(tmp_path):
+    path = write_gazetteer(tmp_path / "g.csv", [])
+    assert OfflineGeocoder(path).lookup((0.0, 0.0)) is None
@@ -0,0 +1,144 @@
+# tests/test_result_cache.py
+"""
+Exact hits are keyed by content and config fingerprint; near-duplicate reuse
+is opt-in, limited to the same owner, and rescales detection boxes. The
+pipeline only stores fully geocoded results, without their embeddings.
+"""
+import io
+import json
+import sqlite3
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from location_utils.geocoder import FallbackAddress
+from pipeline_utils import pipeline
+from pipeline_utils.image_context import ImageContext
+from pipeline_utils.result_cache import ResultCache, difference_hash
+
+RESULT = {
+    "detections": [{"emotion": "happy", "confidence": 91.5, "x": 40, "y": 20, "w": 60, "h": 80}],
+    "location": "Kuala Lumpur",
+    "cached": False,
+}
+
+
+def photo(seed=0, size=(320, 240), quality=90):
+    """A smooth synthetic photo as JPEG bytes, so re-encodes and resizes keep their dHash"""
+    rng = np.random.default_rng(seed)
+    small = Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8))
+    buf = io.BytesIO()
+    small.resize(size, Image.BICUBIC).save(buf, "JPEG", quality=quality)
+    return ImageContext(buf.getvalue(), name=f"photo{seed}.jpg")
+
+
+def resized(ctx, size, quality=75):
+    buf = io.BytesIO()
+    ctx.pil.resize(size, Image.BICUBIC).save(buf, "JPEG", quality=quality)
+    return ImageContext(buf.getvalue())
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "results.sqlite")
+
+
+def test_exact_hit_and_miss(cache_path):
+    cache = ResultCache(cache_path, fingerprint="a")
+    original = photo()
+    assert cache.lookup(original) is None
+    cache.store(original, RESULT, owner="alice")
+    hit = cache.lookup(ImageContext(original.data))
+    assert hit["detections"] == RESULT["detections"] and "cached" not in hit
+    assert cache.lookup(photo(seed=1)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_fingerprint_change_invalidates(cache_path):
+    original = photo()
+    ResultCache(cache_path, fingerprint="a").store(original, RESULT)
+    assert ResultCache(cache_path, fingerprint="a").lookup(original) is not None
+    reopened = ResultCache(cache_path, fingerprint="b")
+    assert reopened.stats()["entries"] == 0
+    assert reopened.lookup(original) is None
+
+
+def test_near_duplicates_are_opt_in_and_per_owner(cache_path):
+    original = photo()
+    copy = resized(original, (160, 120))
+    assert bin(difference_hash(original) ^ difference_hash(copy)).count("1") <= 4
+
+    exact_only = ResultCache(cache_path, fingerprint="a")
+    exact_only.store(original, RESULT, owner="alice")
+    assert exact_only.lookup(copy, owner="alice") is None
+
+    cache = ResultCache(cache_path, max_distance=6, fingerprint="a")
+    assert cache.lookup(copy) is None                 # no owner, no near-duplicate reuse
+    assert cache.lookup(copy, owner="bob") is None    # never another user's result
+    hit = cache.lookup(copy, owner="alice")
+    assert cache.stats()["near_hits"] == 1
+    # Boxes are mapped onto the half-size copy
+    assert {k: hit["detections"][0][k] for k in "xywh"} == {"x": 20, "y": 10, "w": 30, "h": 40}
+
+
+def test_eviction(cache_path):
+    cache = ResultCache(cache_path, max_entries=10, fingerprint="a")
+    images = [photo(seed=i, size=(64, 48)) for i in range(15)]
+    for ctx in images:
+        cache.store(ctx, RESULT, owner="alice")
+    assert cache.stats()["entries"] <= 10
+    # The most recent entries survive, and the in-memory index matches the table
+    assert cache.lookup(images[-1]) is not None
+    assert ResultCache(cache_path, max_entries=10, fingerprint="a").stats()["entries"] == cache.stats()["entries"]
+
+
+class StubDetector:
+    def __init__(self):
+        self.calls = 0
+
+    def detect_emotions(self, image_ctx):
+        self.calls += 1
+        return [dict(RESULT["detections"][0])]
+
+
+@pytest.fixture
+def gps_upload(monkeypatch):
+    """analyze_upload on a photo with EXIF GPS, whose lookup answers `address[0]`"""
+    address = ["Jalan Ampang, Kuala Lumpur"]
+
+    def lookup(coords):
+        future = Future()
+        future.set_result(address[0])
+        return future
+
+    monkeypatch.setattr(pipeline, "extract_gps", lambda ctx: {"GPSLatitude": 1})
+    monkeypatch.setattr(pipeline, "convert_gps", lambda info: (3.1579, 101.7116))
+    monkeypatch.setattr(pipeline, "start_address_lookup", lookup)
+    monkeypatch.setattr(pipeline, "_embed", lambda ctx: [0.25] * 512)
+    return address
+
+
+def test_pipeline_stores_only_full_results(cache_path, gps_upload):
+    cache = ResultCache(cache_path, fingerprint="a")
+    detector = StubDetector()
+
+    # Without geocoding, or with the gazetteer standing in for Nominatim, nothing is stored
+    assert pipeline.analyze_upload(photo(0), detector, cache, geocode=False)["location"] == "Unknown"
+    gps_upload[0] = FallbackAddress("Kuala Lumpur, Malaysia")
+    assert pipeline.analyze_upload(photo(1), detector, cache)["location"] == "Kuala Lumpur, Malaysia"
+    gps_upload[0] = "Geocoding service unavailable"
+    pipeline.analyze_upload(photo(2), detector, cache)
+    assert cache.stats()["entries"] == 0
+
+    gps_upload[0] = "Jalan Ampang, Kuala Lumpur"
+    first = pipeline.analyze_upload(photo(3), detector, cache, embed=True)
+    assert cache.stats()["entries"] == 1 and len(first["embedding"]) == 512
+    again = pipeline.analyze_upload(photo(3), detector, cache, embed=True)
+    assert again["cached"] and again["location"] == first["location"] and detector.calls == 4
+    # The embedding is recomputed for hits rather than kept in the payload
+    assert again["embedding"] == first["embedding"]
+    with sqlite3.connect(cache_path) as conn:
+        payload = json.loads(conn.execute("SELECT payload FROM results").fetchone()[0])
+    assert "embedding" not in payload and "cached" not in payload
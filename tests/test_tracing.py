@@ -0,0 +1,112 @@
+# tests/test_tracing.py
+"""
+Prometheus text rendering of counters and histograms (including label
+escaping), and span nesting carried by the contextvars: nested spans get
+increasing depths, threads only join a trace when the context is copied,
+and background work is attributed through track_future.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from pipeline_utils import tracing
+from pipeline_utils.tracing import (
+    DURATION_BUCKETS, inc_counter, observe, record_cache, render_prometheus, span, start_trace, track_future
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(tracing, "_counters", {})
+    monkeypatch.setattr(tracing, "_histograms", {})
+    monkeypatch.setenv("LEADFOCAL_TRACE_LOG", "0")
+
+
+def test_counters():
+    record_cache("geocode", True)
+    record_cache("geocode", True)
+    record_cache("geocode", False)
+    inc_counter("custom_total", 2.5, b="2", a="1")
+    lines = render_prometheus().splitlines()
+    assert lines == [
+        'custom_total{a="1",b="2"} 2.5',
+        "# HELP leadfocal_cache_requests_total Cache lookups by cache and result",
+        "# TYPE leadfocal_cache_requests_total counter",
+        'leadfocal_cache_requests_total{cache="geocode",result="hit"} 2',
+        'leadfocal_cache_requests_total{cache="geocode",result="miss"} 1',
+    ]
+
+
+def test_label_values_are_escaped():
+    inc_counter("uploads_total", user='C:\\Users\\"bob"\nadmin')
+    assert render_prometheus() == 'uploads_total{user="C:\\\\Users\\\\\\"bob\\"\\nadmin"} 1\n'
+
+
+def test_histogram_buckets_are_cumulative():
+    values = [0.003, 0.02, 0.7, 100.0]
+    for value in values:
+        observe("leadfocal_stage_duration_seconds", value, stage="decode")
+    lines = render_prometheus().splitlines()
+    assert lines[:2] == [
+        "# HELP leadfocal_stage_duration_seconds Time spent in each pipeline stage",
+        "# TYPE leadfocal_stage_duration_seconds histogram",
+    ]
+    buckets = {}
+    for line in lines[2:2 + len(DURATION_BUCKETS) + 1]:
+        labels, count = line.rsplit(" ", 1)
+        assert labels.startswith('leadfocal_stage_duration_seconds_bucket{stage="decode",le="')
+        buckets[labels.split('le="')[1].rstrip('"}')] = int(count)
+    assert buckets == {
+        f"{bound:g}": sum(v <= bound for v in values) for bound in DURATION_BUCKETS
+    } | {"+Inf": 4}
+    assert lines[-2] == 'leadfocal_stage_duration_seconds_count{stage="decode"} 4'
+    assert lines[-1] == f'leadfocal_stage_duration_seconds_sum{{stage="decode"}} {sum(values):.6f}'
+
+
+def test_spans_nest_through_the_context():
+    with start_trace("upload", user="alice") as trace:
+        with span("decode"):
+            with span("exif"):
+                pass
+        with start_trace("analyze_upload"):    # nested trace: just a span
+            with span("emotion", faces=2):
+                pass
+    assert tracing.current_trace() is None
+    spans = {s["name"]: s for s in trace.to_dict()["spans"]}
+    assert {name: s["depth"] for name, s in spans.items()} == {
+        "decode": 0, "exif": 1, "analyze_upload": 0, "emotion": 1
+    }
+    assert spans["emotion"]["faces"] == 2
+    assert trace.to_dict()["user"] == "alice" and trace in tracing.recent_traces
+    # Every span and the trace itself also feed the stage histogram
+    stages = {dict(labels)["stage"] for _, labels in tracing._histograms}
+    assert stages == {"upload", "decode", "exif", "analyze_upload", "emotion"}
+
+
+def test_threads_join_a_trace_only_with_a_copied_context():
+    def work(name):
+        with span(name):
+            pass
+
+    with start_trace("upload") as trace:
+        with span("outer"):
+            plain = threading.Thread(target=work, args=("plain_thread",))
+            context = contextvars.copy_context()
+            copied = threading.Thread(target=context.run, args=(work, "copied_context"))
+            for thread in (plain, copied):
+                thread.start()
+                thread.join()
+    depths = {s["name"]: s["depth"] for s in trace.spans}
+    assert depths == {"outer": 0, "copied_context": 1}
+
+
+def test_track_future_records_background_work():
+    future = Future()
+    with start_trace("upload") as trace:
+        with span("pipeline"):
+            track_future(future, "geocode")
+        future.set_result("Paris")
+    background = [s for s in trace.spans if s["name"] == "geocode"]
+    assert len(background) == 1 and background[0]["background"] and background[0]["depth"] == 1
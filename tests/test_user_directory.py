@@ -0,0 +1,120 @@
+# tests/test_user_directory.py
+"""
+Concurrent signups (threads and processes) must neither lose users nor let
+two accounts claim one name, and the CSV backend must pick up edits other
+processes make to users.csv without a restart.
+"""
+import csv
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from storage_utils.user_directory import UserDirectory, hash_password
+
+
+def open_directory(backend, tmp_path):
+    return UserDirectory(str(tmp_path / "users.csv"), backend=backend, db_path=str(tmp_path / "users.db"))
+
+
+def csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_register_and_authenticate(backend, tmp_path):
+    users = open_directory(backend, tmp_path)
+    assert users.register("alice", "s3cret")
+    assert not users.register("alice", "other")
+    assert users.authenticate("alice", "s3cret")
+    assert not users.authenticate("alice", "other") and not users.authenticate("bob", "s3cret")
+    # A fresh instance (another session or process) sees the same users
+    assert open_directory(backend, tmp_path).authenticate("alice", "s3cret")
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_concurrent_threads(backend, tmp_path):
+    users = open_directory(backend, tmp_path)
+    claimed = []
+    start = threading.Barrier(8)
+
+    def signup(worker):
+        start.wait()
+        for i in range(25):
+            assert users.register(f"user{worker}-{i}", "pw")
+        if users.register("popular", f"pw{worker}"):
+            claimed.append(worker)
+
+    threads = [threading.Thread(target=signup, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 1
+    fresh = open_directory(backend, tmp_path)
+    assert fresh.authenticate("popular", f"pw{claimed[0]}")
+    assert all(fresh.authenticate(f"user{w}-{i}", "pw") for w in range(8) for i in range(25))
+    if backend == "csv":
+        rows = csv_rows(users.path)
+        assert rows[0] == ["username", "password"] and len(rows) == 1 + 8 * 25 + 1
+
+
+def _signup_process(args):
+    backend, tmp_path, worker = args
+    users = UserDirectory(os.path.join(tmp_path, "users.csv"), backend=backend,
+                          db_path=os.path.join(tmp_path, "users.db"))
+    for i in range(20):
+        users.register(f"user{worker}-{i}", "pw")
+    return users.register("popular", f"pw{worker}")
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_concurrent_processes(backend, tmp_path):
+    open_directory(backend, tmp_path)  # creates the sqlite schema before the race
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        claimed = pool.map(_signup_process, [(backend, str(tmp_path), w) for w in range(4)])
+    assert claimed.count(True) == 1
+    fresh = open_directory(backend, tmp_path)
+    assert fresh.authenticate("popular", f"pw{claimed.index(True)}")
+    assert all(fresh.authenticate(f"user{w}-{i}", "pw") for w in range(4) for i in range(20))
+    if backend == "csv":
+        rows = csv_rows(fresh.path)
+        assert rows.count(["username", "password"]) == 1 and len(rows) == 1 + 4 * 20 + 1
+
+
+def test_external_csv_edits_are_picked_up(tmp_path):
+    users = open_directory("csv", tmp_path)
+    users.register("alice", "pw")
+    assert users.get_password_hash("carol") is None
+
+    # Another process appends a user...
+    with open(users.path, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["carol", hash_password("carol-pw")])
+    assert users.authenticate("carol", "carol-pw")
+
+    # ...an admin rewrites the file, resetting a password and dropping a user...
+    with open(users.path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["username", "password"], ["alice", hash_password("new-pw")]])
+    assert users.authenticate("alice", "new-pw") and not users.authenticate("alice", "pw")
+    assert users.get_password_hash("carol") is None
+    # ...and the freed name can be registered again
+    assert users.register("carol", "again")
+
+    os.remove(users.path)
+    assert users.get_password_hash("alice") is None
+    assert users.register("alice", "fresh")
+    assert csv_rows(users.path) == [["username", "password"], ["alice", hash_password("fresh")]]
+
+
+def test_sqlite_imports_csv_once(tmp_path):
+    legacy = open_directory("csv", tmp_path)
+    legacy.register("alice", "pw")
+    users = open_directory("sqlite", tmp_path)
+    assert users.authenticate("alice", "pw")
+    assert not users.register("alice", "other")
+    # Reopening does not overwrite accounts that already exist in the database
+    open_directory("sqlite", tmp_path)
+    assert users.authenticate("alice", "pw")
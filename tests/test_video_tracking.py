@@ -0,0 +1,124 @@
+# tests/test_video_tracking.py
+"""
+Video mode on a synthetic clip: a textured patch drifting across a flat
+background, found by a stub face detector on keyframes and followed by
+template matching in between. The stub classifier counts its calls.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from emotion_utils.detector import EmotionDetector
+from emotion_utils.video import VideoEmotionAnalyzer, _Track, iou
+
+SIZE = (240, 180)          # frame width, height
+PATCH = 40
+FPS = 10.0
+STEP = 3                   # pixels the patch moves per frame
+BACKGROUND = 90
+
+
+def patch_position(index):
+    return 20 + STEP * index, 30 + index
+
+
+def write_clip(path, frames=30):
+    rng = np.random.default_rng(0)
+    texture = cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8), (PATCH, PATCH),
+                         interpolation=cv2.INTER_CUBIC)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), FPS, SIZE)
+    for index in range(frames):
+        frame = np.full((SIZE[1], SIZE[0], 3), BACKGROUND, dtype=np.uint8)
+        x, y = patch_position(index)
+        frame[y:y + PATCH, x:x + PATCH] = texture
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+class StubDetector:
+    """Finds the patch as the bounding box of non-background pixels; every face is 'happy'"""
+
+    crop_face = staticmethod(EmotionDetector.crop_face)
+
+    def __init__(self, blind_calls=()):
+        self.calls = 0
+        self.blind_calls = set(blind_calls)
+        self.classified = 0
+
+    def detect_faces(self, frame):
+        self.calls += 1
+        if self.calls in self.blind_calls:
+            return []
+        ys, xs = np.nonzero(np.abs(frame.astype(int) - BACKGROUND).max(axis=2) > 60)
+        if not len(xs):
+            return []
+        region = {"x": int(xs.min()), "y": int(ys.min()),
+                  "w": int(xs.max() - xs.min() + 1), "h": int(ys.max() - ys.min() + 1)}
+        return [(self.crop_face(frame, region), region)]
+
+    def model_crop(self, frame, region):
+        return self.crop_face(frame, region)
+
+    def classify_faces(self, crops, regions):
+        self.classified += len(crops)
+        return [{"emotion": "happy", "confidence": 90.0, **region} for region in regions]
+
+
+@pytest.fixture
+def clip(tmp_path):
+    return write_clip(tmp_path / "clip.avi")
+
+
+def test_iou():
+    box = {"x": 0, "y": 0, "w": 10, "h": 10}
+    assert iou(box, box) == 1.0
+    assert iou(box, {"x": 5, "y": 0, "w": 10, "h": 10}) == pytest.approx(50 / 150)
+    assert iou(box, {"x": 20, "y": 20, "w": 5, "h": 5}) == 0.0
+    assert iou({"x": 0, "y": 0, "w": 0, "h": 0}, {"x": 0, "y": 0, "w": 0, "h": 0}) == 0.0
+
+
+def test_associate_is_greedy_by_overlap():
+    analyzer = VideoEmotionAnalyzer(StubDetector(), sample_fps=FPS, keyframe_interval=1)
+    a = _Track(0, {"x": 0, "y": 0, "w": 20, "h": 20}, None, 0.0)
+    b = _Track(1, {"x": 100, "y": 0, "w": 20, "h": 20}, None, 0.0)
+    faces = [(None, {"x": 102, "y": 1, "w": 20, "h": 20}),
+             (None, {"x": 3, "y": 2, "w": 20, "h": 20}),
+             (None, {"x": 200, "y": 200, "w": 20, "h": 20})]
+    assert analyzer._associate([a, b], faces) == {0: 1, 1: 0}
+    # Matched tracks take the detection's box; unmatched faces start new tracks in analyze
+    assert a.region == faces[1][1] and b.region == faces[0][1]
+
+
+def test_patch_is_followed_between_keyframes(clip):
+    detector = StubDetector()
+    result = VideoEmotionAnalyzer(detector, sample_fps=FPS, keyframe_interval=5,
+                                  drift_threshold=1.0).analyze(clip, max_seconds=0)
+    assert result["frames_sampled"] == 30 and result["keyframes"] == detector.calls == 6
+    assert len(result["tracks"]) == 1
+    track = result["tracks"][0]
+    assert track["dominant_emotion"] == "happy" and detector.classified == 1
+    assert len(track["timeline"]) == 30
+    for index, point in enumerate(track["timeline"]):
+        x, y = patch_position(index)
+        assert point["t"] == pytest.approx(index / FPS)
+        assert abs(point["x"] - x) <= 2 and abs(point["y"] - y) <= 2
+
+
+def test_keyframe_miss_recovered_by_tracking(clip):
+    # The detector misses the patch on the second keyframe (frame 5)
+    detector = StubDetector(blind_calls={2})
+    result = VideoEmotionAnalyzer(detector, sample_fps=FPS, keyframe_interval=5, drift_threshold=1.0,
+                                  max_missed=1).analyze(clip, max_seconds=0)
+    assert len(result["tracks"]) == 1
+    times = [point["t"] for point in result["tracks"][0]["timeline"]]
+    # Only the blind keyframe itself is missing; frames 6-9 are tracked again
+    assert times == [pytest.approx(i / FPS) for i in range(30) if i != 5]
+
+
+def test_drifting_track_is_reclassified(clip):
+    detector = StubDetector()
+    result = VideoEmotionAnalyzer(detector, sample_fps=FPS, keyframe_interval=5,
+                                  drift_threshold=0.0).analyze(clip, max_seconds=0)
+    assert len(result["tracks"]) == 1
+    assert result["classifications"] == detector.classified > 1
@@ -0,0 +1,122 @@
+# tools/build_gazetteer.py
+"""
+Build the offline geocoder's gazetteer (data/gazetteer.csv) from GeoNames.
+
+GeoNames publishes free dumps at https://download.geonames.org/export/dump/
+(CC BY 4.0). This script reads a cities file (cities15000.zip, cities5000.zip,
+cities1000.zip or cities500.zip, or the extracted .txt) together with
+admin1CodesASCII.txt and countryInfo.txt. It writes the name, admin, country,
+lat, lon CSV that LEADFOCAL_GAZETTEER points at. Run from the repository root:
+
+    python tools/build_gazetteer.py --download                 # fetch cities15000 and build
+    python tools/build_gazetteer.py --cities cities500.zip --admin1 admin1CodesASCII.txt \
+        --countries countryInfo.txt --output data/gazetteer.csv
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import urllib.request
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEONAMES_URL = "https://download.geonames.org/export/dump/"
+
+
+def download(name, directory):
+    path = os.path.join(directory, name)
+    print(f"Downloading {GEONAMES_URL}{name} ...")
+    urllib.request.urlretrieve(GEONAMES_URL + name, path)
+    return path
+
+
+def open_text(path):
+    """A GeoNames .txt file, or the single .txt inside a GeoNames .zip"""
+    if path.lower().endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        member = next(n for n in archive.namelist() if n.endswith(".txt"))
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_admin1(path):
+    """'US.CA' -> 'California'"""
+    names = {}
+    with open_text(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2:
+                names[fields[0]] = fields[1]
+    return names
+
+
+def read_countries(path):
+    """'US' -> 'United States'"""
+    names = {}
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 5:
+                names[fields[0]] = fields[4]
+    return names
+
+
+def iter_places(cities_path, admin1, countries):
+    """(name, admin, country, lat, lon) for every well-formed row of a cities file"""
+    with open_text(cities_path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11:
+                continue
+            name, country_code, admin_code = fields[1], fields[8], fields[10]
+            try:
+                lat, lon = float(fields[4]), float(fields[5])
+            except ValueError:
+                continue
+            yield (
+                name,
+                admin1.get(f"{country_code}.{admin_code}", ""),
+                countries.get(country_code, country_code),
+                f"{lat:.5f}",
+                f"{lon:.5f}",
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build data/gazetteer.csv from a GeoNames dump")
+    parser.add_argument("--download", action="store_true", help="fetch the GeoNames files first")
+    parser.add_argument("--cities", help="citiesNNN.zip or .txt (with --download: the file to fetch)")
+    parser.add_argument("--admin1", help="admin1CodesASCII.txt")
+    parser.add_argument("--countries", help="countryInfo.txt")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "data", "gazetteer.csv"))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.download:
+            args.cities = download(os.path.basename(args.cities or "cities15000.zip"), tmp)
+            args.admin1 = args.admin1 or download("admin1CodesASCII.txt", tmp)
+            args.countries = args.countries or download("countryInfo.txt", tmp)
+        if not (args.cities and args.admin1 and args.countries):
+            parser.error("pass --download, or --cities, --admin1 and --countries")
+
+        admin1 = read_admin1(args.admin1)
+        countries = read_countries(args.countries)
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        count = 0
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(["name", "admin", "country", "lat", "lon"])
+            for place in iter_places(args.cities, admin1, countries):
+                writer.writerow(place)
+                count += 1
+
+    print(f"{args.output}: {count} places")
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
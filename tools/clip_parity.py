@@ -0,0 +1,144 @@
+# tools/clip_parity.py
+"""
+Check a CPU-optimized CLIP mode against the float model.
+
+Both models rank every fixture image against the landmark catalog through
+the same chunked search detect_landmark uses, each mode with its own catalog
+embeddings. The report covers top-1 agreement, top-k overlap, the largest
+softmax difference, image-embedding cosine similarity, per-image latency and
+resident memory.
+Run from the repository root:
+
+    python tools/clip_parity.py fixtures/landmarks --mode int8
+    python tools/clip_parity.py fixtures/landmarks --mode torchscript --threads 4 --min-agreement 0.98
+
+Exits with status 1 when top-1 agreement or the mean embedding cosine falls
+below the given minimums.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def rss_mb():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def score_bundle(processor, model, encoder, catalog, images, batch_size=8, top_k=5):
+    """
+    Rank images against a catalog exactly as detect_landmark does, with an explicit
+    model bundle; returns (top-k [(key, prob), ...] per image, embeddings, seconds per image).
+    """
+    import numpy as np
+    import torch
+
+    from location_utils.landmark import _encode_images, _rank_embeddings
+
+    logit_scale = float(model.logit_scale.exp())
+    with torch.no_grad():
+        _encode_images(processor, model, encoder, images[:1])  # warm-up
+    ranked, embeds = [], []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        with torch.no_grad():
+            batch = _encode_images(processor, model, encoder, images[i:i + batch_size]).cpu().numpy()
+        ranked.extend(_rank_embeddings(batch, top_k, None, catalog=catalog, logit_scale=logit_scale))
+        embeds.append(batch)
+    per_image = (time.perf_counter() - start) / len(images)
+    return ranked, np.concatenate(embeds), per_image
+
+
+def run_mode(mode, images, batch_size, top_k):
+    """Load one CLIP mode with its own catalog embeddings and score all images"""
+    from location_utils.config import get_config
+    from location_utils.landmark import build_catalog, build_clip, load_catalog_embeddings
+
+    before = rss_mb()
+    processor, model, encoder = build_clip(get_config()["clip_model_name"], mode)
+    catalog = build_catalog()
+    load_catalog_embeddings(catalog, processor, model, mode=mode)
+    ranked, embeds, per_image = score_bundle(processor, model, encoder, catalog, images, batch_size, top_k)
+    return ranked, embeds, per_image, rss_mb() - before
+
+
+def compare(ref_ranked, ref_embeds, ranked, embeds, top_k):
+    """Per-image (top-1 agreement, max |dp| over keys ranked by both, embedding cosine) and the top-k overlap"""
+    import numpy as np
+
+    agree = np.array([bool(a) and bool(b) and a[0][0] == b[0][0] for a, b in zip(ref_ranked, ranked)])
+    overlap = float(np.mean([
+        len({k for k, _ in a} & {k for k, _ in b}) / top_k for a, b in zip(ref_ranked, ranked)
+    ]))
+    max_diff = []
+    for a, b in zip(ref_ranked, ranked):
+        probs = dict(b)
+        shared = [abs(p - probs[k]) for k, p in a if k in probs]
+        max_diff.append(max(shared) if shared else 1.0)
+    cosine = np.sum(ref_embeds * embeds, axis=1)
+    return agree, np.array(max_diff), cosine, overlap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy/latency parity of a CLIP CPU mode vs float")
+    parser.add_argument("fixtures", help="directory of landmark images")
+    parser.add_argument("--mode", default="int8", choices=["int8", "torchscript"])
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="required top-1 agreement")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="required mean embedding cosine")
+    args = parser.parse_args(argv)
+
+    from PIL import Image
+
+    from location_utils.landmark import set_torch_threads
+
+    paths = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        print(f"No images found in {args.fixtures}")
+        return 1
+    images = [Image.open(p).convert("RGB") for p in paths]
+    set_torch_threads(args.threads)
+
+    # The float reference runs first; RSS growth is peak-based, so the candidate's figure
+    # is only what it adds beyond the float model's peak
+    ref_ranked, ref_embeds, ref_latency, ref_rss = run_mode("float", images, args.batch_size, args.top_k)
+    ranked, embeds, latency, rss = run_mode(args.mode, images, args.batch_size, args.top_k)
+    agree, max_diff, cosine, overlap = compare(ref_ranked, ref_embeds, ranked, embeds, args.top_k)
+
+    for path, ok, diff, cos, r, c in zip(paths, agree, max_diff, cosine, ref_ranked, ranked):
+        mark = "  " if ok else "!!"
+        print(f"{mark} {os.path.basename(path):<40} float={r[0][0] if r else '-':<28} "
+              f"{args.mode}={c[0][0] if c else '-':<28} max|dp|={diff:.4f} cos={cos:.4f}")
+
+    print()
+    print(f"images:                 {len(paths)}")
+    print(f"top-1 agreement:        {agree.mean():.3f}")
+    print(f"top-{args.top_k} overlap:          {overlap:.3f}")
+    print(f"mean embedding cosine:  {cosine.mean():.4f} (min {cosine.min():.4f})")
+    print(f"max softmax difference: {max_diff.max():.4f}")
+    print(f"latency per image:      float {ref_latency * 1000:.1f} ms, {args.mode} {latency * 1000:.1f} ms "
+          f"({ref_latency / latency:.2f}x)")
+    print(f"RSS growth:             float {ref_rss:.0f} MB, {args.mode} +{rss:.0f} MB beyond that")
+
+    if agree.mean() < args.min_agreement or cosine.mean() < args.min_cosine:
+        print("\nParity check FAILED")
+        return 1
+    print("\nParity check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
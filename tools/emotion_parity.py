@@ -0,0 +1,115 @@
+# tools/emotion_parity.py
+"""
+Check an exported emotion backend against the DeepFace model.
+
+Faces are detected once in every fixture photo. The same 48x48 crops are then
+classified by both backends, so only the classifier differs. The report
+covers label agreement, the largest probability difference, per-face
+latency and resident memory. Run from the repository root:
+
+    python tools/emotion_parity.py fixtures/faces --backend tflite --model models/emotion_int8.tflite
+    python tools/emotion_parity.py fixtures/faces --backend onnx --model models/emotion.onnx
+
+Exits with status 1 when label agreement is below --min-agreement.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def timed_predict(backend, batch, repeats):
+    backend.predict(batch[:1])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        probs = backend.predict(batch)
+    return probs, (time.perf_counter() - start) / (repeats * len(batch))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy/latency parity of an emotion backend vs DeepFace")
+    parser.add_argument("fixtures", help="directory of photos with faces")
+    parser.add_argument("--backend", default="tflite", choices=["tflite", "onnx"])
+    parser.add_argument("--model", help="exported model file (default: LEADFOCAL_EMOTION_MODEL)")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5, help="timed passes over all faces")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    import numpy as np
+
+    from emotion_utils.backends import create_backend
+    from emotion_utils.config import get_config
+    from emotion_utils.detector import EMOTION_LABELS, EmotionDetector
+    from pipeline_utils.image_context import ImageContext
+
+    detector = EmotionDetector(emotion_backend="deepface")
+    crops, sources = [], []
+    for name in sorted(os.listdir(args.fixtures)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            ctx = ImageContext.from_path(os.path.join(args.fixtures, name))
+            for crop, _ in detector.detect_faces(ctx):
+                crops.append(crop)
+                sources.append(name)
+    if not crops:
+        print(f"No faces found in {args.fixtures}")
+        return 1
+    batch = np.stack(crops)[..., np.newaxis].astype(np.float32)
+
+    before = rss_mb()
+    try:
+        candidate = create_backend(
+            args.backend, args.model or get_config()["emotion_model_path"], args.threads, fallback=False
+        )
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    probs, latency = timed_predict(candidate, batch, args.repeats)
+    candidate_rss = rss_mb() - before
+
+    # The reference loads second so its TensorFlow footprint is not charged to the candidate
+    before = rss_mb()
+    reference = create_backend("deepface")
+    ref_probs, ref_latency = timed_predict(reference, batch, args.repeats)
+    reference_rss = rss_mb() - before
+
+    probs = probs / probs.sum(axis=1, keepdims=True)
+    ref_probs = ref_probs / ref_probs.sum(axis=1, keepdims=True)
+    labels, ref_labels = probs.argmax(axis=1), ref_probs.argmax(axis=1)
+    agree = labels == ref_labels
+    max_diff = np.abs(probs - ref_probs).max(axis=1)
+
+    for source, ok, diff, r, c in zip(sources, agree, max_diff, ref_labels, labels):
+        mark = "  " if ok else "!!"
+        print(f"{mark} {source:<40} deepface={EMOTION_LABELS[r]:<9} {args.backend}={EMOTION_LABELS[c]:<9} "
+              f"max|dp|={diff:.4f}")
+
+    print()
+    print(f"faces:                {len(crops)}")
+    print(f"label agreement:      {agree.mean():.3f}")
+    print(f"max prob difference:  {max_diff.max():.4f} (mean {max_diff.mean():.4f})")
+    print(f"latency per face:     deepface {ref_latency * 1000:.2f} ms, {args.backend} {latency * 1000:.2f} ms "
+          f"({ref_latency / latency:.1f}x)")
+    print(f"RSS growth:           {args.backend} {candidate_rss:.0f} MB, deepface {reference_rss:.0f} MB "
+          f"(detection already loaded TensorFlow for both)")
+
+    if agree.mean() < args.min_agreement:
+        print("\nParity check FAILED")
+        return 1
+    print("\nParity check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# tools/export_emotion_model.py
+"""
+Export DeepFace's emotion model to compact CPU formats.
+
+Writes, into --output (default models/):
+    emotion_float32.tflite   plain conversion
+    emotion_float16.tflite   float16 weights (half the size, float32 compute)
+    emotion_int8.tflite      int8 weights and activations, calibrated on real face crops
+    emotion.onnx             only with --onnx (needs `pip install tf2onnx`)
+
+Full int8 needs representative faces: pass --calibration with a directory of
+photos; faces are detected in them with the app's detector. Run from the
+repository root:
+
+    python tools/export_emotion_model.py --calibration fixtures/faces
+"""
+import argparse
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def calibration_faces(directory, limit):
+    """48x48 face crops from the photos in `directory`, as the detector prepares them"""
+    from emotion_utils.detector import EmotionDetector
+    from pipeline_utils.image_context import ImageContext
+
+    detector = EmotionDetector(emotion_backend="deepface")
+    crops = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        ctx = ImageContext.from_path(os.path.join(directory, name))
+        crops.extend(crop for crop, _ in detector.detect_faces(ctx))
+        if len(crops) >= limit:
+            break
+    return crops[:limit]
+
+
+def convert(model, kind, faces=None):
+    """
+    TFLite flatbuffer of a Keras emotion model: kind is float32, float16 or int8.
+    int8 needs `faces`, 48x48 crops in [0, 1] to calibrate activation ranges on.
+    """
+    import numpy as np
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if kind == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif kind == "int8":
+        def representative_dataset():
+            for face in faces:
+                yield [face[np.newaxis, :, :, np.newaxis].astype(np.float32)]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif kind != "float32":
+        raise ValueError(f"Unknown export kind {kind!r}")
+    return converter.convert()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the emotion model to TFLite (and optionally ONNX)")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "models"))
+    parser.add_argument("--calibration", help="directory of photos with faces, for int8 calibration")
+    parser.add_argument("--calibration-faces", type=int, default=300)
+    parser.add_argument("--onnx", action="store_true", help="also export ONNX via tf2onnx")
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+    from deepface import DeepFace
+
+    os.makedirs(args.output, exist_ok=True)
+    model = DeepFace.build_model("Emotion")
+
+    def write(name, data):
+        path = os.path.join(args.output, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"{path}: {len(data) / 1024:.0f} KB")
+
+    write("emotion_float32.tflite", convert(model, "float32"))
+    write("emotion_float16.tflite", convert(model, "float16"))
+
+    if args.calibration:
+        faces = calibration_faces(args.calibration, args.calibration_faces)
+        if not faces:
+            print(f"No faces found in {args.calibration}; skipping int8 export")
+        else:
+            write("emotion_int8.tflite", convert(model, "int8", faces))
+            print(f"int8 calibrated on {len(faces)} faces")
+    else:
+        print("No --calibration directory; skipping int8 export")
+
+    if args.onnx:
+        try:
+            import tf2onnx
+        except ImportError:
+            print("tf2onnx is not installed; skipping ONNX export")
+            return 1
+        spec = (tf.TensorSpec((None, 48, 48, 1), tf.float32, name="input"),)
+        path = os.path.join(args.output, "emotion.onnx")
+        tf2onnx.convert.from_keras(model, input_signature=spec, output_path=path)
+        print(f"{path}: {os.path.getsize(path) / 1024:.0f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# tools/import_report.py
+"""
+Report what each module costs to import.
+
+Every module is imported in a fresh interpreter with `python -X importtime`,
+so the numbers are cold-start costs and do not share already-imported
+dependencies. Run from the repository root:
+
+    python tools/import_report.py
+    python tools/import_report.py location_utils.landmark torch --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    # Project modules
+    "emotion_utils.detector",
+    "location_utils.extract_gps",
+    "location_utils.geocoder",
+    "location_utils.landmark",
+    # Third-party stacks used by app.py
+    "streamlit",
+    "numpy",
+    "cv2",
+    "PIL.Image",
+    "pandas",
+    "plotly.express",
+    "geopy",
+    "deepface.DeepFace",
+    "tensorflow",
+    "torch",
+    "transformers",
+]
+
+
+def measure_import(module, python=sys.executable):
+    """Import `module` in a fresh interpreter; returns (wall_seconds, cumulative_us, rows, error)"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        self_us, cumulative_us = int(parts[0]), int(parts[1])
+        rows.append((parts[2].strip(), self_us, cumulative_us))
+
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+        return wall, None, rows, error
+
+    top_level = [cum for name, _, cum in rows if name == module]
+    cumulative = top_level[-1] if top_level else sum(s for _, s, _ in rows)
+    return wall, cumulative, rows, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-module import-time report")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES,
+                        help="modules to measure (default: the app's main dependencies)")
+    parser.add_argument("--top", type=int, default=5,
+                        help="show the N most expensive transitive imports per module")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        wall, cumulative, rows, error = measure_import(module)
+        results.append((module, wall, cumulative, rows, error))
+
+    results.sort(key=lambda r: r[2] if r[2] is not None else -1, reverse=True)
+
+    print(f"{'module':<32} {'import (ms)':>12} {'process (ms)':>13}")
+    print("-" * 59)
+    for module, wall, cumulative, rows, error in results:
+        if error:
+            print(f"{module:<32} {'n/a':>12} {wall * 1000:>13.0f}  ({error})")
+            continue
+        print(f"{module:<32} {cumulative / 1000:>12.1f} {wall * 1000:>13.0f}")
+        if args.top:
+            heaviest = sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]
+            for name, self_us, _ in heaviest:
+                print(f"    {name:<40} self {self_us / 1000:>8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())